@@ -1,2 +1,2 @@
-from .config import Settings,LLMConfig,EmbeddingConfig
-__all__=["Settings","LLMConfig","EmbeddingConfig"]
\ No newline at end of file
+from .config import Settings,LLMConfig,EmbeddingConfig,RetrievalConfig,CollectionConfig,HttpConfig,EmbeddingEndpoint,LLMRouterConfig,ChatConfig
+__all__=["Settings","LLMConfig","EmbeddingConfig","RetrievalConfig","CollectionConfig","HttpConfig","EmbeddingEndpoint","LLMRouterConfig","ChatConfig"]
\ No newline at end of file
@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic import BaseModel
 from pydantic_settings import BaseSettings
 
@@ -9,18 +11,85 @@ class LLMConfig(BaseModel):
     provider_type: str
     retry_count: int
     retry_delay: int
+    fallback_model: str = ""  # 其他厂商的服务都失败时由本服务以该模型代答，为空时不参与其他厂商的回退
 
 
-class EmbeddingConfig(BaseModel):
-    api_key: str
+class LLMRouterConfig(BaseModel):
+    fallback: bool = True  # 请求的厂商全部失败后改用配置了 fallback_model 的其他厂商
+    race: bool = False  # 同时向两个服务发送请求，取先返回的结果，调用时可单独指定
+    max_attempts: int = 3  # 单次对话最多尝试的服务数(竞速的两个服务都计入)
+
+
+class EmbeddingEndpoint(BaseModel):
     base_url: str
+    api_key: str = ""  # 为空时使用主端点的 api_key
+    model_name: str = ""  # 该端点上同一模型的名称，为空时与请求的模型名相同；必须是同一个模型
+
+
+class EmbeddingConfig(BaseModel):
+    api_key: str = ""
+    base_url: str = ""
     model_name: str
-    provider_type: str
+    provider_type: str  # siliconflow：OpenAI 兼容的 HTTP 接口；onnx：本地 ONNX Runtime 推理
     retry_count: int
     retry_delay: int
+    cache_path: str = ""  # embedding 磁盘缓存(SQLite)路径，为空时不启用磁盘缓存
+    cache_memory_size: int = 0  # 进程内 LRU 缓存的向量数，0 表示不启用
+    cache_max_entries: int = 1_000_000  # 磁盘缓存最多保存的向量数
+    endpoints: list[EmbeddingEndpoint] = []  # 备用端点，与主端点一起按健康度选择，失败时切换
+    hedge_quantile: float = 0.95  # 查询请求超过首选端点该分位的延迟仍未返回时向另一个端点再发一份，0 表示不对冲；只有一个端点时不对冲
+    hedge_min_delay: float = 0.05  # 对冲等待时间的下限(秒)
+    model_path: str = ""  # onnx: 本地模型目录，包含 model.onnx 与 tokenizer.json
+    pooling: Literal["mean", "cls", "last"] = "mean"  # onnx: 模型只输出逐 token 向量时的池化方式
+    max_length: int = 512  # onnx: 每段文本最多的 token 数，超出部分截断
+    batch_size: int = 32  # onnx: 单次推理的文本数
+    num_threads: int = 0  # onnx: 单次推理使用的线程数，0 表示由 onnxruntime 决定
+    inference_workers: int = 1  # onnx: 同时进行的推理数，多于 1 时宜同时调小 num_threads
+
+
+class HttpConfig(BaseModel):
+    max_connections: int = 100  # 连接池的最大连接数，所有主机合计
+    max_keepalive_connections: int = 20  # 保持空闲以便复用的连接数
+    keepalive_expiry: float = 30.0  # 空闲连接的保持时间(秒)
+    connect_timeout: float = 5.0  # 建立连接的超时(秒)
+    read_timeout: float = 60.0  # 读取响应的超时(秒)，LLM 生成较慢时需要调大
+    write_timeout: float = 30.0  # 发送请求的超时(秒)
+    pool_timeout: float | None = 30.0  # 等待空闲连接的超时(秒)，None 表示一直等待
+    http2: bool = True  # HTTP/2 多路复用，同一主机的并发请求共用少量连接；依赖 httpx[http2]
+
+
+class RetrievalConfig(BaseModel):
+    batch_size: int = 32  # 单批最多合并的检索请求数
+    batch_window_ms: float = 3.0  # 合并检索请求的时间窗口(毫秒)
+    index_load_mode: Literal["memory", "mmap"] = "mmap"  # 索引加载方式
+    reload_interval: float = 10.0  # 检查新索引版本的间隔(秒)，0 表示不热加载
+    rerank: int = 0  # 从索引取出的候选数，用向量存储中的原始向量精确重排后再截取 top_k，0 表示不重排
+    hybrid: bool = True  # 文本查询同时做 BM25 关键词检索，与向量检索结果按倒数排名融合
+
+
+class CollectionConfig(BaseModel):
+    collections: dict[str, str] = {}  # 知识库名称 -> 向量库目录，为空时只使用 faiss_file_location
+    group_collections: dict[str, list[str]] = {}  # 群号 -> 该群检索的知识库名称
+    default_collections: list[str] = []  # 未单独配置的群检索的知识库，为空时检索全部
+    max_loaded: int = 4  # 同时保持加载的知识库数量，超出时卸载最久未使用的
+
+
+class ChatConfig(BaseModel):
+    model_vendors: str = ""  # 回复群消息使用的厂商，为空时不回复
+    model_name: str = ""  # 该厂商的模型名
+    system_prompt: str = ""
+    max_context_length: int = 20  # 每个群保留的上下文消息数(含系统提示词)
+    stream_reply: bool = False  # 流式生成，按句子切分后逐条发送，不必等待完整回答
+    segment_min_chars: int = 50  # 流式回复时单条消息的最少字符数
+    segment_max_chars: int = 500  # 流式回复时单条消息的最多字符数，超出且没有句末标点时强制切分
 
 
 class Settings(BaseSettings):
     llm_settings: list[LLMConfig] = []
+    llm_router_settings: LLMRouterConfig = LLMRouterConfig()
+    http_settings: HttpConfig = HttpConfig()
     embedding_settings: EmbeddingConfig
     faiss_file_location: str = ""
+    retrieval_settings: RetrievalConfig = RetrievalConfig()
+    collection_settings: CollectionConfig = CollectionConfig()
+    chat_settings: ChatConfig = ChatConfig()
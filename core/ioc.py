@@ -1,15 +1,21 @@
 import tomllib
-from typing import Callable
+from typing import AsyncIterable, Callable
 
-import httpx
 from dishka import Provider, Scope, provide
 from fastapi import WebSocket
 
 from config import Settings
+from utils import HttpClientPool
 
 from .model.api import BotApi
-from .model.llm import LLMHandler
-from .model.rag import SearchVectors, SiliconFlowEmbedding
+from .model.llm import GroupChatReplier, LLMHandler
+from .model.rag import (
+    CollectionRegistry,
+    EmbeddingCache,
+    EmbeddingProvider,
+    SearchBatcher,
+    create_embedding_provider,
+)
 
 
 class MyProvider(Provider):
@@ -20,20 +26,76 @@ class MyProvider(Provider):
         return Settings(**toml_data)
 
     @provide(scope=Scope.APP)
-    def get_llm_handler(self, settings: Settings) -> LLMHandler:
-        return LLMHandler.register_instance(settings=settings.llm_settings)
+    async def get_http_pool(self, settings: Settings) -> AsyncIterable[HttpClientPool]:
+        """embedding与LLM服务共用的连接池，容器关闭时释放全部连接。"""
+        pool = HttpClientPool(settings.http_settings)
+        yield pool
+        await pool.aclose()
 
     @provide(scope=Scope.APP)
-    def get_siliconflow_embedding(self, settings: Settings) -> SiliconFlowEmbedding:
-        client = httpx.AsyncClient()
-        return SiliconFlowEmbedding(
-            client=client, embedding_config=settings.embedding_settings
+    def get_llm_handler(
+        self, settings: Settings, http_pool: HttpClientPool
+    ) -> LLMHandler:
+        return LLMHandler.register_instance(
+            settings=settings.llm_settings,
+            http_client=http_pool.client,
+            router_config=settings.llm_router_settings,
         )
 
     @provide(scope=Scope.APP)
-    async def get_search_vectors(self, settings: Settings) -> SearchVectors:
-        return await SearchVectors.create_from_directory(
-            directory=settings.faiss_file_location
+    async def get_embedding_provider(
+        self, settings: Settings, http_pool: HttpClientPool
+    ) -> AsyncIterable[EmbeddingProvider]:
+        """按 embedding_settings.provider_type 选择远程接口或本地模型。"""
+        provider = create_embedding_provider(
+            embedding_config=settings.embedding_settings,
+            client=http_pool.client,
+            cache=EmbeddingCache.from_config(settings.embedding_settings),
+        )
+        yield provider
+        await provider.aclose()
+
+    @provide(scope=Scope.APP)
+    async def get_collection_registry(
+        self, settings: Settings
+    ) -> AsyncIterable[CollectionRegistry]:
+        collection = settings.collection_settings
+        locations = collection.collections or {"default": settings.faiss_file_location}
+        registry = CollectionRegistry(
+            locations=locations,
+            group_collections=collection.group_collections,
+            default_collections=collection.default_collections,
+            max_loaded=collection.max_loaded,
+            load_mode=settings.retrieval_settings.index_load_mode,
+            poll_interval=settings.retrieval_settings.reload_interval,
+            rerank=settings.retrieval_settings.rerank,
+        )
+        yield registry
+        await registry.close()
+
+    @provide(scope=Scope.APP)
+    def get_search_batcher(
+        self,
+        settings: Settings,
+        registry: CollectionRegistry,
+        siliconflow_embedding: EmbeddingProvider,
+    ) -> SearchBatcher:
+        retrieval = settings.retrieval_settings
+        return SearchBatcher(
+            search_vectors=registry,
+            siliconflow_embedding=siliconflow_embedding,
+            model=settings.embedding_settings.model_name,
+            max_batch_size=retrieval.batch_size,
+            max_delay=retrieval.batch_window_ms / 1000,
+            hybrid=retrieval.hybrid,
+        )
+
+    @provide(scope=Scope.APP)
+    def get_chat_replier(
+        self, settings: Settings, llm_handler: LLMHandler
+    ) -> GroupChatReplier:
+        return GroupChatReplier(
+            llm_handler=llm_handler, chat_config=settings.chat_settings
         )
 
     @provide(scope=Scope.SESSION)
@@ -1,4 +1,4 @@
-from typing import Any, overload
+from typing import Any, AsyncIterable, overload
 
 from fastapi import WebSocket
 
@@ -57,3 +57,30 @@ class BotApi:
             params=GroupMessageParams(group_id=group_id, message=message_segment)
         )
         await self.websocket.send_text(payload.model_dump_json())
+
+    async def send_group_msg_stream(
+        self,
+        group_id: str | int,
+        segments: AsyncIterable[str],
+        reply: str | int | None = None,
+    ) -> str:
+        """逐条发送流式生成的文本片段，每个片段一条群消息。
+
+        Args:
+            group_id: 群号。
+            segments: 待发送的文本片段，通常由 segment_stream 按句子切分得到。
+            reply: 回复的消息id，只附加在第一条消息上。
+
+        Returns:
+            已发送的全部文本，各片段之间以换行连接。
+        """
+        sent = []
+        async for segment in segments:
+            if not sent and reply is not None:
+                await self.send_group_msg(
+                    group_id, message_segment=[Reply.new(reply), Text.new(segment)]
+                )
+            else:
+                await self.send_group_msg(group_id, message_segment=[Text.new(segment)])
+            sent.append(segment)
+        return "\n".join(sent)
@@ -1,2 +1,5 @@
+from .chat_reply import GroupChatReplier
+from .context_handler import ContextStateMachine
 from .llm_handler import LLMHandler
-__all__=["LLMHandler"]
\ No newline at end of file
+from .segmenter import SentenceSegmenter, segment_stream
+__all__=["ContextStateMachine","GroupChatReplier","LLMHandler","SentenceSegmenter","segment_stream"]
\ No newline at end of file
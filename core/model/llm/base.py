@@ -1,11 +1,15 @@
 from abc import ABC, abstractmethod
-from typing import Literal
+from typing import AsyncGenerator, Literal
 from openai import APIConnectionError, APITimeoutError, RateLimitError
 from pydantic import BaseModel, ConfigDict, model_validator
 from utils import create_retry_manager
 from config import LLMConfig
 
 
+class EmptyResponseError(ValueError):
+    """服务返回了空内容。"""
+
+
 class ChatMessage(BaseModel):
     role: Literal["system", "user", "assistant"]
     text: str | None = None
@@ -32,11 +36,21 @@ class LLMProvider(ABC):
     ) -> str:
         pass
 
+    async def stream_ai_response(
+        self,
+        messages: list,
+        model: str,
+        **kwargs,
+    ) -> AsyncGenerator[str, None]:
+        """逐段返回生成的文本，默认实现在完整生成后一次性返回。"""
+        yield await self.get_ai_response(messages=messages, model=model, **kwargs)
+
 
 class LLMProviderWrapper(BaseModel):
     model_config = ConfigDict(arbitrary_types_allowed=True)
     model_vendors: str
     provider: LLMProvider
+    fallback_model: str = ""  # 为其他厂商回退代答时使用的模型，为空时不参与回退
 
 
 class ResilientLLMProvider(LLMProvider):
@@ -62,3 +76,46 @@ class ResilientLLMProvider(LLMProvider):
                 )
                 return response
         raise RuntimeError("Retries exhausted") # 规避下类型检查,这行是死代码
+
+    async def _open_stream(
+        self, messages: list[ChatMessage], model: str, **kwargs
+    ) -> tuple[str, AsyncGenerator[str, None]]:
+        """开始流式生成并取得第一段文本，此前的失败与空输出可以重试。"""
+        retrier = create_retry_manager(
+            retry_count=self.llm_config.retry_count,
+            retry_delay=self.llm_config.retry_delay,
+            error_types=(
+                RateLimitError,
+                APIConnectionError,
+                APITimeoutError,
+                EmptyResponseError,
+            ),
+        )
+        async for attempt in retrier:
+            with attempt:
+                stream = self.inner_provider.stream_ai_response(
+                    messages=messages, model=model, **kwargs
+                )
+                try:
+                    first = await anext(stream, "")
+                    if not first:  # 与路由器一致，空输出视为失败
+                        raise EmptyResponseError("流式生成没有返回内容")
+                except BaseException:
+                    await stream.aclose()  # 重试前释放本次的连接
+                    raise
+                return first, stream
+        raise RuntimeError("Retries exhausted") # 规避下类型检查,这行是死代码
+
+    async def stream_ai_response(
+        self, messages: list[ChatMessage], model: str, **kwargs
+    ) -> AsyncGenerator[str, None]:
+        """流式生成。只在第一段文本返回前重试，之后的失败直接抛出，避免重复输出。"""
+        first, stream = await self._open_stream(
+            messages=messages, model=model, **kwargs
+        )
+        try:
+            yield first
+            async for delta in stream:
+                yield delta
+        finally:
+            await stream.aclose()
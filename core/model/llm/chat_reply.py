@@ -0,0 +1,119 @@
+"""群聊回复模块。
+
+以群为单位维护对话上下文，请求 LLM 后回复群消息。开启 stream_reply 时流式生成，
+按句子切分后逐条发送，第一句生成后即可发出，不必等待完整的回答。
+"""
+
+import asyncio
+
+from config import ChatConfig
+from log import get_logger
+
+from ..api import BotApi
+from ..api.base import Reply, Text
+from .context_handler import ContextStateMachine
+from .llm_handler import LLMHandler
+from .segmenter import segment_stream
+
+logger = get_logger(__name__)
+
+
+class GroupChatReplier:
+    """按群维护上下文并回复群消息。
+
+    Args:
+        llm_handler: LLM 服务。
+        chat_config: 回复使用的模型、系统提示词与流式回复配置。
+    """
+
+    def __init__(self, llm_handler: LLMHandler, chat_config: ChatConfig) -> None:
+        self.llm_handler = llm_handler
+        self.chat_config = chat_config
+        self.contexts: dict[int | str, ContextStateMachine] = {}
+        self.locks: dict[int | str, asyncio.Lock] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    def _context(self, group_id: int | str) -> ContextStateMachine:
+        context = self.contexts.get(group_id)
+        if context is None:
+            context = ContextStateMachine(
+                system_prompt=self.chat_config.system_prompt,
+                max_context_length=self.chat_config.max_context_length,
+            )
+            self.contexts[group_id] = context
+        return context
+
+    def reply_in_background(
+        self, bot: BotApi, group_id: int | str, text: str, reply: int | str | None
+    ) -> asyncio.Task:
+        """在后台任务中回复，调用方可以继续接收其他消息；失败时记录日志。"""
+        task = asyncio.create_task(self._reply_logged(bot, group_id, text, reply))
+        self._tasks.add(task)  # 保留引用，避免任务被垃圾回收
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _reply_logged(
+        self, bot: BotApi, group_id: int | str, text: str, reply: int | str | None
+    ) -> None:
+        try:
+            await self.reply(bot=bot, group_id=group_id, text=text, reply=reply)
+        except Exception as e:
+            logger.error(f"回复群 {group_id} 的消息失败: {e}")
+
+    async def reply(
+        self, bot: BotApi, group_id: int | str, text: str, reply: int | str | None
+    ) -> str | None:
+        """回复一条群消息，返回发送的文本；未配置回复模型时不回复并返回 None。
+
+        同一个群的回复依次进行，上下文中的问答不会交错。
+
+        Args:
+            bot: 发送消息的接口。
+            group_id: 群号。
+            text: 群成员发送的文本。
+            reply: 被回复的消息id，附加在（第一条）回复消息上。
+        """
+        if not self.chat_config.model_vendors:
+            return None
+        lock = self.locks.setdefault(group_id, asyncio.Lock())
+        async with lock:
+            return await self._reply(bot, group_id, text, reply)
+
+    async def _reply(
+        self, bot: BotApi, group_id: int | str, text: str, reply: int | str | None
+    ) -> str:
+        config = self.chat_config
+        context = self._context(group_id)
+        context.build_chatmessage(role="user", text=text)
+        messages = list(context.messages_lst)
+        if config.stream_reply:
+            deltas = self.llm_handler.stream_ai_text_response(
+                messages=messages,
+                model_vendors=config.model_vendors,
+                model_name=config.model_name,
+            )
+            try:
+                answer = await bot.send_group_msg_stream(
+                    group_id,
+                    segment_stream(
+                        deltas,
+                        min_chars=config.segment_min_chars,
+                        max_chars=config.segment_max_chars,
+                    ),
+                    reply=reply,
+                )
+            finally:
+                await deltas.aclose()
+        else:
+            answer = await self.llm_handler.get_ai_text_response(
+                messages=messages,
+                model_vendors=config.model_vendors,
+                model_name=config.model_name,
+            )
+            segments = [Text.new(answer)]
+            if reply is not None:
+                segments.insert(0, Reply.new(reply))
+            await bot.send_group_msg(group_id, message_segment=segments)
+        if answer:
+            context.build_chatmessage(role="assistant", text=answer)
+        return answer
@@ -1,5 +1,5 @@
 from typing import Literal
-from base import ChatMessage
+from .base import ChatMessage
 
 
 class ContextStateMachine:
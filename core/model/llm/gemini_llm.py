@@ -1,4 +1,4 @@
-from typing import cast
+from typing import AsyncGenerator, cast
 
 from google import genai
 from google.genai import types
@@ -54,3 +54,22 @@ class GeminiAIService(LLMProvider):
         )
         content = response.text
         return content  # type: ignore
+
+    async def stream_ai_response(
+        self,
+        messages: list[ChatMessage],
+        model: str,
+        **kwargs,
+    ) -> AsyncGenerator[str, None]:
+        chat_messages, system_prompt = self._format_chat_messages(messages=messages)
+        stream = await self.client.aio.models.generate_content_stream(
+            model=model,
+            contents=chat_messages,
+            config=types.GenerateContentConfig(
+                system_instruction=system_prompt,
+                temperature=1,
+            ),
+        )
+        async for chunk in stream:
+            if chunk.text:
+                yield chunk.text
@@ -1,31 +1,56 @@
+import httpx
 from google import genai
 from google.genai import types
 from openai import AsyncOpenAI
-from typing import Self
-from config import  LLMConfig
+from typing import AsyncGenerator, Self
+from config import  LLMConfig, LLMRouterConfig
 
 from .base import ChatMessage, LLMProviderWrapper, ResilientLLMProvider
 from .gemini_llm import GeminiAIService
 from .openai_llm import OpenAIService
+from .router import LLMRouter
 
 
 class LLMHandler:
-    def __init__(self, services: list[LLMProviderWrapper]) -> None:
+    def __init__(
+        self,
+        services: list[LLMProviderWrapper],
+        router_config: LLMRouterConfig | None = None,
+    ) -> None:
         self.services = services
+        self.router = LLMRouter(
+            services=services, config=router_config or LLMRouterConfig()
+        )
 
     @classmethod
-    def register_instance(cls, settings: list[LLMConfig]) -> Self:
-        """注册实例"""
+    def register_instance(
+        cls,
+        settings: list[LLMConfig],
+        http_client: httpx.AsyncClient | None = None,
+        router_config: LLMRouterConfig | None = None,
+    ) -> Self:
+        """注册实例
+
+        Args:
+            settings: 各服务商的配置，同一厂商可以配置多个key或端点。
+            http_client: 共享的HTTP客户端，传入时所有服务商复用其连接池与超时设置，
+                为None时各SDK自行创建客户端。
+            router_config: 回退与竞速配置，为None时使用默认配置。
+        """
         services = []
         model_map = {
             "openai": lambda api_key, base_url: OpenAIService(
-                client=AsyncOpenAI(api_key=api_key, base_url=base_url)
+                client=AsyncOpenAI(
+                    api_key=api_key, base_url=base_url, http_client=http_client
+                )
             ),
             "gemini": lambda api_key, base_url: GeminiAIService(
                 client=genai.Client(
                     api_key=api_key,
-                    http_options=types.HttpOptions(base_url=base_url)
-                    if base_url
+                    http_options=types.HttpOptions(
+                        base_url=base_url or None, httpx_async_client=http_client
+                    )
+                    if base_url or http_client
                     else None,
                 )
             ),
@@ -41,21 +66,43 @@ class LLMHandler:
             wrapper = LLMProviderWrapper(
                 model_vendors=model_config.model_vendors,
                 provider=safe_service,
+                fallback_model=model_config.fallback_model,
             )
             services.append(wrapper)
-        return cls(services=services)
+        return cls(services=services, router_config=router_config)
 
     async def get_ai_text_response(
         self,
         messages: list[ChatMessage],
         model_vendors: str,
         model_name: str,
+        race: bool | None = None,
         **kwargs,
     ) -> str:
-        for llm in self.services:
-            if llm.model_vendors != model_vendors:
-                continue
-            return await llm.provider.get_ai_response(
-                messages=messages, model=model_name
-            )
-        raise ValueError(f"未定义的服务商名:{model_vendors}")
+        """由路由器选择该厂商最健康的服务，失败时回退到其他服务。
+
+        Args:
+            race: 是否同时请求两个服务并取先返回者，适合对延迟敏感的对话，
+                为None时使用配置。
+        """
+        return await self.router.route(
+            messages=messages,
+            model_vendors=model_vendors,
+            model_name=model_name,
+            race=race,
+        )
+
+    def stream_ai_text_response(
+        self,
+        messages: list[ChatMessage],
+        model_vendors: str,
+        model_name: str,
+        **kwargs,
+    ) -> AsyncGenerator[str, None]:
+        """流式生成，逐段返回文本；只在第一段文本返回前回退到其他服务。
+
+        调用方提前结束时应关闭返回的生成器，以便及时释放连接。
+        """
+        return self.router.stream(
+            messages=messages, model_vendors=model_vendors, model_name=model_name
+        )
@@ -1,4 +1,5 @@
 import base64
+from typing import AsyncGenerator
 
 from openai import AsyncOpenAI
 from openai.types.chat import ChatCompletionMessageParam
@@ -45,3 +46,22 @@ class OpenAIService(LLMProvider):
         )
         content = response.choices[0].message.content
         return content  # type:ignore
+
+    async def stream_ai_response(
+        self,
+        messages: list[ChatMessage],
+        model: str,
+        **kwargs,
+    ) -> AsyncGenerator[str, None]:
+        chat_messages = self._format_chat_messages(messages)
+        stream = await self.client.chat.completions.create(
+            model=model,
+            messages=chat_messages,
+            stream=True,
+        )
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            await stream.close()  # 提前结束时关闭连接
@@ -0,0 +1,303 @@
+"""LLM 服务路由模块。
+
+按厂商建立服务索引，每个服务记录指数加权的延迟、成功率与进行中的请求数。
+同一厂商有多个服务（多个 key 或端点）时用 power-of-two-choices 选择：随机取两个，
+用代价较低的一个，既偏向快而稳定的服务，又不会让所有请求同时涌向同一个服务。
+失败时依次改用同厂商的其他服务与配置了 fallback_model 的其他厂商；
+竞速模式同时请求前两个候选，取先返回的结果并取消另一个。
+流式请求只在第一段文本返回前回退，不参与竞速。
+"""
+
+import asyncio
+import random
+import time
+from typing import AsyncGenerator
+
+from pydantic import BaseModel
+
+from config import LLMRouterConfig
+from log import get_logger
+
+from .base import ChatMessage, EmptyResponseError, LLMProviderWrapper
+
+logger = get_logger(__name__)
+
+_SUCCESS_ALPHA = 0.2  # 成功率的指数加权系数
+_LATENCY_ALPHA = 0.2
+_LATENCY_FLOOR = 0.001  # 计算代价时的最小延迟(秒)，让进行中的请求数在新服务上也起作用
+_FAILURES_BEFORE_COOLDOWN = 2
+_BASE_COOLDOWN = 5.0  # 秒
+_MAX_COOLDOWN = 300.0
+
+
+class ProviderStats(BaseModel):
+    model_vendors: str
+    success_rate: float
+    latency: float  # 指数加权的平均延迟（秒）
+    in_flight: int
+    consecutive_failures: int
+    cooling_down: bool
+
+
+class ProviderHealth:
+    """单个服务的健康状态。"""
+
+    def __init__(self) -> None:
+        self.success_rate = 1.0
+        self.latency = 0.0
+        self.samples = 0
+        self.in_flight = 0
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+
+    def available(self, now: float) -> bool:
+        return now >= self.cooldown_until
+
+    def cost(self) -> float:
+        """预期的等待代价：延迟乘以排队的请求数，再按成功率放大。
+
+        尚无样本的服务按最小延迟计算，会被优先试用。
+        """
+        latency = max(self.latency, _LATENCY_FLOOR)
+        return latency * (1 + self.in_flight) / max(self.success_rate, 0.01)
+
+    def on_success(self, latency: float) -> None:
+        self.success_rate += _SUCCESS_ALPHA * (1.0 - self.success_rate)
+        if self.samples:
+            self.latency += _LATENCY_ALPHA * (latency - self.latency)
+        else:
+            self.latency = latency
+        self.samples += 1
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+
+    def on_failure(self, now: float) -> None:
+        self.success_rate -= _SUCCESS_ALPHA * self.success_rate
+        self.consecutive_failures += 1
+        extra = self.consecutive_failures - _FAILURES_BEFORE_COOLDOWN
+        if extra >= 0:
+            self.cooldown_until = now + min(_BASE_COOLDOWN * 2**extra, _MAX_COOLDOWN)
+
+
+class LLMRouter:
+    """在多个 LLM 服务之间路由对话请求。
+
+    Args:
+        services: 全部服务，同一厂商可以有多个。
+        config: 回退与竞速配置。
+        rng: 随机数生成器，用于 power-of-two-choices。
+    """
+
+    def __init__(
+        self,
+        services: list[LLMProviderWrapper],
+        config: LLMRouterConfig,
+        rng: random.Random | None = None,
+    ) -> None:
+        self.services = services
+        self.config = config
+        self.rng = rng or random.Random()
+        self.health = [ProviderHealth() for _ in services]
+        self.by_vendor: dict[str, list[int]] = {}
+        for i, service in enumerate(services):
+            self.by_vendor.setdefault(service.model_vendors, []).append(i)
+        self.fallbacks = [i for i, s in enumerate(services) if s.fallback_model]
+
+    def _order(self, indices: list[int], now: float) -> list[int]:
+        """可用的服务按代价排序，冷却中的排在最后。"""
+        return sorted(
+            indices,
+            key=lambda i: (not self.health[i].available(now), self.health[i].cost()),
+        )
+
+    def candidates(self, model_vendors: str) -> list[int]:
+        """返回依次尝试的服务序号。
+
+        依次为两个随机候选中代价较低者、同厂商的其余服务、其他厂商的回退服务，
+        最多 max_attempts 个。
+
+        Raises:
+            ValueError: 没有该厂商的服务。
+        """
+        own = self.by_vendor.get(model_vendors)
+        if not own:
+            raise ValueError(f"未定义的服务商名:{model_vendors}")
+        now = time.monotonic()
+        ranked = self._order(own, now)
+        usable = [i for i in ranked if self.health[i].available(now)]
+        if len(usable) >= 2:
+            a, b = self.rng.sample(usable, 2)
+            best = min(a, b, key=lambda i: self.health[i].cost())
+            ranked.remove(best)
+            ranked.insert(0, best)
+        if self.config.fallback:
+            others = [
+                i
+                for i in self.fallbacks
+                if self.services[i].model_vendors != model_vendors
+            ]
+            ranked += self._order(others, now)
+        return ranked[: max(self.config.max_attempts, 1)]
+
+    async def _call(
+        self,
+        index: int,
+        messages: list[ChatMessage],
+        model_vendors: str,
+        model_name: str,
+    ) -> str:
+        service = self.services[index]
+        health = self.health[index]
+        model = (
+            model_name
+            if service.model_vendors == model_vendors
+            else service.fallback_model
+        )
+        health.in_flight += 1
+        start = time.monotonic()
+        try:
+            response = await service.provider.get_ai_response(
+                messages=messages, model=model
+            )
+            if not response:
+                raise EmptyResponseError(f"{service.model_vendors} 返回了空内容")
+        except Exception:
+            health.on_failure(time.monotonic())
+            raise
+        finally:
+            health.in_flight -= 1
+        health.on_success(time.monotonic() - start)
+        return response
+
+    async def _race(
+        self,
+        pair: list[int],
+        messages: list[ChatMessage],
+        model_vendors: str,
+        model_name: str,
+    ) -> str:
+        """同时请求两个服务，返回先成功的结果；两个都失败时抛出最后一个异常。"""
+        pending = {
+            asyncio.create_task(self._call(i, messages, model_vendors, model_name))
+            for i in pair
+        }
+        error: BaseException | None = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            assert error is not None
+            raise error
+        finally:
+            for task in pending:  # 较慢的一方被取消，不计入健康度
+                task.cancel()
+
+    async def route(
+        self,
+        messages: list[ChatMessage],
+        model_vendors: str,
+        model_name: str,
+        race: bool | None = None,
+    ) -> str:
+        """按健康度选择服务完成对话，失败时依次回退。
+
+        Args:
+            messages: 对话消息。
+            model_vendors: 请求的厂商。
+            model_name: 该厂商的模型名，回退到其他厂商时改用其 fallback_model。
+            race: 是否同时请求前两个候选，为 None 时使用配置。
+
+        Raises:
+            ValueError: 没有该厂商的服务。
+            Exception: 所有候选都失败时抛出最后一个服务的异常。
+        """
+        queue = self.candidates(model_vendors)
+        if race is None:
+            race = self.config.race
+        error: Exception | None = None
+        if race and len(queue) >= 2:
+            pair, queue = queue[:2], queue[2:]
+            try:
+                return await self._race(pair, messages, model_vendors, model_name)
+            except Exception as e:
+                error = e
+                logger.warning(f"竞速的两个服务均失败: {e}")
+        for index in queue:
+            try:
+                return await self._call(index, messages, model_vendors, model_name)
+            except Exception as e:
+                error = e
+                logger.warning(
+                    f"{self.services[index].model_vendors} 服务失败，尝试下一个: {e}"
+                )
+        assert error is not None
+        raise error
+
+    async def stream(
+        self,
+        messages: list[ChatMessage],
+        model_vendors: str,
+        model_name: str,
+    ) -> AsyncGenerator[str, None]:
+        """流式完成对话，按与 route 相同的顺序选择服务。
+
+        第一段文本返回前失败时改用下一个候选；已经输出文本后失败则直接抛出，
+        以免不同服务的回答拼接在一起。健康度按完整生成的耗时记录。
+
+        Raises:
+            ValueError: 没有该厂商的服务。
+            Exception: 所有候选都在输出前失败，或输出中途失败。
+        """
+        error: Exception | None = None
+        for index in self.candidates(model_vendors):
+            service = self.services[index]
+            health = self.health[index]
+            model = (
+                model_name
+                if service.model_vendors == model_vendors
+                else service.fallback_model
+            )
+            health.in_flight += 1
+            start = time.monotonic()
+            started = False
+            stream = service.provider.stream_ai_response(messages=messages, model=model)
+            try:
+                async for delta in stream:
+                    started = True
+                    yield delta
+            except Exception as e:
+                health.on_failure(time.monotonic())
+                if started:
+                    raise
+                error = e
+                logger.warning(f"{service.model_vendors} 服务失败，尝试下一个: {e}")
+                continue
+            finally:
+                health.in_flight -= 1
+                await stream.aclose()
+            if started:
+                health.on_success(time.monotonic() - start)
+                return
+            health.on_failure(time.monotonic())
+            error = EmptyResponseError(f"{service.model_vendors} 返回了空内容")
+        assert error is not None
+        raise error
+
+    def stats(self) -> list[ProviderStats]:
+        now = time.monotonic()
+        return [
+            ProviderStats(
+                model_vendors=service.model_vendors,
+                success_rate=health.success_rate,
+                latency=health.latency,
+                in_flight=health.in_flight,
+                consecutive_failures=health.consecutive_failures,
+                cooling_down=not health.available(now),
+            )
+            for service, health in zip(self.services, self.health)
+        ]
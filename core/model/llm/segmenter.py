@@ -0,0 +1,84 @@
+"""流式回复分段模块。
+
+把 LLM 逐段生成的文本按句子边界切分成适合单条群消息发送的片段：
+攒够 min_chars 个字符后在最后一个句末标点处切分，超过 max_chars 仍没有句末标点时
+退而在逗号等停顿处或直接按长度切分，生成结束后发送剩余的文本。
+"""
+
+import re
+from typing import AsyncIterable, AsyncIterator
+
+# 句末标点(可带后随的引号或括号)，英文句点需后随空白以免切开小数与网址
+_SENTENCE_END = re.compile(r"(?:[。！？!?；;…]+|\.(?=\s)|\n)[”’\"'）)」』]*")
+_SOFT_BREAK = re.compile(r"[，,、：:\s]")
+
+
+class SentenceSegmenter:
+    """按句子边界切分流式文本。
+
+    Args:
+        min_chars: 片段的最少字符数，不足时继续等待后续文本。
+        max_chars: 片段的最多字符数，超出且没有句末标点时强制切分。
+
+    Raises:
+        ValueError: min_chars 小于 1 或大于 max_chars。
+    """
+
+    def __init__(self, min_chars: int = 50, max_chars: int = 500) -> None:
+        if not 0 < min_chars <= max_chars:
+            raise ValueError(f"片段长度范围无效: {min_chars}-{max_chars}")
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self.buffer = ""
+
+    def _cut(self) -> int:
+        """返回可以切出的片段长度，不能切分时返回 0。"""
+        window = self.buffer[: self.max_chars]
+        end = 0
+        for match in _SENTENCE_END.finditer(window):
+            if match.end() >= self.min_chars:
+                end = match.end()
+        if end:
+            return end
+        if len(self.buffer) <= self.max_chars:
+            return 0
+        soft = [
+            m.end() for m in _SOFT_BREAK.finditer(window) if m.end() >= self.min_chars
+        ]
+        return soft[-1] if soft else self.max_chars
+
+    def feed(self, delta: str) -> list[str]:
+        """加入新生成的文本，返回已经可以发送的片段。"""
+        self.buffer += delta
+        segments = []
+        while (end := self._cut()) > 0:
+            segment = self.buffer[:end].strip()
+            self.buffer = self.buffer[end:]
+            if segment:
+                segments.append(segment)
+        return segments
+
+    def flush(self) -> str | None:
+        """返回剩余的文本，生成结束时调用。"""
+        segment = self.buffer.strip()
+        self.buffer = ""
+        return segment or None
+
+
+async def segment_stream(
+    deltas: AsyncIterable[str], min_chars: int = 50, max_chars: int = 500
+) -> AsyncIterator[str]:
+    """把逐段生成的文本转换为按句子切分的片段。
+
+    Args:
+        deltas: LLM 流式生成的文本。
+        min_chars: 片段的最少字符数。
+        max_chars: 片段的最多字符数。
+    """
+    segmenter = SentenceSegmenter(min_chars=min_chars, max_chars=max_chars)
+    async for delta in deltas:
+        for segment in segmenter.feed(delta):
+            yield segment
+    rest = segmenter.flush()
+    if rest:
+        yield rest
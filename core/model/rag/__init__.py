@@ -1,12 +1,32 @@
-from .base import VectorizeConfig
+from .base import EmbeddingProvider, SearchResult, VectorizeConfig
+from .collection_registry import CollectionRegistry
+from .embedding_cache import EmbeddingCache
+from .embedding_provider import create_embedding_provider
+from .index_reloader import ReloadableSearchVectors
+from .onnx_embedding import OnnxEmbedding
+from .rate_limiter import AdaptiveRateLimiter, RateLimitConfig
 from .rag_pipeline import search_vectors, vectorize_text
+from .search_batcher import SearchBatcher
 from .siliconflow_embedding import SiliconFlowEmbedding
 from .search_vectors import SearchVectors
+from .vector_store import VectorStore, VectorStoreWriter
 
 __all__ = [
+    "EmbeddingProvider",
     "SiliconFlowEmbedding",
+    "OnnxEmbedding",
+    "create_embedding_provider",
+    "EmbeddingCache",
     "vectorize_text",
     "search_vectors",
     "VectorizeConfig",
     "SearchVectors",
+    "SearchResult",
+    "SearchBatcher",
+    "ReloadableSearchVectors",
+    "CollectionRegistry",
+    "VectorStore",
+    "VectorStoreWriter",
+    "AdaptiveRateLimiter",
+    "RateLimitConfig",
 ]
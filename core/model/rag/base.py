@@ -1,14 +1,104 @@
-from pydantic import BaseModel
+from abc import ABC, abstractmethod
 
+import numpy as np
+from pydantic import BaseModel, ConfigDict
+
+from .embedding_cache import EmbeddingCache
+from .index_builder import IndexBuildConfig
+from .vector_store import StorageDtype
+
+
+class EmbeddingBatch(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+    texts: list[str]
+    vectors: np.ndarray  # 形状为 (len(texts), dim) 的 float32 数组
+
+
+class SearchResult(BaseModel):
+    text: str
+    score: float  # 与查询向量的余弦相似度，只由关键词检索命中时为 0.0
+    chunk_id: int  # 文本块在向量存储中的行号
+    lexical_score: float | None = None  # BM25 分数，未被关键词检索命中时为 None
+    fused_score: float | None = None  # 混合检索的倒数排名融合分数，结果按此排序
+    source: str | None = None  # 来源文件相对路径，旧索引没有来源信息时为 None
+    offset: int | None = None  # 文本块在规范化后源文本中的 UTF-8 字节偏移
+    ordinal: int | None = None  # 文本块在来源文件中的序号
+    collection: str | None = None  # 多知识库检索时结果所属的知识库
 
-class VectorStorage(BaseModel):
-    name:str
-    vectors:list[float]
-    
 
 class VectorizeConfig(BaseModel):
-    tokens_per_minute:int=60
+    tokens_per_minute:int=60  # 每分钟允许的API调用次数
+    text_tokens_per_minute:int=0  # 每分钟允许的文本token数，0表示不限制
+    burst_seconds:float=1.0  # 限流令牌桶容量，相当于多少秒的配额
+    adaptive_rate_limit:bool=True  # 根据429与Retry-After自动降速，成功后逐步回升
     consumer_count: int=60
     min_chunk_size:int=1000
     max_chunk_size:int=1200
-    max_line:int=10
\ No newline at end of file
+    source_patterns:list[str]=["*.txt"]  # 源文件匹配模式，可加入*.md、*.jsonl、*.txt.gz等
+    read_concurrency:int=8  # 同时读取的源文件数量
+    chunk_workers:int=0  # 切分文本的进程数，0表示在线程中逐个文件切分
+    near_dup_threshold:float=0  # 近似重复的Jaccard相似度阈值(字符三元组)，近似重复的文本块复用代表文本块的向量、不再单独入库；0表示只去除完全相同的文本块
+    max_line:int=10  # 单次请求最多的文本块数量
+    queue_size:int=0  # 流水线任务队列与结果队列各自缓存的批次数，0表示取consumer_count
+    max_batch_tokens:int=0  # 单次请求的文本token预算(估算)，0表示只按条数分批
+    add_block_size:int=65536  # 构建索引时每次从存储中复制的向量行数
+    vector_dtype:StorageDtype="float32"  # 新建向量存储的类型：float32、float16或int8(逐行标量量化)
+    incremental:bool=False  # 只向量化新增或变化的文本块，并在已有索引上增删向量
+    compact_threshold:float=0.3  # 向量存储中不再被引用的行超过该比例时压缩存储并全量重建索引，0表示不压缩
+    index:IndexBuildConfig=IndexBuildConfig()
+    journal_fsync:bool=False  # 记录批次提交点前将向量存储同步到磁盘，断电也不丢失已提交的批次
+    keep_generations:int=3  # 保留的索引版本数量，正在服务的进程可继续使用旧版本
+    lexical_index:bool=True  # 同时构建BM25倒排索引，检索时与向量检索结果融合
+
+
+class EmbeddingProvider(ABC):
+    """所有 embedding 后端必须继承的基类。
+
+    get_embedding 返回 OpenAI 兼容的响应结构 {"model": ..., "data": [{"index": ..., "embedding": [...]}]}；
+    配置了缓存时先查缓存，只为未命中的文本调用后端，后端返回的向量数量不符时抛出 ValueError。
+
+    Args:
+        cache: embedding 缓存，为 None 时不缓存。
+    """
+
+    def __init__(self, cache: EmbeddingCache | None = None) -> None:
+        self.cache = cache
+
+    @abstractmethod
+    async def _embed(self, model: str, text: str | list[str], **kwargs) -> dict:
+        """调用后端获取向量，返回与 get_embedding 相同的响应结构。"""
+
+    async def get_embedding(
+        self,
+        model: str,
+        text: str | list[str],
+        **kwargs,
+    ) -> dict:
+        if self.cache is None:
+            return await self._embed(model=model, text=text, **kwargs)
+        texts = [text] if isinstance(text, str) else text
+        cached = await self.cache.get_many(model=model, texts=texts)
+        missing = [i for i, v in enumerate(cached) if v is None]
+        if missing:
+            miss_texts = [texts[i] for i in missing]
+            response = await self._embed(model=model, text=miss_texts, **kwargs)
+            data: list[dict] = sorted(response.get("data", []), key=lambda x: x["index"])
+            if len(data) != len(miss_texts):
+                # 响应只覆盖未命中的文本，下标也相对于它们，原样返回会让调用方把向量对应到错误的文本
+                raise ValueError(
+                    f"返回向量数量 {len(data)} 与未命中缓存的文本数量 {len(miss_texts)} 不一致"
+                )
+            vectors = np.array([item["embedding"] for item in data], dtype=np.float32)
+            await self.cache.put_many(model=model, texts=miss_texts, vectors=vectors)
+            for i, vector in zip(missing, vectors):
+                cached[i] = vector
+        return {
+            "model": model,
+            "data": [
+                {"index": i, "embedding": vector.tolist()}  # type: ignore
+                for i, vector in enumerate(cached)
+            ],
+        }
+
+    async def aclose(self) -> None:
+        """释放后端持有的资源，默认无需释放。"""
@@ -0,0 +1,109 @@
+"""embedding 请求分批模块。
+
+按单次请求的条数上限与文本 token 预算把文本块装箱，
+短文本块因此可以合并成更少、更满的请求；同时统计各批次的填充率。
+"""
+
+from typing import Iterable, Iterator
+
+from pydantic import BaseModel
+
+from .rate_limiter import estimate_tokens
+
+
+class BatchStats(BaseModel):
+    max_items: int
+    max_tokens: int = 0
+    batches: int = 0
+    items: int = 0
+    tokens: int = 0
+    splits: int = 0  # 失败后二分拆分的次数
+    dropped: int = 0  # 单条仍然失败而放弃的文本块数
+    fill_ratios: list[float] = []
+
+    def record(self, batch: list[str]) -> None:
+        """记录一次实际发送的请求。"""
+        count, tokens = len(batch), estimate_tokens(batch)
+        self.batches += 1
+        self.items += count
+        self.tokens += tokens
+        ratio = count / self.max_items
+        if self.max_tokens > 0:
+            ratio = max(ratio, tokens / self.max_tokens)
+        self.fill_ratios.append(min(ratio, 1.0))
+
+    def summary(self) -> str:
+        if not self.batches:
+            return "没有发送embedding请求"
+        ratios = sorted(self.fill_ratios)
+        mean = sum(ratios) / len(ratios)
+        p10 = ratios[len(ratios) // 10]
+        return (
+            f"共 {self.batches} 个批次, {self.items} 个文本块, 约 {self.tokens} 个token; "
+            f"平均每批 {self.items / self.batches:.1f} 条, "
+            f"填充率 平均 {mean:.0%} / P10 {p10:.0%}; "
+            f"二分拆分 {self.splits} 次, 放弃 {self.dropped} 个文本块"
+        )
+
+
+class BatchPacker:
+    """增量装箱器，供流式输入逐个加入文本块。
+
+    批次达到 max_items 条，或再加入下一个文本块会超出 max_tokens 时开始新批次；
+    单个文本块超出预算时独占一个批次。
+
+    Args:
+        max_items: 单批最多的文本块数量。
+        max_tokens: 单批文本token预算（估算值），0 表示只按条数分批。
+    """
+
+    def __init__(self, max_items: int, max_tokens: int = 0) -> None:
+        self.max_items = max_items
+        self.max_tokens = max_tokens
+        self._batch: list[str] = []
+        self._tokens = 0
+
+    def add(self, chunk: str) -> list[str] | None:
+        """加入一个文本块，返回因此装满的上一个批次（没有则返回 None）。"""
+        tokens = estimate_tokens(chunk) if self.max_tokens > 0 else 0
+        full: list[str] | None = None
+        if self._batch and (
+            len(self._batch) >= self.max_items
+            or (self.max_tokens > 0 and self._tokens + tokens > self.max_tokens)
+        ):
+            full = self.flush()
+        self._batch.append(chunk)
+        self._tokens += tokens
+        return full
+
+    def flush(self) -> list[str] | None:
+        """取出当前未满的批次。"""
+        if not self._batch:
+            return None
+        batch, self._batch, self._tokens = self._batch, [], 0
+        return batch
+
+
+def pack_batches(
+    chunks: Iterable[str],
+    max_items: int,
+    max_tokens: int = 0,
+) -> Iterator[list[str]]:
+    """按顺序把文本块装入批次。
+
+    Args:
+        chunks: 待分批的文本块。
+        max_items: 单批最多的文本块数量。
+        max_tokens: 单批文本token预算（估算值），0 表示只按条数分批。
+
+    Yields:
+        文本块批次。
+    """
+    packer = BatchPacker(max_items=max_items, max_tokens=max_tokens)
+    for chunk in chunks:
+        batch = packer.add(chunk)
+        if batch is not None:
+            yield batch
+    batch = packer.flush()
+    if batch is not None:
+        yield batch
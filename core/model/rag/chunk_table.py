@@ -0,0 +1,94 @@
+"""索引版本内的文本块表。
+
+每个索引版本保存一份自己的文本块表，取代原先整体读入内存的 id_mapping.json：
+chunk_texts.bin 依次存放索引中各行文本的 UTF-8 字节，chunk_offsets.npy 记录按存储行号
+索引的起始偏移（长度为行数 + 1，不在索引中的行长度为 0）。
+加载时两个文件都以只读内存映射打开，文本在被检索命中时才解码。
+"""
+
+import asyncio
+from pathlib import Path
+from typing import Iterator, Self
+
+import aiofiles
+import numpy as np
+
+from .vector_store import VectorStore
+
+CHUNK_TEXTS_FILENAME = "chunk_texts.bin"
+CHUNK_OFFSETS_FILENAME = "chunk_offsets.npy"
+
+_COPY_BLOCK_BYTES = 64 << 20
+
+
+class ChunkTable:
+    """按存储行号读取文本块的只读序列。
+
+    Args:
+        offsets: 长度为行数 + 1 的 int64 起始偏移数组。
+        texts: UTF-8 文本数据。
+    """
+
+    def __init__(self, offsets: np.ndarray, texts: np.ndarray) -> None:
+        self.offsets = offsets
+        self.texts = texts
+
+    @classmethod
+    def open(cls, directory: str | Path) -> Self:
+        dir_path = Path(directory)
+        offsets = np.load(dir_path / CHUNK_OFFSETS_FILENAME, mmap_mode="r")
+        size = int(offsets[-1])
+        if size == 0:  # 空文件无法映射
+            texts = np.empty(0, dtype=np.uint8)
+        else:
+            texts = np.memmap(
+                dir_path / CHUNK_TEXTS_FILENAME, dtype=np.uint8, mode="r", shape=(size,)
+            )
+        return cls(offsets=offsets, texts=texts)
+
+    @staticmethod
+    def exists(directory: str | Path) -> bool:
+        return (Path(directory) / CHUNK_OFFSETS_FILENAME).exists()
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row: int) -> str:
+        if row < 0:
+            row += len(self)
+        start, end = int(self.offsets[row]), int(self.offsets[row + 1])
+        return self.texts[start:end].tobytes().decode("utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        for row in range(len(self)):
+            yield self[row]
+
+
+async def write_chunk_table(
+    store: VectorStore, rows: np.ndarray, directory: str | Path
+) -> None:
+    """从向量存储复制指定行的文本，写入 directory 下的文本块表。
+
+    文本以原始字节复制，连续的行合并为一次切片，不做解码。
+
+    Args:
+        store: 向量存储。
+        rows: 索引中包含的行号。
+        directory: 索引版本目录。
+    """
+    rows = np.unique(np.asarray(rows, dtype=np.int64))
+    ends = np.asarray(store.offsets, dtype=np.int64)
+    starts = np.concatenate([[0], ends[:-1]]) if len(ends) else ends
+    lengths = np.zeros(store.count, dtype=np.int64)
+    lengths[rows] = ends[rows] - starts[rows]
+    offsets = np.zeros(store.count + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    # 行号连续的一段在存储中的文本也是连续的，按段复制
+    breaks = np.flatnonzero(np.diff(rows) != 1) + 1
+    async with aiofiles.open(Path(directory) / CHUNK_TEXTS_FILENAME, "wb") as f:
+        for run in np.split(rows, breaks) if len(rows) else []:
+            begin, stop = int(starts[run[0]]), int(ends[run[-1]])
+            for pos in range(begin, stop, _COPY_BLOCK_BYTES):
+                block = store.texts[pos : min(pos + _COPY_BLOCK_BYTES, stop)]
+                await f.write(block.tobytes())
+    await asyncio.to_thread(np.save, Path(directory) / CHUNK_OFFSETS_FILENAME, offsets)
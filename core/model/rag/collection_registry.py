@@ -0,0 +1,191 @@
+"""多知识库检索模块。
+
+按名称管理多个向量库目录，首次检索时才加载，并只保留最近使用的若干个；
+一次查询可以路由到单个知识库，也可以并发检索多个知识库后按相似度合并 top_k。
+各知识库需使用同一个 embedding 模型，相似度才可以直接比较；
+混合检索的结果按融合分数合并，融合分数只取决于排名，同样可以跨知识库比较。
+"""
+
+import asyncio
+import heapq
+from collections import OrderedDict
+from typing import Iterable, Literal
+
+import numpy as np
+
+from log import get_logger
+
+from .base import EmbeddingProvider, SearchResult
+from .index_reloader import ReloadableSearchVectors
+from .search_vectors import SearchVectors
+
+logger = get_logger(__name__)
+
+
+class CollectionRegistry:
+    """知识库注册表。
+
+    Args:
+        locations: 知识库名称到向量库根目录的映射。
+        group_collections: 群号到该群检索的知识库名称列表的映射。
+        default_collections: 未指定知识库、且群号没有单独配置时检索的知识库，为空时检索全部。
+        max_loaded: 同时保持加载的知识库数量，超出时卸载最久未使用的。
+        load_mode: 索引加载方式。
+        poll_interval: 各知识库检查新索引版本的间隔（秒）。
+        rerank: 精确重排的候选数，不大于检索数量时不重排。
+    """
+
+    def __init__(
+        self,
+        locations: dict[str, str],
+        group_collections: dict[str, list[str]] | None = None,
+        default_collections: list[str] | None = None,
+        max_loaded: int = 4,
+        load_mode: Literal["memory", "mmap"] = "mmap",
+        poll_interval: float = 10.0,
+        rerank: int = 0,
+    ) -> None:
+        self.locations = locations
+        self.group_collections = group_collections or {}
+        self.default_collections = default_collections or list(locations)
+        self.max_loaded = max(max_loaded, 1)
+        self.load_mode: Literal["memory", "mmap"] = load_mode
+        self.poll_interval = poll_interval
+        self.rerank = rerank
+        self._loaded: OrderedDict[str, ReloadableSearchVectors] = OrderedDict()
+        self._load_locks: dict[str, asyncio.Lock] = {}
+
+    async def get(self, name: str) -> ReloadableSearchVectors:
+        """返回已加载的知识库，未加载时加载并按 LRU 卸载多余的知识库。"""
+        loaded = self._loaded.get(name)
+        if loaded is not None:
+            self._loaded.move_to_end(name)
+            return loaded
+        if name not in self.locations:
+            raise KeyError(f"未配置的知识库: {name}")
+        lock = self._load_locks.setdefault(name, asyncio.Lock())
+        async with lock:  # 同一知识库并发的首次检索只加载一次
+            loaded = self._loaded.get(name)
+            if loaded is not None:
+                return loaded
+            logger.info(f"加载知识库 {name}: {self.locations[name]}")
+            loaded = await ReloadableSearchVectors.create(
+                root=self.locations[name],
+                load_mode=self.load_mode,
+                poll_interval=self.poll_interval,
+                rerank=self.rerank,
+            )
+            loaded.start()
+            self._loaded[name] = loaded
+        while len(self._loaded) > self.max_loaded:
+            old_name, old = self._loaded.popitem(last=False)
+            # 正在进行的检索仍持有旧实例的引用，结束后随引用释放
+            await old.stop()
+            logger.info(f"卸载知识库 {old_name}")
+        return loaded
+
+    def collections_for_group(self, group_id: int | str | None) -> list[str]:
+        """返回群应当检索的知识库，没有单独配置时使用默认知识库。"""
+        if group_id is None:
+            return self.default_collections
+        return self.group_collections.get(str(group_id), self.default_collections)
+
+    async def search_many(
+        self,
+        query_vectors: list[list[float]] | np.ndarray,
+        top_k: int,
+        min_score: float | None = None,
+        sources: Iterable[str] | None = None,
+        collections: list[str] | None = None,
+        query_texts: list[str | None] | None = None,
+    ) -> list[list[SearchResult]]:
+        """在多个知识库中并发检索，并按相似度合并每个查询的 top_k 结果。
+
+        Args:
+            query_vectors: 查询向量列表或形状为 (n, dim) 的数组。
+            top_k: 每个查询返回的结果数量。
+            min_score: 最低余弦相似度。
+            sources: 只在这些来源文件（或目录前缀）中检索。
+            collections: 检索的知识库名称，为 None 时使用默认知识库。
+            query_texts: 与查询向量一一对应的查询文本，用于混合检索。
+
+        Returns:
+            与查询一一对应的结果列表，结果的 collection 字段为所属知识库。
+        """
+        names = list(dict.fromkeys(collections or self.default_collections))
+        query_np = np.array(query_vectors, dtype="float32")
+        if not names or len(query_np) == 0:
+            return [[] for _ in range(len(query_np))]
+        source_list = None if sources is None else list(sources)
+
+        async def search_one(name: str) -> list[list[SearchResult]]:
+            searcher = await self.get(name)
+            results = await searcher.search_many(
+                query_vectors=query_np,
+                top_k=top_k,
+                min_score=min_score,
+                sources=source_list,
+                query_texts=query_texts,
+            )
+            for row in results:
+                for result in row:
+                    result.collection = name
+            return results
+
+        per_collection = await asyncio.gather(*(search_one(n) for n in names))
+        if len(per_collection) == 1:
+            return per_collection[0]
+        return [
+            heapq.nlargest(top_k, (r for rows in merged for r in rows), key=_score)
+            for merged in zip(*per_collection)
+        ]
+
+    async def search(
+        self,
+        query_vector: list[float],
+        top_k: int,
+        min_score: float | None = None,
+        sources: Iterable[str] | None = None,
+        collections: list[str] | None = None,
+    ) -> list[SearchResult]:
+        results = await self.search_many(
+            query_vectors=[query_vector],
+            top_k=top_k,
+            min_score=min_score,
+            sources=sources,
+            collections=collections,
+        )
+        return results[0]
+
+    async def search_by_text(
+        self,
+        siliconflow_embedding: EmbeddingProvider,
+        query_text: str,
+        model: str,
+        top_k: int = 5,
+        min_score: float | None = None,
+        sources: Iterable[str] | None = None,
+        collections: list[str] | None = None,
+    ) -> list[SearchResult]:
+        """文本查询，同一个查询向量用于所有被检索的知识库。"""
+        result = await siliconflow_embedding.get_embedding(text=[query_text], model=model)
+        vector = SearchVectors._extract_embedding(result=result)
+        results = await self.search_many(
+            query_vectors=[vector],
+            top_k=top_k,
+            min_score=min_score,
+            sources=sources,
+            collections=collections,
+            query_texts=[query_text],
+        )
+        return results[0]
+
+    async def close(self) -> None:
+        """停止所有已加载知识库的后台版本检查。"""
+        while self._loaded:
+            _, loaded = self._loaded.popitem()
+            await loaded.stop()
+
+
+def _score(result: SearchResult) -> float:
+    return result.score if result.fused_score is None else result.fused_score
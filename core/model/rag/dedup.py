@@ -0,0 +1,209 @@
+"""文本块去重模块。
+
+位于切分与 embedding 请求之间：内容哈希相同的文本块只向量化一次；
+开启近似去重时再用 MinHash 签名加分段 LSH 找出近似重复（转载的章节、相同的页眉等），
+近似重复的文本块不再请求 embedding，直接复用代表文本块的向量行。
+
+MinHash 以字符三元组为特征，签名的每个分量由独立的通用哈希 (a*x + b) mod p 取最小值得到；
+签名分为若干段，任意一段完全相同的文本块成为候选；候选先按签名估计的 Jaccard 相似度筛选，
+再用两者的三元组集合计算精确的 Jaccard 相似度确认，签名的估计误差不会造成误删。
+"""
+
+import math
+
+import numpy as np
+from pydantic import BaseModel
+
+from .rate_limiter import estimate_tokens
+
+_MERSENNE_PRIME = (1 << 31) - 1
+_SHINGLE_SIZE = 3
+_MIN_NEAR_DUP_CHARS = 32  # 过短的文本块只做精确去重，避免把编号不同的短句误判为重复
+
+
+class DedupStats(BaseModel):
+    chunks: int = 0  # 切分得到的非空文本块数
+    embedded: int = 0  # 需要请求 embedding 的文本块数
+    exact_known: int = 0  # 与向量存储中已有文本块相同
+    exact_duplicates: int = 0  # 与本次已排队的文本块相同
+    near_duplicates: int = 0  # 与已有或已排队的文本块近似重复
+    tokens_saved: int = 0  # 未发送文本的估算 token 数
+
+    @property
+    def skipped(self) -> int:
+        return self.exact_known + self.exact_duplicates + self.near_duplicates
+
+    def requests_saved(self, max_items: int) -> int:
+        """按每批 max_items 条估算节省的 embedding 请求数。"""
+        return math.ceil(self.skipped / max(max_items, 1))
+
+    def summary(self, max_items: int) -> str:
+        return (
+            f"共 {self.chunks} 个文本块, 向量化 {self.embedded} 个; "
+            f"复用已有向量 {self.exact_known} 个, 完全重复 {self.exact_duplicates} 个, "
+            f"近似重复 {self.near_duplicates} 个; "
+            f"约节省 {self.requests_saved(max_items)} 次请求, {self.tokens_saved} 个token"
+        )
+
+
+def shingle_set(text: str) -> np.ndarray:
+    """返回文本去重并排序后的字符三元组，每个三元组编码为一个 uint64。"""
+    codes = np.frombuffer(text.encode("utf-32-le"), dtype="<u4").astype(np.uint64)
+    if len(codes) >= _SHINGLE_SIZE:
+        shingles = (
+            codes[:-2] << np.uint64(42) | codes[1:-1] << np.uint64(21) | codes[2:]
+        )
+    else:
+        shingles = codes if len(codes) else np.zeros(1, dtype=np.uint64)
+    return np.unique(shingles)
+
+
+def jaccard(x: np.ndarray, y: np.ndarray) -> float:
+    """计算两个 shingle_set 结果的精确 Jaccard 相似度。"""
+    common = len(np.intersect1d(x, y, assume_unique=True))
+    return common / (len(x) + len(y) - common)
+
+
+def minhash_signature(shingles: np.ndarray, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """计算三元组集合的 MinHash 签名。
+
+    Args:
+        shingles: shingle_set 的结果。
+        a: 各哈希函数的乘数，形状为 (num_perm,)。
+        b: 各哈希函数的偏移，形状为 (num_perm,)。
+
+    Returns:
+        形状为 (num_perm,) 的 uint32 签名。
+    """
+    x = shingles.copy()
+    # 把 63 位的三元组混合为 31 位，保证 a * x + b 不会溢出 uint64
+    x ^= x >> np.uint64(33)
+    x *= np.uint64(0xFF51AFD7ED558CCD)
+    x ^= x >> np.uint64(33)
+    x &= np.uint64(_MERSENNE_PRIME)
+    hashed = (a[:, None] * x[None, :] + b[:, None]) % np.uint64(_MERSENNE_PRIME)
+    return hashed.min(axis=1).astype(np.uint32)
+
+
+class NearDuplicateIndex:
+    """MinHash 分段 LSH 索引。
+
+    签名只用于找出候选，确认时比较保存的三元组集合，因此每个条目保留其三元组
+    （每个字符约 8 字节）。
+
+    Args:
+        threshold: Jaccard 相似度不低于该值时视为近似重复。
+        num_perm: 签名长度。
+        bands: 分段数，num_perm 需能被其整除。
+        seed: 生成哈希函数的随机种子，同一种子的签名才可以互相比较。
+    """
+
+    def __init__(
+        self, threshold: float, num_perm: int = 32, bands: int = 8, seed: int = 1
+    ) -> None:
+        if num_perm % bands:
+            raise ValueError("num_perm 必须能被 bands 整除")
+        rng = np.random.default_rng(seed)
+        self.threshold = threshold
+        self.bands = bands
+        self.a = rng.integers(1, _MERSENNE_PRIME, num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, _MERSENNE_PRIME, num_perm, dtype=np.uint64)
+        self._buckets: list[dict[bytes, list[int]]] = [{} for _ in range(bands)]
+        self._signatures: list[np.ndarray] = []
+        self._shingles: list[np.ndarray] = []
+        self._keys: list[bytes] = []
+
+    def signature(self, shingles: np.ndarray) -> np.ndarray:
+        return minhash_signature(shingles, self.a, self.b)
+
+    def _band_keys(self, signature: np.ndarray) -> list[bytes]:
+        return [band.tobytes() for band in np.split(signature, self.bands)]
+
+    def find(self, shingles: np.ndarray, signature: np.ndarray) -> bytes | None:
+        """返回与文本近似重复的已有条目的键，没有时返回 None。
+
+        签名估计的相似度低于阈值的候选直接跳过，其余候选按精确的 Jaccard 相似度确认。
+        """
+        seen: set[int] = set()
+        # 估计值的标准差约为 sqrt(J(1-J)/num_perm)，预筛选时留出余量以免漏掉真正的重复
+        margin = 2 * math.sqrt(0.25 / len(signature))
+        for buckets, key in zip(self._buckets, self._band_keys(signature)):
+            for candidate in buckets.get(key, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                estimate = np.mean(self._signatures[candidate] == signature)
+                if estimate < self.threshold - margin:
+                    continue
+                if jaccard(self._shingles[candidate], shingles) >= self.threshold:
+                    return self._keys[candidate]
+        return None
+
+    def add(self, key: bytes, shingles: np.ndarray, signature: np.ndarray) -> None:
+        entry = len(self._keys)
+        self._keys.append(key)
+        self._signatures.append(signature)
+        self._shingles.append(shingles)
+        for buckets, band_key in zip(self._buckets, self._band_keys(signature)):
+            buckets.setdefault(band_key, []).append(entry)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+class ChunkDeduplicator:
+    """判断文本块是否需要请求 embedding。
+
+    近似重复只在本次处理过的文本块之间检测：复用的已有文本块与新排队的文本块
+    会加入 LSH 索引，增量模式下未变化文件中的文本块不参与比较。
+
+    Args:
+        known: 向量存储中已有文本块的内容哈希。
+        near_threshold: 近似重复的 Jaccard 相似度阈值，不大于 0 时只做精确去重。
+    """
+
+    def __init__(self, known: dict[bytes, int], near_threshold: float = 0.0) -> None:
+        self.known = known
+        self.queued: set[bytes] = set()  # 只记录16字节哈希，文本块本身随流水线流走
+        self.aliases: dict[bytes, bytes] = {}  # 近似重复文本块 -> 代表文本块
+        self.stats = DedupStats()
+        self._near = NearDuplicateIndex(near_threshold) if near_threshold > 0 else None
+        self._indexed: set[bytes] = set()
+
+    def admit(self, h: bytes, chunk: str) -> bool:
+        """登记一个文本块，返回是否需要请求 embedding。"""
+        self.stats.chunks += 1
+        if h in self.known:
+            self.stats.exact_known += 1
+            self.stats.tokens_saved += estimate_tokens([chunk])
+            self._index(h, chunk)  # 已有文本块也可以作为近似重复的代表
+            return False
+        if h in self.queued or h in self.aliases:
+            self.stats.exact_duplicates += 1
+            self.stats.tokens_saved += estimate_tokens([chunk])
+            return False
+        if self._near is not None and len(chunk) >= _MIN_NEAR_DUP_CHARS:
+            shingles = shingle_set(chunk)
+            signature = self._near.signature(shingles)
+            representative = self._near.find(shingles, signature)
+            if representative is not None:
+                self.aliases[h] = representative
+                self.stats.near_duplicates += 1
+                self.stats.tokens_saved += estimate_tokens([chunk])
+                return False
+            self._near.add(h, shingles, signature)
+            self._indexed.add(h)
+        self.queued.add(h)
+        self.stats.embedded += 1
+        return True
+
+    def _index(self, h: bytes, chunk: str) -> None:
+        if self._near is None or h in self._indexed or len(chunk) < _MIN_NEAR_DUP_CHARS:
+            return
+        shingles = shingle_set(chunk)
+        self._near.add(h, shingles, self._near.signature(shingles))
+        self._indexed.add(h)
+
+    def resolve(self, h: bytes) -> bytes:
+        """返回文本块实际使用的向量对应的内容哈希。"""
+        return self.aliases.get(h, h)
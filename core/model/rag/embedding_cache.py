@@ -0,0 +1,185 @@
+"""Embedding 缓存模块。
+
+以 (模型名, 文本哈希) 为键缓存向量，分为进程内 LRU 与 SQLite 磁盘两级：
+内存层命中直接返回，磁盘层命中后回填内存层，两级都按容量淘汰最久未使用的条目。
+"""
+
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Self
+
+import numpy as np
+from pydantic import BaseModel
+
+from config import EmbeddingConfig
+
+
+class EmbeddingCacheStats(BaseModel):
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.memory_hits + self.disk_hits + self.misses
+        return (self.memory_hits + self.disk_hits) / total if total else 0.0
+
+
+class EmbeddingCache:
+    """两级 embedding 缓存。
+
+    Args:
+        path: SQLite 数据库路径，为 None 时只使用内存层。
+        memory_size: 内存层最多缓存的向量数。
+        max_entries: 磁盘层最多缓存的向量数，超出后按最近使用时间淘汰。
+    """
+
+    def __init__(
+        self,
+        path: str | Path | None = None,
+        memory_size: int = 1024,
+        max_entries: int = 1_000_000,
+    ) -> None:
+        self.memory_size = memory_size
+        self.max_entries = max_entries
+        self.stats = EmbeddingCacheStats()
+        self._memory: OrderedDict[bytes, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self._disk_count = 0
+        if path:
+            self._open_disk(Path(path))
+
+    @classmethod
+    def from_config(cls, embedding_config: EmbeddingConfig) -> Self | None:
+        """根据配置创建缓存，未开启任何一级缓存时返回 None。"""
+        if not embedding_config.cache_path and embedding_config.cache_memory_size <= 0:
+            return None
+        return cls(
+            path=embedding_config.cache_path or None,
+            memory_size=embedding_config.cache_memory_size,
+            max_entries=embedding_config.cache_max_entries,
+        )
+
+    def _open_disk(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key BLOB PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_last_used ON embeddings(last_used)"
+        )
+        conn.commit()
+        self._disk_count = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        self._conn = conn
+
+    @staticmethod
+    def make_key(model: str, text: str) -> bytes:
+        return hashlib.blake2b(
+            f"{model}\0{text}".encode("utf-8"), digest_size=16
+        ).digest()
+
+    def _remember(self, key: bytes, vector: np.ndarray) -> None:
+        if self.memory_size <= 0:
+            return
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _get_many_sync(self, keys: list[bytes]) -> list[np.ndarray | None]:
+        results: list[np.ndarray | None] = [None] * len(keys)
+        disk_lookup: list[int] = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._memory.get(key)
+                if vector is None:
+                    disk_lookup.append(i)
+                    continue
+                self._memory.move_to_end(key)
+                results[i] = vector
+                self.stats.memory_hits += 1
+            if disk_lookup and self._conn is not None:
+                wanted = list({keys[i] for i in disk_lookup})
+                found: dict[bytes, np.ndarray] = {}
+                for start in range(0, len(wanted), 500):  # SQLite 参数个数有上限
+                    part = wanted[start : start + 500]
+                    rows = self._conn.execute(
+                        "SELECT key, vector FROM embeddings WHERE key IN "
+                        f"({','.join('?' * len(part))})",
+                        part,
+                    ).fetchall()
+                    for key, blob in rows:
+                        found[key] = np.frombuffer(blob, dtype=np.float32)
+                if found:
+                    now = time.time()
+                    self._conn.executemany(
+                        "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                        [(now, key) for key in found],
+                    )
+                    self._conn.commit()
+                for i in disk_lookup:
+                    vector = found.get(keys[i])
+                    if vector is not None:
+                        results[i] = vector
+                        self._remember(keys[i], vector)
+                        self.stats.disk_hits += 1
+            self.stats.misses += sum(1 for v in results if v is None)
+        return results
+
+    def _put_many_sync(self, keys: list[bytes], vectors: np.ndarray) -> None:
+        with self._lock:
+            for key, vector in zip(keys, vectors):
+                self._remember(key, vector.copy())
+            if self._conn is None:
+                return
+            now = time.time()
+            cursor = self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, last_used) "
+                "VALUES (?, ?, ?)",
+                [(key, vector.tobytes(), now) for key, vector in zip(keys, vectors)],
+            )
+            self._disk_count += max(cursor.rowcount, 0)
+            if self._disk_count > self.max_entries:
+                # 多淘汰 10%，避免之后每次写入都触发一次淘汰
+                overflow = self._disk_count - int(self.max_entries * 0.9)
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN ("
+                    "SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                    (overflow,),
+                )
+                self._disk_count -= overflow
+                self.stats.evictions += overflow
+            self._conn.commit()
+
+    async def get_many(self, model: str, texts: list[str]) -> list[np.ndarray | None]:
+        """批量查询缓存，未命中的位置为 None。"""
+        keys = [self.make_key(model, t) for t in texts]
+        if self._conn is None:
+            return self._get_many_sync(keys)
+        return await asyncio.to_thread(self._get_many_sync, keys)
+
+    async def put_many(self, model: str, texts: list[str], vectors: np.ndarray) -> None:
+        """批量写入缓存，vectors 的每一行对应 texts 中的一条文本。"""
+        keys = [self.make_key(model, t) for t in texts]
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self._conn is None:
+            self._put_many_sync(keys, vectors)
+            return
+        await asyncio.to_thread(self._put_many_sync, keys, vectors)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
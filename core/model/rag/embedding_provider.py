@@ -0,0 +1,37 @@
+"""按配置创建 embedding 后端。"""
+
+import httpx
+
+from config import EmbeddingConfig
+
+from .base import EmbeddingProvider
+from .embedding_cache import EmbeddingCache
+from .onnx_embedding import OnnxEmbedding
+from .siliconflow_embedding import SiliconFlowEmbedding
+
+
+def create_embedding_provider(
+    embedding_config: EmbeddingConfig,
+    client: httpx.AsyncClient | None = None,
+    cache: EmbeddingCache | None = None,
+) -> EmbeddingProvider:
+    """根据 embedding_config.provider_type 创建 embedding 后端。
+
+    Args:
+        embedding_config: embedding 配置。
+        client: HTTP 后端使用的共享客户端，本地后端不需要。
+        cache: embedding 缓存，为 None 时不缓存。
+
+    Raises:
+        ValueError: 未知的 provider_type，或 HTTP 后端没有传入 client。
+    """
+    provider_type = embedding_config.provider_type
+    if provider_type == "siliconflow":
+        if client is None:
+            raise ValueError("siliconflow embedding 需要传入 HTTP 客户端")
+        return SiliconFlowEmbedding(
+            embedding_config=embedding_config, client=client, cache=cache
+        )
+    if provider_type == "onnx":
+        return OnnxEmbedding(embedding_config=embedding_config, cache=cache)
+    raise ValueError(f"未知的 embedding 服务类型: {provider_type}")
@@ -0,0 +1,123 @@
+"""embedding 端点健康度模块。
+
+每个端点记录最近请求的延迟与成功率（指数加权）：选择端点时按成功率从高到低、
+延迟从低到高排序；连续失败的端点进入逐次加倍的冷却期，冷却期内只有在
+所有端点都不可用时才会被选中。近期延迟的分位数用作对冲请求的等待时间。
+"""
+
+import time
+from collections import deque
+
+import numpy as np
+from pydantic import BaseModel
+
+from config import EmbeddingEndpoint
+
+_SUCCESS_ALPHA = 0.2  # 成功率的指数加权系数
+_LATENCY_ALPHA = 0.2
+_MIN_LATENCY_SAMPLES = 20  # 样本不足时不计算分位数
+_FAILURES_BEFORE_COOLDOWN = 2
+_BASE_COOLDOWN = 1.0  # 秒
+_MAX_COOLDOWN = 60.0
+
+
+class EndpointStats(BaseModel):
+    base_url: str
+    success_rate: float
+    latency: float  # 指数加权的平均延迟（秒）
+    p95_latency: float | None
+    consecutive_failures: int
+    cooling_down: bool
+
+
+class EndpointState:
+    """单个端点的健康状态。
+
+    Args:
+        endpoint: 端点配置。
+        window: 用于计算延迟分位数的最近样本数。
+    """
+
+    def __init__(self, endpoint: EmbeddingEndpoint, window: int = 200) -> None:
+        self.endpoint = endpoint
+        self.success_rate = 1.0
+        self.latency = 0.0
+        self.latencies: deque[float] = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+
+    def available(self, now: float) -> bool:
+        return now >= self.cooldown_until
+
+    def latency_quantile(self, q: float) -> float | None:
+        if len(self.latencies) < _MIN_LATENCY_SAMPLES:
+            return None
+        return float(np.quantile(np.fromiter(self.latencies, dtype=np.float64), q))
+
+    def on_success(self, latency: float) -> None:
+        self.success_rate += _SUCCESS_ALPHA * (1.0 - self.success_rate)
+        if self.latencies:
+            self.latency += _LATENCY_ALPHA * (latency - self.latency)
+        else:
+            self.latency = latency
+        self.latencies.append(latency)
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+
+    def on_failure(self, now: float) -> None:
+        self.success_rate -= _SUCCESS_ALPHA * self.success_rate
+        self.consecutive_failures += 1
+        extra = self.consecutive_failures - _FAILURES_BEFORE_COOLDOWN
+        if extra >= 0:
+            cooldown = min(_BASE_COOLDOWN * 2**extra, _MAX_COOLDOWN)
+            self.cooldown_until = now + cooldown
+
+
+class EndpointPool:
+    """按健康度为请求选择端点。
+
+    Args:
+        endpoints: 端点配置，顺序即健康度相同时的优先顺序。
+    """
+
+    def __init__(self, endpoints: list[EmbeddingEndpoint]) -> None:
+        if not endpoints:
+            raise ValueError("至少需要一个 embedding 端点")
+        self.states = [EndpointState(endpoint) for endpoint in endpoints]
+
+    def ranked(self) -> list[EndpointState]:
+        """返回按健康度排序的端点，冷却中的端点排在最后。"""
+        now = time.monotonic()
+        order = sorted(
+            range(len(self.states)),
+            key=lambda i: (
+                not self.states[i].available(now),
+                -round(self.states[i].success_rate, 2),  # 相近的成功率按延迟比较
+                self.states[i].latency,
+                i,
+            ),
+        )
+        return [self.states[i] for i in order]
+
+    def hedge_delay(
+        self, state: EndpointState, quantile: float, minimum: float
+    ) -> float:
+        """对冲请求的等待时间：端点近期延迟的分位数，样本不足时用平均延迟的两倍。"""
+        delay = state.latency_quantile(quantile)
+        if delay is None:
+            delay = 2 * state.latency if state.latencies else 1.0
+        return max(delay, minimum)
+
+    def stats(self) -> list[EndpointStats]:
+        now = time.monotonic()
+        return [
+            EndpointStats(
+                base_url=s.endpoint.base_url,
+                success_rate=s.success_rate,
+                latency=s.latency,
+                p95_latency=s.latency_quantile(0.95),
+                consecutive_failures=s.consecutive_failures,
+                cooling_down=not s.available(now),
+            )
+            for s in self.states
+        ]
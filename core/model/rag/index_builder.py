@@ -0,0 +1,299 @@
+"""FAISS 索引构建策略模块。
+
+根据向量数量与配置选择索引结构（Flat / SQ8 / SQfp16 / PQ / IVF / IVF-SQ8 / HNSW /
+IVF-PQ / OPQ），
+在抽样数据上训练，并把 nprobe、efSearch 等检索参数与索引一起保存，
+加载索引时由 SearchVectors 自动应用。
+
+可选的降维（截断 / PCA / OPQ）作为索引的预变换保存在索引内，
+加入索引的向量与查询向量都经过同一变换，检索代码不需要知道降维的存在；
+向量存储仍保留原始维度，精确重排使用未降维的向量。
+"""
+
+import asyncio
+import json
+import math
+from pathlib import Path
+from typing import Literal
+
+import aiofiles
+import faiss
+import numpy as np
+from pydantic import BaseModel
+
+from log import get_logger
+
+from .vector_store import VectorStore
+
+logger = get_logger(__name__)
+
+PARAMS_FILENAME = "index_params.json"
+
+MIN_POINTS_PER_CENTROID = 39  # faiss 聚类时每个中心至少需要的训练样本数
+SQ_TRAIN_SIZE = 65536  # 标量量化只需统计各维度的取值范围
+MIN_PCA_TRAIN_SIZE = 16384  # PCA 训练样本数下限，且不少于 4 倍原始维度
+
+
+class IndexBuildConfig(BaseModel):
+    index_type: Literal[
+        "auto", "flat", "sq8", "sqfp16", "pq", "ivf", "ivfsq8", "hnsw", "ivfpq", "opq"
+    ] = "auto"
+    flat_threshold: int = 50000  # auto 模式下不超过该数量时使用 Flat
+    nlist: int = 0  # IVF 倒排列表数量，0 表示按向量数量自动计算
+    nprobe: int = 0  # 检索时访问的倒排列表数量，0 表示按 nlist 自动计算
+    pq_m: int = 0  # PQ 子向量个数，0 表示自动选择能整除维度的值
+    pq_nbits: int = 8
+    hnsw_m: int = 32
+    ef_construction: int = 200
+    ef_search: int = 128
+    train_sample_size: int = 0  # 训练样本数量，0 表示自动计算
+    # 降维方式：truncate 截断为前 reduced_dim 维（适用于 Qwen3-Embedding 等 Matryoshka 训练的模型），
+    # pca 训练 PCA 投影，opq 训练 OPQ 旋转并投影；降维后重新归一化
+    reduction: Literal["none", "truncate", "pca", "opq"] = "none"
+    reduced_dim: int = 0  # 降维后的维度，0 或不小于原始维度时不降维
+
+
+class SearchParams(BaseModel):
+    nprobe: int | None = None
+    ef_search: int | None = None
+
+    def to_faiss_string(self) -> str:
+        parts = []
+        if self.nprobe is not None:
+            parts.append(f"nprobe={self.nprobe}")
+        if self.ef_search is not None:
+            parts.append(f"efSearch={self.ef_search}")
+        return ",".join(parts)
+
+    def to_faiss_parameters(self, selector: faiss.IDSelector) -> faiss.SearchParameters:
+        """生成带ID过滤器的单次检索参数。
+
+        单次检索参数会覆盖索引上设置的 nprobe / efSearch，因此需要一并带上。
+        """
+        if self.nprobe is not None:
+            return faiss.SearchParametersIVF(sel=selector, nprobe=self.nprobe)
+        if self.ef_search is not None:
+            return faiss.SearchParametersHNSW(sel=selector, efSearch=self.ef_search)
+        return faiss.SearchParameters(sel=selector)
+
+
+class IndexSpec(BaseModel):
+    factory_string: str
+    search_params: SearchParams
+    train_size: int
+    truncate_dim: int = 0  # 大于 0 时先截断为前 truncate_dim 维，factory_string 作用于截断后的向量
+
+
+def choose_nlist(num_vectors: int) -> int:
+    """按 4*sqrt(n) 选取倒排列表数量，并保证每个中心有足够的训练样本。"""
+    nlist = int(4 * math.sqrt(num_vectors))
+    return max(1, min(nlist, num_vectors // MIN_POINTS_PER_CENTROID))
+
+
+def choose_pq_m(dim: int) -> int:
+    """选取能整除维度、且每个子向量不少于 4 维的最大 PQ 子向量个数。"""
+    for m in (64, 48, 32, 24, 16, 12, 8, 4, 2, 1):
+        if dim % m == 0 and dim // m >= 4:
+            return m
+    return 1
+
+
+def reduced_dim(dim: int, config: IndexBuildConfig) -> int:
+    """返回索引实际使用的维度。"""
+    if config.reduction != "none" and 0 < config.reduced_dim < dim:
+        return config.reduced_dim
+    return dim
+
+
+def resolve_index_spec(
+    num_vectors: int, dim: int, config: IndexBuildConfig
+) -> IndexSpec:
+    """根据向量规模与配置确定 index_factory 字符串、检索参数与训练样本量。"""
+    index_type = config.index_type
+    if index_type == "auto":
+        index_type = "flat" if num_vectors <= config.flat_threshold else "ivf"
+    out_dim = reduced_dim(dim, config)
+    m = config.pq_m or choose_pq_m(out_dim)
+    pq = f"PQ{m}x{config.pq_nbits}"
+    pq_min_train = (1 << config.pq_nbits) * MIN_POINTS_PER_CENTROID
+    # 降维变换作为前缀，PCA / OPQ 之后重新归一化以保持内积即余弦相似度
+    prefix = ""
+    min_train = 0
+    if out_dim < dim and config.reduction == "truncate":
+        prefix = "L2norm,"
+    elif out_dim < dim and config.reduction == "pca":
+        prefix = f"PCA{out_dim},L2norm,"
+        min_train = max(MIN_PCA_TRAIN_SIZE, 4 * dim)
+    elif out_dim < dim and config.reduction == "opq" and index_type != "opq":
+        prefix = f"OPQ{m}_{out_dim},L2norm,"
+        min_train = max(MIN_PCA_TRAIN_SIZE, pq_min_train)
+    truncate_dim = out_dim if config.reduction == "truncate" and out_dim < dim else 0
+    search_params = SearchParams()
+    if index_type == "flat":
+        factory_string = "Flat"
+    elif index_type == "hnsw":
+        factory_string = f"HNSW{config.hnsw_m},Flat"
+        search_params = SearchParams(ef_search=config.ef_search)
+    elif index_type in ("sq8", "sqfp16"):  # 不分桶，逐个扫描压缩后的编码
+        factory_string = {"sq8": "SQ8", "sqfp16": "SQfp16"}[index_type]
+        min_train = max(min_train, SQ_TRAIN_SIZE)
+    elif index_type == "pq":
+        # IndexPQ 不支持 IDSelector，用只有一个倒排列表的 IVF 实现同样的全量扫描
+        factory_string = f"IVF1,{pq}"
+        search_params = SearchParams(nprobe=1)
+        min_train = max(min_train, pq_min_train)
+    else:
+        nlist = config.nlist or choose_nlist(num_vectors)
+        nprobe = config.nprobe or min(256, max(1, nlist // 16))
+        search_params = SearchParams(nprobe=nprobe)
+        min_train = max(min_train, nlist * MIN_POINTS_PER_CENTROID)
+        if index_type == "ivf":
+            factory_string = f"IVF{nlist},Flat"
+        elif index_type == "ivfsq8":
+            factory_string = f"IVF{nlist},SQ8"
+        else:
+            factory_string = f"IVF{nlist},{pq}"
+            if index_type == "opq" and prefix == "" and out_dim < dim:
+                # 降维由 OPQ 本身完成
+                factory_string = f"OPQ{m}_{out_dim},L2norm," + factory_string
+            elif index_type == "opq":
+                factory_string = f"OPQ{m}," + factory_string
+            min_train = max(min_train, pq_min_train)
+        min_train = max(min_train, nlist * 64)
+    train_size = config.train_sample_size or min_train
+    return IndexSpec(
+        factory_string=prefix + factory_string,
+        search_params=search_params,
+        train_size=min(train_size, num_vectors),
+        truncate_dim=truncate_dim,
+    )
+
+
+def sample_rows(rows: np.ndarray, size: int, seed: int = 0) -> np.ndarray:
+    """从行号中无放回抽样，返回升序行号以便顺序读取内存映射。"""
+    if size >= len(rows):
+        return rows
+    rng = np.random.default_rng(seed)
+    return np.sort(rng.choice(rows, size=size, replace=False))
+
+
+def base_index(index: faiss.Index) -> faiss.Index:
+    """穿过 IDMap 与预变换包装，返回实际存放向量的索引。"""
+    index = faiss.downcast_index(index)
+    while isinstance(index, (faiss.IndexIDMap, faiss.IndexPreTransform)):
+        index = faiss.downcast_index(index.index)
+    return index
+
+
+def create_index(dim: int, spec: IndexSpec, config: IndexBuildConfig) -> faiss.Index:
+    """按规格创建未训练、以存储行号为向量ID的索引，输入为 dim 维向量。
+
+    IVF 类索引的倒排列表直接保存ID；其余索引用 IndexIDMap 包装。
+    IndexIDMap 删除向量时假定内部编号随之前移，IVF 不满足这一点，因此不能包装 IVF。
+    """
+    if not spec.truncate_dim:
+        index = faiss.index_factory(dim, spec.factory_string, faiss.METRIC_INNER_PRODUCT)
+    else:  # index_factory 没有截断变换，取前 truncate_dim 维后再接其余结构
+        inner = faiss.index_factory(
+            spec.truncate_dim, spec.factory_string, faiss.METRIC_INNER_PRODUCT
+        )
+        truncate = faiss.RemapDimensionsTransform(dim, spec.truncate_dim, False)
+        index = faiss.IndexPreTransform(truncate, inner)
+    inner = base_index(index)
+    if isinstance(inner, faiss.IndexHNSW):
+        inner.hnsw.efConstruction = config.ef_construction
+    if not isinstance(inner, faiss.IndexIVF):
+        index = faiss.IndexIDMap(index)
+    return index
+
+
+def index_row_ids(index: faiss.Index) -> np.ndarray:
+    """返回索引中全部向量的ID（即存储行号）。"""
+    if hasattr(index, "id_map"):
+        return faiss.vector_to_array(index.id_map)  # type: ignore
+    inner = base_index(index)
+    if not isinstance(inner, faiss.IndexIVF):  # 早期没有ID映射的索引
+        return np.arange(index.ntotal, dtype=np.int64)
+    parts: list[np.ndarray] = []
+    for list_no in range(inner.nlist):
+        size = inner.invlists.list_size(list_no)
+        if size:
+            ids = inner.invlists.get_ids(list_no)
+            parts.append(faiss.rev_swig_ptr(ids, size).copy())
+            inner.invlists.release_ids(list_no, ids)
+    return np.sort(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int64)
+
+
+def supports_update(index: faiss.Index) -> bool:
+    """索引能否按行号删除和添加向量。
+
+    旧版本构建的 IDMap 包装的 IVF 索引删除向量后ID会错位，只能全量重建。
+    """
+    if isinstance(base_index(index), faiss.IndexIVF):
+        return not hasattr(index, "id_map")
+    return hasattr(index, "id_map")
+
+
+def apply_search_params(index: faiss.Index, params: SearchParams) -> None:
+    """将检索参数设置到索引上（可穿透 IDMap / PreTransform 包装）。"""
+    param_string = params.to_faiss_string()
+    if param_string:
+        faiss.ParameterSpace().set_index_parameters(index, param_string)
+
+
+async def add_rows(
+    index: faiss.Index, store: VectorStore, rows: np.ndarray, add_block_size: int
+) -> None:
+    """将存储中指定行的向量归一化后以行号为ID加入索引。"""
+    for ids, block in store.iter_blocks(add_block_size, rows=rows):
+        await asyncio.to_thread(faiss.normalize_L2, block)  # 归一化
+        await asyncio.to_thread(index.add_with_ids, block, ids)  # type: ignore
+
+
+async def build_index(
+    store: VectorStore,
+    rows: np.ndarray,
+    config: IndexBuildConfig,
+    add_block_size: int,
+) -> tuple[faiss.Index, SearchParams]:
+    """用存储中指定的行构建新索引。
+
+    使用内积（余弦相似度）作为相似度度量，向量ID即其在存储中的行号。
+    需要训练的索引只在抽样出的行上训练，不会复制整个矩阵。
+
+    Returns:
+        (索引, 检索参数) 二元组。
+    """
+    spec = resolve_index_spec(len(rows), store.dim, config)
+    truncate = f"截断为 {spec.truncate_dim} 维, " if spec.truncate_dim else ""
+    logger.info(
+        f"构建索引 {truncate}{spec.factory_string}: {len(rows)} 个向量, "
+        f"训练样本 {spec.train_size}"
+    )
+    index = await asyncio.to_thread(create_index, store.dim, spec, config)
+    if not index.is_trained:
+        train_rows = sample_rows(rows, spec.train_size)
+        train_np = store.read_rows(train_rows)
+        await asyncio.to_thread(faiss.normalize_L2, train_np)  # 归一化
+        await asyncio.to_thread(index.train, train_np)  # type: ignore
+        del train_np
+    await add_rows(index=index, store=store, rows=rows, add_block_size=add_block_size)
+    apply_search_params(index, spec.search_params)
+    return index, spec.search_params
+
+
+async def save_search_params(params: SearchParams, directory: str | Path) -> None:
+    async with aiofiles.open(
+        Path(directory) / PARAMS_FILENAME, "w", encoding="utf-8"
+    ) as f:
+        await f.write(params.model_dump_json())
+
+
+async def load_search_params(directory: str | Path) -> SearchParams:
+    """读取与索引一同保存的检索参数，旧索引没有参数文件时返回空参数。"""
+    path = Path(directory) / PARAMS_FILENAME
+    if not path.exists():
+        return SearchParams()
+    async with aiofiles.open(path, "r", encoding="utf-8") as f:
+        content = await f.read()
+    return SearchParams(**json.loads(content))
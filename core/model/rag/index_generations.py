@@ -0,0 +1,75 @@
+"""索引版本目录模块。
+
+每次构建索引都写入 generations/<版本名>/ 下的新目录，
+写完后再原子地更新 CURRENT 文件指向新版本，正在读取旧版本的进程不受影响。
+目录中没有 CURRENT 文件时视为旧版的平铺布局，直接使用该目录本身。
+"""
+
+import os
+import shutil
+import time
+from pathlib import Path
+
+from log import get_logger
+
+logger = get_logger(__name__)
+
+GENERATIONS_DIRNAME = "generations"
+CURRENT_FILENAME = "CURRENT"
+
+
+def read_current_generation(root: str | Path) -> str | None:
+    """返回 CURRENT 指向的版本名，未发布过版本时返回 None。"""
+    current_path = Path(root) / CURRENT_FILENAME
+    try:
+        name = current_path.read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        return None
+    return name or None
+
+
+def generation_directory(root: str | Path, name: str | None) -> Path:
+    """返回指定版本的索引目录，name 为 None 时返回根目录本身。"""
+    root_path = Path(root)
+    if name is None:
+        return root_path
+    return root_path / GENERATIONS_DIRNAME / name
+
+
+def resolve_index_directory(root: str | Path) -> Path:
+    """返回当前生效的索引目录。"""
+    return generation_directory(root, read_current_generation(root))
+
+
+def new_generation_dir(root: str | Path) -> Path:
+    """创建一个新的版本目录，版本名按时间排序。"""
+    name = time.strftime("%Y%m%d-%H%M%S") + f"-{time.time_ns() % 1_000_000_000:09d}"
+    path = Path(root) / GENERATIONS_DIRNAME / name
+    path.mkdir(parents=True)
+    return path
+
+
+def publish_generation(root: str | Path, generation_dir: Path, keep: int = 3) -> None:
+    """原子地切换 CURRENT 到新版本，并清理多余的旧版本。
+
+    Args:
+        root: 向量库根目录。
+        generation_dir: 已写完的新版本目录。
+        keep: 保留的版本数量（包含新版本）。
+    """
+    root_path = Path(root)
+    tmp_path = root_path / (CURRENT_FILENAME + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(generation_dir.name)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, root_path / CURRENT_FILENAME)
+    logger.info(f"已发布索引版本 {generation_dir.name}")
+    generations = sorted(
+        p for p in (root_path / GENERATIONS_DIRNAME).iterdir() if p.is_dir()
+    )
+    for old in generations[: max(len(generations) - max(keep, 1), 0)]:
+        if old.name == generation_dir.name:
+            continue
+        # 其他进程可能仍映射着旧文件，Windows 下删除会失败，留到下次再清理
+        shutil.rmtree(old, ignore_errors=True)
@@ -0,0 +1,180 @@
+"""索引热加载模块。
+
+后台轮询向量库的 CURRENT 文件，发现新发布的索引版本后在后台加载，
+加载完成再替换引用：已经开始的检索继续使用旧实例，旧实例在最后一个引用释放后回收。
+"""
+
+import asyncio
+from pathlib import Path
+from typing import Iterable, Literal, Self
+
+import numpy as np
+
+from log import get_logger
+
+from .base import EmbeddingProvider, SearchResult
+from .index_generations import read_current_generation
+from .search_vectors import SearchVectors
+
+logger = get_logger(__name__)
+
+
+class ReloadableSearchVectors:
+    """可热替换索引的 SearchVectors 代理。
+
+    检索方法与 SearchVectors 相同，每次调用开始时取当前实例的引用，
+    因此替换发生在调用过程中也不会影响该次调用。
+
+    Args:
+        root: 向量库根目录。
+        current: 初始加载的检索实例。
+        load_mode: 索引加载方式。
+        rerank: 精确重排的候选数，见 SearchVectors.create_from_directory。
+        poll_interval: 检查新版本的间隔（秒），不大于 0 时不自动检查。
+    """
+
+    def __init__(
+        self,
+        root: str | Path,
+        current: SearchVectors,
+        load_mode: Literal["memory", "mmap"] = "mmap",
+        poll_interval: float = 10.0,
+        rerank: int = 0,
+    ) -> None:
+        self.root = Path(root)
+        self.load_mode: Literal["memory", "mmap"] = load_mode
+        self.rerank = rerank
+        self.poll_interval = poll_interval
+        self._current = current
+        self._reload_lock = asyncio.Lock()
+        self._watch_task: asyncio.Task | None = None
+
+    @classmethod
+    async def create(
+        cls,
+        root: str | Path,
+        load_mode: Literal["memory", "mmap"] = "mmap",
+        poll_interval: float = 10.0,
+        rerank: int = 0,
+    ) -> Self:
+        current = await SearchVectors.create_from_directory(
+            directory=str(root), load_mode=load_mode, rerank=rerank
+        )
+        return cls(
+            root=root,
+            current=current,
+            load_mode=load_mode,
+            poll_interval=poll_interval,
+            rerank=rerank,
+        )
+
+    @property
+    def current(self) -> SearchVectors:
+        return self._current
+
+    @property
+    def generation(self) -> str | None:
+        return self._current.generation
+
+    async def reload_if_changed(self) -> bool:
+        """CURRENT 指向新版本时加载并替换，返回是否发生了替换。"""
+        async with self._reload_lock:
+            generation = await asyncio.to_thread(read_current_generation, self.root)
+            if generation is None or generation == self._current.generation:
+                return False
+            logger.info(f"检测到新的索引版本 {generation}, 开始加载")
+            new = await SearchVectors.create_from_directory(
+                directory=str(self.root), load_mode=self.load_mode, rerank=self.rerank
+            )
+            old, self._current = self._current, new
+            logger.info(f"索引已从 {old.generation} 切换到 {new.generation}")
+            return True
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.reload_if_changed()
+            except Exception as e:  # 加载失败时继续使用旧索引，下次再试
+                logger.error(f"加载新索引版本失败: {e}")
+
+    def start(self) -> None:
+        """启动后台版本检查任务。"""
+        if self.poll_interval > 0 and self._watch_task is None:
+            self._watch_task = asyncio.create_task(self._watch())
+
+    async def stop(self) -> None:
+        if self._watch_task is None:
+            return
+        self._watch_task.cancel()
+        try:
+            await self._watch_task
+        except asyncio.CancelledError:
+            pass
+        self._watch_task = None
+
+    async def search_many(
+        self,
+        query_vectors: list[list[float]] | np.ndarray,
+        top_k: int,
+        min_score: float | None = None,
+        sources: Iterable[str] | None = None,
+        query_texts: list[str | None] | None = None,
+    ) -> list[list[SearchResult]]:
+        return await self._current.search_many(
+            query_vectors=query_vectors,
+            top_k=top_k,
+            min_score=min_score,
+            sources=sources,
+            query_texts=query_texts,
+        )
+
+    async def search(
+        self,
+        query_vector: list[float],
+        top_k: int,
+        min_score: float | None = None,
+        sources: Iterable[str] | None = None,
+    ) -> list[SearchResult]:
+        return await self._current.search(
+            query_vector=query_vector,
+            top_k=top_k,
+            min_score=min_score,
+            sources=sources,
+        )
+
+    async def search_by_text(
+        self,
+        siliconflow_embedding: EmbeddingProvider,
+        query_text: str,
+        model: str,
+        top_k: int = 5,
+        min_score: float | None = None,
+        sources: Iterable[str] | None = None,
+    ) -> list[SearchResult]:
+        return await self._current.search_by_text(
+            siliconflow_embedding=siliconflow_embedding,
+            query_text=query_text,
+            model=model,
+            top_k=top_k,
+            min_score=min_score,
+            sources=sources,
+        )
+
+    async def search_many_by_text(
+        self,
+        siliconflow_embedding: EmbeddingProvider,
+        query_texts: list[str],
+        model: str,
+        top_k: int = 5,
+        min_score: float | None = None,
+        sources: Iterable[str] | None = None,
+    ) -> list[list[SearchResult]]:
+        return await self._current.search_many_by_text(
+            siliconflow_embedding=siliconflow_embedding,
+            query_texts=query_texts,
+            model=model,
+            top_k=top_k,
+            min_score=min_score,
+            sources=sources,
+        )
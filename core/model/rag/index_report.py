@@ -0,0 +1,269 @@
+"""向量压缩与降维方案的召回率与内存报告。
+
+从已有向量存储中留出若干行作为查询，以原始维度的精确检索结果为基准，
+比较各索引结构、存储精度与降维维度的每向量字节数、recall@k、精确重排后的 recall@k
+与检索耗时，用于选择 VectorizeConfig.vector_dtype、IndexBuildConfig 的 index_type /
+reduction / reduced_dim 与检索的 rerank 候选数。
+
+用法:
+    python -m core.model.rag.index_report <向量库根目录> [--queries 200] [-k 10] [--rerank 100]
+    python -m core.model.rag.index_report <向量库根目录> --dims 256,512,1024 [--reduction truncate,pca]
+"""
+
+import argparse
+import time
+
+import faiss
+import numpy as np
+from pydantic import BaseModel
+
+from .index_builder import (
+    IndexBuildConfig,
+    apply_search_params,
+    create_index,
+    resolve_index_spec,
+    sample_rows,
+)
+from .vector_store import SCALE_DTYPE, VectorStore, quantize_int8
+
+REPORT_INDEX_TYPES = ("flat", "sqfp16", "sq8", "pq", "ivf", "ivfsq8", "ivfpq")
+
+
+class ReportRow(BaseModel):
+    name: str
+    bytes_per_vector: float
+    recall: float  # recall@k
+    rerank_recall: float | None = None  # 取 rerank 个候选精确重排后的 recall@k
+    query_ms: float  # 每条查询的平均检索耗时
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    """found 与 truth 均为 (查询数, k) 的行号数组，返回平均召回率。"""
+    k = truth.shape[1]
+    hits = sum(len(np.intersect1d(f[f != -1], t)) for f, t in zip(found, truth))
+    return hits / (len(truth) * k)
+
+
+def _exact_rerank(
+    base: np.ndarray, queries: np.ndarray, candidates: np.ndarray, k: int
+) -> np.ndarray:
+    """用 float32 向量重新计算候选的内积，返回每条查询的前 k 个行号。"""
+    reranked = np.full((len(queries), k), -1, dtype=np.int64)
+    for i, ids in enumerate(candidates):
+        ids = ids[ids != -1]
+        scores = base[ids] @ queries[i]
+        top = ids[np.argsort(-scores, kind="stable")[:k]]
+        reranked[i, : len(top)] = top
+    return reranked
+
+
+def _search_ms(index: faiss.Index, queries: np.ndarray, k: int) -> tuple[np.ndarray, float]:
+    t0 = time.perf_counter()
+    _, ids = index.search(queries, k)  # type: ignore
+    return ids, (time.perf_counter() - t0) * 1000 / len(queries)
+
+
+def _sample(
+    store: VectorStore, num_queries: int, max_base: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """留出查询行并抽取被检索的行，返回归一化后的 (被检索向量, 查询向量)。
+
+    Raises:
+        ValueError: 存储中的行数不足以留出查询。
+    """
+    all_rows = np.arange(store.count, dtype=np.int64)
+    query_rows = sample_rows(all_rows, num_queries, seed=1)
+    if len(query_rows) >= store.count:
+        raise ValueError(f"向量存储只有 {store.count} 行，不足以留出 {num_queries} 条查询")
+    base_rows = sample_rows(np.setdiff1d(all_rows, query_rows), max_base)
+    queries = store.read_rows(query_rows)
+    base = store.read_rows(base_rows)
+    faiss.normalize_L2(queries)
+    faiss.normalize_L2(base)
+    return base, queries
+
+
+def _evaluate_index(
+    name: str,
+    base: np.ndarray,
+    queries: np.ndarray,
+    truth: np.ndarray,
+    config: IndexBuildConfig,
+    rerank: int,
+) -> ReportRow:
+    """按配置构建索引并评估，索引与 build_index 的结构相同。"""
+    n, dim = base.shape
+    k = truth.shape[1]
+    spec = resolve_index_spec(n, dim, config)
+    index = create_index(dim, spec, config)
+    if not index.is_trained:
+        index.train(base[sample_rows(np.arange(n), spec.train_size)])  # type: ignore
+    index.add_with_ids(base, np.arange(n, dtype=np.int64))  # type: ignore
+    apply_search_params(index, spec.search_params)
+    found, ms = _search_ms(index, queries, k)
+    rerank_recall = None
+    candidates_k = min(max(rerank, k), n)
+    if candidates_k > k:
+        _, candidates = index.search(queries, candidates_k)  # type: ignore
+        reranked = _exact_rerank(base, queries, candidates, k)
+        rerank_recall = recall_at_k(reranked, truth)
+    return ReportRow(
+        name=f"{name} {spec.factory_string}",
+        bytes_per_vector=faiss.serialize_index(index).size / n,
+        recall=recall_at_k(found, truth),
+        rerank_recall=rerank_recall,
+        query_ms=ms,
+    )
+
+
+def compression_report(
+    store: VectorStore,
+    num_queries: int = 200,
+    k: int = 10,
+    rerank: int = 100,
+    max_base: int = 200000,
+    index_types: tuple[str, ...] = REPORT_INDEX_TYPES,
+) -> list[ReportRow]:
+    """在向量存储的样本上评估各压缩方案。
+
+    存储本身已量化时基准也是量化后的向量，此时报告的是相对当前存储的损失。
+
+    Args:
+        store: 向量存储。
+        num_queries: 留出作为查询的行数，这些行不加入被检索的向量。
+        k: 计算 recall@k 的 k。
+        rerank: 精确重排时取出的候选数，不大于 k 时不评估重排。
+        max_base: 被检索的向量最多抽取的行数，限制报告占用的内存。
+        index_types: 评估的索引结构，取值同 IndexBuildConfig.index_type。
+
+    Raises:
+        ValueError: 存储中的行数不足以留出查询。
+    """
+    base, queries = _sample(store, num_queries, max_base)
+    n, dim = base.shape
+    k = min(k, n)
+
+    exact = faiss.IndexFlatIP(dim)
+    exact.add(base)  # type: ignore
+    truth, exact_ms = _search_ms(exact, queries, k)
+    rows = [
+        ReportRow(
+            name=f"存储 {store.dtype}",
+            bytes_per_vector=store.bytes_per_vector,
+            recall=1.0,
+            query_ms=exact_ms,
+        )
+    ]
+    # 存储精度：用解码后的向量做精确检索
+    codes, scales = quantize_int8(base)
+    decoded = {
+        "float16": (base.astype(np.float16).astype(np.float32), dim * 2),
+        "int8": (codes * scales[:, None], dim + SCALE_DTYPE.itemsize),
+    }
+    for dtype, (vectors, size) in decoded.items():
+        if dtype == store.dtype:
+            continue
+        flat = faiss.IndexFlatIP(dim)
+        flat.add(np.ascontiguousarray(vectors, dtype=np.float32))  # type: ignore
+        found, ms = _search_ms(flat, queries, k)
+        rows.append(
+            ReportRow(
+                name=f"存储 {dtype}",
+                bytes_per_vector=size,
+                recall=recall_at_k(found, truth),
+                query_ms=ms,
+            )
+        )
+    del codes, scales, decoded
+
+    for index_type in index_types:
+        config = IndexBuildConfig(index_type=index_type)  # type: ignore
+        rows.append(_evaluate_index("索引", base, queries, truth, config, rerank))
+    return rows
+
+
+def dimension_report(
+    store: VectorStore,
+    dims: list[int],
+    reductions: tuple[str, ...] = ("truncate", "pca"),
+    index_type: str = "flat",
+    num_queries: int = 200,
+    k: int = 10,
+    rerank: int = 100,
+    max_base: int = 200000,
+) -> list[ReportRow]:
+    """评估各降维方式在不同目标维度下的召回率、索引大小与检索耗时。
+
+    基准仍是原始维度的精确检索，重排使用原始维度的向量，与 SearchVectors 的重排一致。
+
+    Args:
+        store: 向量存储。
+        dims: 目标维度列表，不小于原始维度的值会被跳过。
+        reductions: 评估的降维方式，取值同 IndexBuildConfig.reduction。
+        index_type: 降维后使用的索引结构。
+        其余参数同 compression_report。
+
+    Raises:
+        ValueError: 存储中的行数不足以留出查询。
+    """
+    base, queries = _sample(store, num_queries, max_base)
+    n, dim = base.shape
+    k = min(k, n)
+    exact = faiss.IndexFlatIP(dim)
+    exact.add(base)  # type: ignore
+    truth, _ = _search_ms(exact, queries, k)
+    config = IndexBuildConfig(index_type=index_type)  # type: ignore
+    rows = [_evaluate_index(f"{dim}维", base, queries, truth, config, rerank)]
+    for out_dim in sorted(d for d in dims if 0 < d < dim):
+        for reduction in reductions:
+            config = IndexBuildConfig(
+                index_type=index_type,  # type: ignore
+                reduction=reduction,  # type: ignore
+                reduced_dim=out_dim,
+            )
+            name = f"{out_dim}维 {reduction}"
+            rows.append(_evaluate_index(name, base, queries, truth, config, rerank))
+    return rows
+
+
+def format_report(rows: list[ReportRow], k: int, rerank: int) -> str:
+    lines = [
+        f"{'方案':<40}{'字节/向量':>12}{f'recall@{k}':>12}"
+        f"{f'重排@{rerank}':>12}{'毫秒/查询':>12}"
+    ]
+    for row in rows:
+        rerank_recall = "-" if row.rerank_recall is None else f"{row.rerank_recall:.4f}"
+        lines.append(
+            f"{row.name:<40}{row.bytes_per_vector:>12.1f}{row.recall:>12.4f}"
+            f"{rerank_recall:>12}{row.query_ms:>12.3f}"
+        )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="评估向量压缩与降维方案的召回率与内存")
+    parser.add_argument("directory", help="向量库根目录")
+    parser.add_argument("--queries", type=int, default=200, help="留出作为查询的行数")
+    parser.add_argument("-k", type=int, default=10, help="计算 recall@k 的 k")
+    parser.add_argument("--rerank", type=int, default=100, help="精确重排的候选数")
+    parser.add_argument(
+        "--dims", default="", help="逗号分隔的目标维度，指定时输出降维报告"
+    )
+    parser.add_argument("--reduction", default="truncate,pca", help="逗号分隔的降维方式")
+    parser.add_argument("--index-type", default="flat", help="降维报告使用的索引结构")
+    args = parser.parse_args()
+    store = VectorStore.open(args.directory)
+    if args.dims:
+        report = dimension_report(
+            store,
+            dims=[int(d) for d in args.dims.split(",")],
+            reductions=tuple(args.reduction.split(",")),
+            index_type=args.index_type,
+            num_queries=args.queries,
+            k=args.k,
+            rerank=args.rerank,
+        )
+    else:
+        report = compression_report(store, args.queries, args.k, args.rerank)
+    print(f"{store.count} 行, {store.dim} 维, 存储精度 {store.dtype}")
+    print(format_report(report, args.k, args.rerank))
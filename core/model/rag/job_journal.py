@@ -0,0 +1,123 @@
+"""向量化任务日志模块。
+
+任务日志 job_journal.jsonl 与向量存储放在同一目录，每行一条只追加的记录：
+任务开始时写入任务参数与存储的起始行数，每个批次的向量写入存储并刷新后
+再写入一条 batch 记录，这条记录就是该批次的提交点；索引发布后写入 finish。
+
+任务中断后以恢复模式重新运行时，向量存储先截断到最后提交的行数，
+已提交的文本块按内容哈希跳过，只有剩余的文本块会再调用 embedding 接口。
+写到一半的最后一行在读取时被忽略。
+"""
+
+import os
+import time
+from pathlib import Path
+from typing import Literal
+
+import aiofiles
+from pydantic import BaseModel, ValidationError
+
+JOURNAL_FILENAME = "job_journal.jsonl"
+
+
+class JobInfo(BaseModel):
+    folder: str
+    model: str
+    min_chunk_size: int
+    max_chunk_size: int
+
+
+class JournalRecord(BaseModel):
+    event: Literal["start", "resume", "batch", "finish"]
+    rows: int  # 记录写入时向量存储中已提交的行数
+    time: float
+    job: JobInfo | None = None  # 只有 start 记录带有任务参数
+
+
+class JobState(BaseModel):
+    job: JobInfo
+    committed_rows: int
+    batches: int = 0
+    finished: bool = False
+
+
+class JobJournal:
+    """向量化任务日志。
+
+    Args:
+        directory: 向量存储目录。
+    """
+
+    def __init__(self, directory: str | Path) -> None:
+        self.path = Path(directory) / JOURNAL_FILENAME
+
+    def load(self) -> JobState | None:
+        """读取最近一次任务的状态，没有日志时返回 None。"""
+        if not self.path.exists():
+            return None
+        state: JobState | None = None
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = JournalRecord.model_validate_json(line)
+                except ValidationError:  # 中断时写到一半的行
+                    continue
+                if record.event == "start" and record.job is not None:
+                    state = JobState(job=record.job, committed_rows=record.rows)
+                elif state is None:
+                    continue
+                elif record.event == "batch":
+                    state.committed_rows = record.rows
+                    state.batches += 1
+                elif record.event == "resume":
+                    state.committed_rows = record.rows
+                    state.finished = False
+                elif record.event == "finish":
+                    state.finished = True
+        return state
+
+    async def _write(
+        self, record: JournalRecord, mode: str = "a", prefix: str = ""
+    ) -> None:
+        async with aiofiles.open(self.path, mode, encoding="utf-8") as f:
+            await f.write(prefix + record.model_dump_json() + "\n")
+
+    async def start(self, job: JobInfo, rows: int) -> None:
+        """开始新任务，清空旧日志。"""
+        await self._write(
+            JournalRecord(event="start", rows=rows, time=time.time(), job=job), "w"
+        )
+
+    async def resume(self, rows: int) -> None:
+        """记录任务从 rows 行处恢复。"""
+        torn = False  # 中断时的半行之后另起一行，避免与新记录粘连
+        if self.path.exists() and self.path.stat().st_size:
+            with open(self.path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                torn = f.read(1) != b"\n"
+        await self._write(
+            JournalRecord(event="resume", rows=rows, time=time.time()),
+            prefix="\n" if torn else "",
+        )
+
+    async def commit(self, rows: int) -> None:
+        """记录一个批次已写入向量存储，rows 为写入后的总行数。"""
+        await self._write(JournalRecord(event="batch", rows=rows, time=time.time()))
+
+    async def finish(self, rows: int) -> None:
+        await self._write(JournalRecord(event="finish", rows=rows, time=time.time()))
+
+
+def check_resumable(state: JobState, job: JobInfo) -> None:
+    """确认日志中的任务可以用本次参数恢复。
+
+    已提交的文本块按内容哈希复用，源目录或分块参数改变时只会多向量化一些文本块；
+    embedding 模型改变时已提交的向量不能复用。
+
+    Raises:
+        ValueError: embedding 模型与中断的任务不同。
+    """
+    if state.job.model != job.model:
+        raise ValueError(
+            f"无法恢复任务: embedding模型已从 {state.job.model} 变为 {job.model}"
+        )
@@ -0,0 +1,232 @@
+"""BM25 倒排索引模块。
+
+与 index.faiss 一同构建并保存在索引版本的 lexical/ 目录下，检索时与向量检索并行，
+用于补足名称、数字、QQ 号等需要精确匹配的查询。
+
+分词不依赖词典：文本经 NFKC 规范化（全角数字与字母转为半角）并转为小写后，
+由中日韩字符、字母与数字组成的连续片段切成字符二元组，长度为 1 的片段保留为单字，
+标点与符号作为片段边界。数字与英文也按二元组切分，因此源文本去除空白后
+粘连在一起的 QQ 号、被切分到相邻文本块的长数字仍能部分匹配。
+词项直接编码为 uint64：二元组为两个码位拼接，单字为码位本身。
+
+磁盘格式（均为 .npy，加载时只读内存映射）：
+terms 为升序词项，postings_offsets[i]:postings_offsets[i+1] 是第 i 个词项在
+doc_ids / term_freqs 中的倒排区间，doc_lengths 按存储行号记录文档词项数。
+"""
+
+import asyncio
+import json
+import math
+import unicodedata
+from pathlib import Path
+from typing import Iterable, Self
+
+import numpy as np
+from pydantic import BaseModel
+
+from .vector_store import VectorStore
+
+LEXICAL_DIRNAME = "lexical"
+_TERMS_FILENAME = "terms.npy"
+_OFFSETS_FILENAME = "postings_offsets.npy"
+_DOC_IDS_FILENAME = "doc_ids.npy"
+_TERM_FREQS_FILENAME = "term_freqs.npy"
+_DOC_LENGTHS_FILENAME = "doc_lengths.npy"
+_META_FILENAME = "lexical_meta.json"
+
+# 数字、小写字母、拉丁扩展、希腊与西里尔字母，中日韩统一表意文字（含扩展 A 与兼容区）、假名、谚文音节
+_CONTENT_RANGES = (
+    (0x30, 0x39),
+    (0x61, 0x7A),
+    (0xC0, 0x24F),
+    (0x370, 0x52F),
+    (0x3040, 0x30FF),
+    (0x3400, 0x4DBF),
+    (0x4E00, 0x9FFF),
+    (0xAC00, 0xD7AF),
+    (0xF900, 0xFAFF),
+)
+
+
+class LexicalMeta(BaseModel):
+    doc_count: int
+    avg_doc_length: float
+    k1: float = 1.2
+    b: float = 0.75
+
+
+def tokenize(text: str) -> np.ndarray:
+    """将文本切分为 uint64 词项数组（含重复）。
+
+    空白会先被去除，与向量化时对源文本的规范化保持一致。
+    """
+    text = "".join(unicodedata.normalize("NFKC", text).lower().split())
+    if not text:
+        return np.empty(0, dtype=np.uint64)
+    codes = np.frombuffer(text.encode("utf-32-le"), dtype="<u4").astype(np.uint64)
+    content = np.zeros(len(codes), dtype=bool)
+    for lo, hi in _CONTENT_RANGES:
+        content |= (codes >= lo) & (codes <= hi)
+    pair = content[:-1] & content[1:]
+    bigrams = (codes[:-1][pair] << np.uint64(21)) | codes[1:][pair]
+    has_left = np.concatenate([[False], content[:-1]])
+    has_right = np.concatenate([content[1:], [False]])
+    unigrams = codes[content & ~has_left & ~has_right]
+    return np.concatenate([bigrams, unigrams])
+
+
+def build_lexical_index(
+    store: VectorStore, rows: np.ndarray, directory: str | Path
+) -> LexicalMeta:
+    """为存储中的指定行构建倒排索引并写入 directory/lexical/。
+
+    Args:
+        store: 向量存储，文本从中读取。
+        rows: 索引中包含的行号。
+        directory: 索引版本目录。
+    """
+    out_dir = Path(directory) / LEXICAL_DIRNAME
+    out_dir.mkdir(parents=True, exist_ok=True)
+    doc_lengths = np.zeros(store.count, dtype=np.int32)
+    term_parts: list[np.ndarray] = []
+    doc_parts: list[np.ndarray] = []
+    freq_parts: list[np.ndarray] = []
+    for row in np.unique(np.asarray(rows, dtype=np.int64)):
+        tokens = tokenize(store.get_text(int(row)))
+        doc_lengths[row] = len(tokens)
+        if not len(tokens):
+            continue
+        terms, counts = np.unique(tokens, return_counts=True)
+        term_parts.append(terms)
+        doc_parts.append(np.full(len(terms), row, dtype=np.int32))
+        freq_parts.append(np.minimum(counts, np.iinfo(np.uint16).max).astype(np.uint16))
+    terms = np.concatenate(term_parts) if term_parts else np.empty(0, np.uint64)
+    doc_ids = np.concatenate(doc_parts) if doc_parts else np.empty(0, np.int32)
+    term_freqs = np.concatenate(freq_parts) if freq_parts else np.empty(0, np.uint16)
+    del term_parts, doc_parts, freq_parts
+    order = np.argsort(terms, kind="stable")  # 同一词项内保持行号升序
+    terms, doc_ids, term_freqs = terms[order], doc_ids[order], term_freqs[order]
+    del order
+    unique_terms, starts = np.unique(terms, return_index=True)
+    offsets = np.append(starts, len(terms)).astype(np.int64)
+    np.save(out_dir / _TERMS_FILENAME, unique_terms)
+    np.save(out_dir / _OFFSETS_FILENAME, offsets)
+    np.save(out_dir / _DOC_IDS_FILENAME, doc_ids)
+    np.save(out_dir / _TERM_FREQS_FILENAME, term_freqs)
+    np.save(out_dir / _DOC_LENGTHS_FILENAME, doc_lengths)
+    doc_count = int(np.count_nonzero(doc_lengths))
+    meta = LexicalMeta(
+        doc_count=doc_count,
+        avg_doc_length=float(doc_lengths.sum()) / max(doc_count, 1),
+    )
+    (out_dir / _META_FILENAME).write_text(meta.model_dump_json(), encoding="utf-8")
+    return meta
+
+
+class LexicalIndex:
+    """只读的 BM25 倒排索引。"""
+
+    def __init__(
+        self,
+        meta: LexicalMeta,
+        terms: np.ndarray,
+        offsets: np.ndarray,
+        doc_ids: np.ndarray,
+        term_freqs: np.ndarray,
+        doc_lengths: np.ndarray,
+    ) -> None:
+        self.meta = meta
+        self.terms = terms
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.term_freqs = term_freqs
+        self.doc_lengths = doc_lengths
+
+    @classmethod
+    def open(cls, directory: str | Path) -> Self | None:
+        """以内存映射方式打开索引版本目录下的倒排索引，不存在时返回 None。"""
+        lex_dir = Path(directory) / LEXICAL_DIRNAME
+        meta_path = lex_dir / _META_FILENAME
+        if not meta_path.exists():
+            return None
+        meta = LexicalMeta(**json.loads(meta_path.read_text(encoding="utf-8")))
+
+        def load(name: str) -> np.ndarray:
+            array = np.load(lex_dir / name, mmap_mode="r")
+            return array if array.size else np.asarray(array)
+
+        return cls(
+            meta=meta,
+            terms=load(_TERMS_FILENAME),
+            offsets=load(_OFFSETS_FILENAME),
+            doc_ids=load(_DOC_IDS_FILENAME),
+            term_freqs=load(_TERM_FREQS_FILENAME),
+            doc_lengths=load(_DOC_LENGTHS_FILENAME),
+        )
+
+    def search(
+        self, query_text: str, top_k: int, allowed: np.ndarray | None = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """BM25 检索。
+
+        Args:
+            query_text: 查询文本。
+            top_k: 返回的结果数量。
+            allowed: 只在这些行号中检索，为 None 时不限制。
+
+        Returns:
+            (行号数组, BM25 分数数组) 二元组，按分数降序排列。
+        """
+        query_terms = np.unique(tokenize(query_text))
+        if not len(query_terms) or not len(self.terms):
+            return np.empty(0, np.int64), np.empty(0, np.float32)
+        positions = np.searchsorted(self.terms, query_terms)
+        positions = positions[positions < len(self.terms)]
+        positions = positions[np.isin(self.terms[positions], query_terms)]
+        meta = self.meta
+        doc_parts: list[np.ndarray] = []
+        score_parts: list[np.ndarray] = []
+        for pos in positions:
+            start, end = int(self.offsets[pos]), int(self.offsets[pos + 1])
+            docs = np.asarray(self.doc_ids[start:end])
+            freqs = np.asarray(self.term_freqs[start:end], dtype=np.float32)
+            df = end - start
+            idf = math.log(1 + (meta.doc_count - df + 0.5) / (df + 0.5))
+            lengths = self.doc_lengths[docs] / meta.avg_doc_length
+            norm = meta.k1 * (1 - meta.b + meta.b * lengths)
+            doc_parts.append(docs)
+            score_parts.append(idf * freqs * (meta.k1 + 1) / (freqs + norm))
+        if not doc_parts:
+            return np.empty(0, np.int64), np.empty(0, np.float32)
+        docs = np.concatenate(doc_parts)
+        scores = np.concatenate(score_parts)
+        if allowed is not None:
+            mask = np.isin(docs, allowed)
+            docs, scores = docs[mask], scores[mask]
+        unique_docs, inverse = np.unique(docs, return_inverse=True)
+        totals = np.bincount(inverse, weights=scores)
+        if len(totals) > top_k:
+            top = np.argpartition(-totals, top_k)[:top_k]
+        else:
+            top = np.arange(len(totals))
+        top = top[np.argsort(-totals[top], kind="stable")]
+        return unique_docs[top].astype(np.int64), totals[top].astype(np.float32)
+
+    def search_many(
+        self,
+        query_texts: Iterable[str | None],
+        top_k: int,
+        allowed: np.ndarray | None = None,
+    ) -> list[tuple[np.ndarray, np.ndarray]]:
+        """批量检索，没有文本的查询返回空结果。"""
+        empty = (np.empty(0, np.int64), np.empty(0, np.float32))
+        return [
+            self.search(text, top_k, allowed) if text else empty
+            for text in query_texts
+        ]
+
+
+async def write_lexical_index(
+    store: VectorStore, rows: np.ndarray, directory: str | Path
+) -> LexicalMeta:
+    return await asyncio.to_thread(build_lexical_index, store, rows, directory)
@@ -0,0 +1,128 @@
+"""增量向量化清单模块。
+
+清单记录每个源文件的内容哈希以及它切分出的文本块在向量存储中的行号，
+再次向量化时只有内容变化的文件需要重新切分，只有新出现的文本块需要调用 embedding 接口。
+"""
+
+import asyncio
+import hashlib
+import json
+from pathlib import Path
+from typing import Self
+
+import aiofiles
+import numpy as np
+from pydantic import BaseModel
+
+MANIFEST_FILENAME = "manifest.json"
+SOURCES_FILENAME = "sources.json"
+CHUNK_META_FILENAME = "chunk_meta.npy"
+
+# 按存储行号索引的文本块来源；source 为 sources.json 中的下标，不在索引中的行为 -1
+CHUNK_META_DTYPE = np.dtype([("source", "<i4"), ("offset", "<i8"), ("ordinal", "<i4")])
+
+
+class FileEntry(BaseModel):
+    sha256: str
+    rows: list[int]  # 该文件各文本块在向量存储中的行号，按切分顺序排列
+    offsets: list[int] = []  # 各文本块在规范化后文本中的 UTF-8 字节偏移，与 rows 一一对应
+
+
+class IndexManifest(BaseModel):
+    model: str
+    min_chunk_size: int
+    max_chunk_size: int
+    files: dict[str, FileEntry] = {}
+
+    @classmethod
+    async def load(cls, directory: str | Path) -> Self | None:
+        """读取目录中的清单文件，不存在时返回 None。"""
+        path = Path(directory) / MANIFEST_FILENAME
+        if not path.exists():
+            return None
+        async with aiofiles.open(path, "r", encoding="utf-8") as f:
+            content = await f.read()
+        return cls.model_validate_json(content)
+
+    async def save(self, directory: str | Path) -> None:
+        path = Path(directory) / MANIFEST_FILENAME
+        tmp_path = path.with_suffix(".tmp")
+        async with aiofiles.open(tmp_path, "w", encoding="utf-8") as f:
+            await f.write(self.model_dump_json())
+        tmp_path.replace(path)  # 原子替换，避免中断后留下半个清单
+
+    def same_chunking(self, min_chunk_size: int, max_chunk_size: int) -> bool:
+        """分块参数不变时，内容未变的文件可以直接沿用旧的行号。"""
+        return (
+            self.min_chunk_size == min_chunk_size
+            and self.max_chunk_size == max_chunk_size
+        )
+
+    def live_rows(self) -> set[int]:
+        return {row for entry in self.files.values() for row in entry.rows}
+
+    def compacted(self, kept: np.ndarray) -> Self:
+        """返回向量存储只保留 kept 中的行（升序）之后的清单，行号改为其在 kept 中的位置。"""
+        files = {
+            name: entry.model_copy(
+                update={"rows": np.searchsorted(kept, entry.rows).tolist()}
+            )
+            for name, entry in self.files.items()
+        }
+        return self.model_copy(update={"files": files})
+
+    def chunk_meta(self, count: int) -> tuple[list[str], np.ndarray]:
+        """生成按行号索引的来源表。
+
+        同一文本块出现在多个文件中时只记录排序后第一个文件中的位置。
+
+        Args:
+            count: 向量存储的总行数。
+
+        Returns:
+            (来源文件列表, 长度为 count 的 CHUNK_META_DTYPE 数组) 二元组。
+        """
+        sources = sorted(self.files)
+        meta = np.full(count, -1, dtype=CHUNK_META_DTYPE)
+        for source_id, name in enumerate(sources):
+            entry = self.files[name]
+            if not entry.rows:
+                continue
+            rows = np.asarray(entry.rows, dtype=np.int64)
+            ordinals = np.arange(len(rows), dtype=np.int32)
+            first = meta["source"][rows] == -1
+            rows, ordinals = rows[first], ordinals[first]
+            meta["source"][rows] = source_id
+            meta["ordinal"][rows] = ordinals
+            if len(entry.offsets) == len(entry.rows):  # 旧清单没有偏移信息
+                meta["offset"][rows] = np.asarray(entry.offsets, dtype=np.int64)[first]
+        return sources, meta
+
+
+def text_sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+async def save_chunk_meta(
+    directory: str | Path, sources: list[str], meta: np.ndarray
+) -> None:
+    """将来源文件列表与来源表写入索引版本目录。"""
+    async with aiofiles.open(
+        Path(directory) / SOURCES_FILENAME, "w", encoding="utf-8"
+    ) as f:
+        await f.write(json.dumps(sources, ensure_ascii=False))
+    await asyncio.to_thread(np.save, Path(directory) / CHUNK_META_FILENAME, meta)
+
+
+async def load_chunk_meta(
+    directory: str | Path,
+) -> tuple[list[str], np.ndarray] | None:
+    """以只读内存映射方式读取来源表，旧索引没有来源信息时返回 None。"""
+    sources_path = Path(directory) / SOURCES_FILENAME
+    meta_path = Path(directory) / CHUNK_META_FILENAME
+    if not sources_path.exists() or not meta_path.exists():
+        return None
+    async with aiofiles.open(sources_path, "r", encoding="utf-8") as f:
+        sources: list[str] = json.loads(await f.read())
+    meta = await asyncio.to_thread(np.load, meta_path, mmap_mode="r")
+    return sources, meta
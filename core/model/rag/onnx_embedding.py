@@ -0,0 +1,155 @@
+"""本地 ONNX embedding 模块。
+
+在 CPU 上用 ONNX Runtime 运行导出的小型 embedding 模型，检索时的查询向量不再经过网络，
+也可以在没有网络的环境中向量化与测试。推理在专用线程池中进行（onnxruntime 推理时释放 GIL），
+同一次调用的文本按长度排序后分批，减少填充的 token。
+
+模型目录需要包含 model.onnx 与 tokenizers 格式的 tokenizer.json；依赖 onnxruntime 与
+tokenizers(可选依赖 onnx)，只在使用本后端时才需要安装。
+向量维度由模型决定，索引必须用同一个模型构建。
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from config import EmbeddingConfig
+from log import get_logger
+
+from .base import EmbeddingProvider
+from .embedding_cache import EmbeddingCache
+
+logger = get_logger(__name__)
+
+MODEL_FILENAME = "model.onnx"
+TOKENIZER_FILENAME = "tokenizer.json"
+
+
+class OnnxEmbedding(EmbeddingProvider):
+    """用 ONNX Runtime 在本地计算 embedding。
+
+    Args:
+        embedding_config: embedding 配置，使用其中 model_path、pooling、max_length、
+            batch_size、num_threads 与 inference_workers。
+        cache: embedding 缓存，为 None 时不缓存。
+
+    Raises:
+        ImportError: 未安装 onnxruntime 或 tokenizers。
+        FileNotFoundError: 模型目录中缺少 model.onnx 或 tokenizer.json。
+    """
+
+    def __init__(
+        self,
+        embedding_config: EmbeddingConfig,
+        cache: EmbeddingCache | None = None,
+    ) -> None:
+        super().__init__(cache=cache)
+        try:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise ImportError(
+                "本地 embedding 需要安装 onnxruntime 与 tokenizers，"
+                "可通过可选依赖安装: pip install '.[onnx]' 或 uv sync --extra onnx"
+            ) from e
+        self.embedding_config = embedding_config
+        directory = Path(embedding_config.model_path)
+        model_file = directory / MODEL_FILENAME
+        tokenizer_file = directory / TOKENIZER_FILENAME
+        for file in (model_file, tokenizer_file):
+            if not file.is_file():
+                raise FileNotFoundError(f"本地 embedding 模型缺少文件: {file}")
+
+        self.tokenizer = Tokenizer.from_file(str(tokenizer_file))
+        self.tokenizer.no_padding()  # 分批后按批内最长文本填充
+        self.tokenizer.enable_truncation(max_length=embedding_config.max_length)
+        padding = self.tokenizer.padding
+        self.pad_id = padding["pad_id"] if padding else 0
+
+        options = ort.SessionOptions()
+        if embedding_config.num_threads > 0:
+            options.intra_op_num_threads = embedding_config.num_threads
+        self.session = ort.InferenceSession(
+            str(model_file), sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.executor = ThreadPoolExecutor(
+            max_workers=max(embedding_config.inference_workers, 1),
+            thread_name_prefix="onnx-embedding",
+        )
+        logger.info(f"已加载本地 embedding 模型: {model_file}")
+
+    def _pool(self, output: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        """把逐 token 的输出池化为每段文本一个向量，模型已输出句向量时直接返回。"""
+        if output.ndim == 2:
+            return output
+        pooling = self.embedding_config.pooling
+        if pooling == "cls":
+            return output[:, 0]
+        if pooling == "last":  # 右侧填充，最后一个有效 token 的位置为长度减一
+            last = mask.sum(axis=1) - 1
+            return output[np.arange(len(output)), last]
+        weights = mask[:, :, None].astype(np.float32)
+        return (output * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+
+    def _run_batch(
+        self, ids_list: list[list[int]], type_ids_list: list[list[int]]
+    ) -> np.ndarray:
+        length = max(len(ids) for ids in ids_list)
+        input_ids = np.full((len(ids_list), length), self.pad_id, dtype=np.int64)
+        attention_mask = np.zeros((len(ids_list), length), dtype=np.int64)
+        token_type_ids = np.zeros((len(ids_list), length), dtype=np.int64)
+        for i, (ids, type_ids) in enumerate(zip(ids_list, type_ids_list)):
+            input_ids[i, : len(ids)] = ids
+            attention_mask[i, : len(ids)] = 1
+            token_type_ids[i, : len(type_ids)] = type_ids
+        feeds = {
+            "input_ids": input_ids,
+            "attention_mask": attention_mask,
+            "token_type_ids": token_type_ids,
+        }
+        feeds = {
+            name: value for name, value in feeds.items() if name in self.input_names
+        }
+        output = self.session.run(None, feeds)[0]
+        return self._pool(np.asarray(output, dtype=np.float32), attention_mask)
+
+    def _encode_sync(self, texts: list[str]) -> tuple[np.ndarray, int]:
+        """分批推理，返回与 texts 顺序一致的归一化向量与 token 总数。"""
+        encodings = self.tokenizer.encode_batch(texts)
+        order = sorted(range(len(texts)), key=lambda i: len(encodings[i].ids))
+        vectors: list[np.ndarray | None] = [None] * len(texts)
+        batch_size = max(self.embedding_config.batch_size, 1)
+        for start in range(0, len(order), batch_size):
+            rows = order[start : start + batch_size]
+            pooled = self._run_batch(
+                [encodings[i].ids for i in rows], [encodings[i].type_ids for i in rows]
+            )
+            for i, vector in zip(rows, pooled):
+                vectors[i] = vector
+        result = np.stack(vectors)  # type: ignore
+        result /= np.maximum(np.linalg.norm(result, axis=1, keepdims=True), 1e-12)
+        return result, sum(len(e.ids) for e in encodings)
+
+    async def _embed(self, model: str, text: str | list[str], **kwargs) -> dict:
+        """本地推理不受接口配额限制，rate_limiter 等参数被忽略。"""
+        texts = [text] if isinstance(text, str) else text
+        if not texts:
+            return {"model": model, "data": [], "usage": {"total_tokens": 0}}
+        loop = asyncio.get_running_loop()
+        vectors, tokens = await loop.run_in_executor(
+            self.executor, self._encode_sync, texts
+        )
+        return {
+            "model": model,
+            "data": [
+                {"index": i, "embedding": vector.tolist()}
+                for i, vector in enumerate(vectors)
+            ],
+            "usage": {"total_tokens": tokens},
+        }
+
+    async def aclose(self) -> None:
+        await asyncio.to_thread(self.executor.shutdown, wait=True)
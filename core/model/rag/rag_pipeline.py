@@ -5,8 +5,10 @@
 
 import asyncio
 import itertools
-import json
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import AsyncIterable, AsyncIterator, Iterable
 
 import aiofiles
 import faiss
@@ -14,8 +16,46 @@ import numpy as np
 
 from log import get_logger
 
-from .base import VectorizeConfig, VectorStorage
-from .siliconflow_embedding import SiliconFlowEmbedding
+from .base import EmbeddingBatch, EmbeddingProvider, SearchResult, VectorizeConfig
+from .batching import BatchPacker, BatchStats
+from .chunk_table import write_chunk_table
+from .chunker import split_text_fast
+from .dedup import ChunkDeduplicator
+from .index_generations import (
+    new_generation_dir,
+    publish_generation,
+    resolve_index_directory,
+)
+from .index_builder import (
+    IndexBuildConfig,
+    SearchParams,
+    add_rows,
+    build_index,
+    index_row_ids,
+    load_search_params,
+    save_search_params,
+    supports_update,
+)
+from .job_journal import JobInfo, JobJournal, check_resumable
+from .lexical_index import write_lexical_index
+from .manifest import (
+    MANIFEST_FILENAME,
+    FileEntry,
+    IndexManifest,
+    save_chunk_meta,
+    text_sha256,
+)
+from .rate_limiter import AdaptiveRateLimiter, RateLimitConfig
+from .search_vectors import SearchVectors
+from .source_reader import iter_sources
+from .vector_store import (
+    META_FILENAME,
+    StorageDtype,
+    VectorStore,
+    VectorStoreWriter,
+    chunk_hash,
+    compact_store,
+)
 
 logger = get_logger(__name__)
 
@@ -28,276 +68,354 @@ async def write_to_file(folder_path: str, chunks: list[str]) -> None:
         await f.write(text)
 
 
-async def read_txt_file(folder_path: str | Path) -> list[str]:
-    """递归读取目录下所有txt文件，返回去除空白后的文本列表。"""
-    file_path = Path(folder_path)
-    results = file_path.rglob("*.txt")
-    text_lst: list[str] = []
-    for file in results:
-        async with aiofiles.open(file, mode="r", encoding="utf-8") as f:
-            data = await f.read()
-            text = await asyncio.to_thread(lambda: "".join(data.split()))
-            text_lst.append(text)
-    return text_lst
-
-
-def split_text_optimized(
-    text_lst: list[str], min_chunk_size: int, max_chunk_size: int
-) -> list[str]:
-    """按句子边界智能切分文本。
-
-    支持中英文标点作为分隔符，并保持引号配对完整性。
-
-    Args:
-        text_lst: 待切分的文本列表。
-        min_chunk_size: 最小分块长度，在此之前不会切分。
-        max_chunk_size: 最大分块长度，超过时强制切分。
+async def read_txt_file(folder_path: str | Path) -> dict[str, str]:
+    """递归读取目录下所有txt文件。
 
     Returns:
-        切分后的文本块列表。
+        相对路径到去除空白后文本的映射，按路径排序。
     """
-    chunks: list[str] = []
-    strong_delimiters = {"。", "！", "？", ".", "!", "?"}
-    weak_delimiters = {",", "，", ";", "；"}
-    open_quote = "“"
-    close_quote = "”"
-    for text in text_lst:
-        n = len(text)
-        if n <= max_chunk_size:
-            chunks.append(text)
-            continue
-        start = 0
-        while start < n:
-            limit = min(start + max_chunk_size, n)
-            quote_count = 0
-            fallback_split_idx = -1
-            current_split_found = False
-            for i in range(start, limit):
-                char = text[i]
-                if char == open_quote:
-                    quote_count += 1
-                elif char == close_quote:
-                    if quote_count > 0:
-                        quote_count -= 1
-                if i < start + min_chunk_size:
-                    continue
-                if quote_count == 0:
-                    if char in strong_delimiters:
-                        chunks.append(text[start : i + 1])
-                        start = i + 1
-                        current_split_found = True
-                        break
-                    elif char in weak_delimiters:
-                        fallback_split_idx = i
-            if current_split_found:
-                continue
-            if limit == n:
-                chunks.append(text[start:])
-                break
-            if fallback_split_idx != -1:
-                chunks.append(text[start : fallback_split_idx + 1])
-                start = fallback_split_idx + 1
-            else:
-                chunks.append(text[start:limit])
-                start = limit
-    return chunks
-
-
-def get_vector_representation(result: dict, chunk: list[str]) -> list[VectorStorage]:
-    """将embedding API返回结果与原始文本块组装成VectorStorage列表。"""
-    vector_list = []
+    return {name: text async for name, text in iter_sources(folder_path)}
+
+
+def get_vector_representation(result: dict, chunk: list[str]) -> EmbeddingBatch:
+    """将embedding API返回结果与原始文本块组装成EmbeddingBatch。"""
     data: list[dict] = result.get("data", [])
     if not data:
         raise ValueError("数据为空")
+    if len(data) != len(chunk):
+        raise ValueError(f"返回向量数量 {len(data)} 与文本数量 {len(chunk)} 不一致")
     data.sort(key=lambda x: x["index"])
-    for k, v in zip(chunk, data):
-        vector = VectorStorage(name=k, vectors=v["embedding"])
-        vector_list.append(vector)
-    return vector_list
+    vectors = np.array([item["embedding"] for item in data], dtype=np.float32)
+    return EmbeddingBatch(texts=chunk, vectors=vectors)
 
 
 async def write_data(
     folder_str: str | Path,
-    result_queue: asyncio.Queue[list[VectorStorage]],
-) -> dict[str, list[float]]:
-    """从队列消费向量数据并流式写入vector.json文件。"""
-    folder_path = Path(folder_str)
-    file_path = folder_path / "vector.json"
-    first_item = True
-    data: dict[str, list[float]] = {}
-    async with aiofiles.open(file_path, "w", encoding="utf-8") as f:
-        await f.write("{")
+    result_queue: asyncio.Queue[EmbeddingBatch | None],
+    append: bool = False,
+    journal: JobJournal | None = None,
+    sync: bool = False,
+    dtype: StorageDtype = "float32",
+) -> int:
+    """从队列消费向量批次并追加写入二进制向量存储。
+
+    传入任务日志时，每个批次写入后先刷新存储文件，再在日志中记录提交点。
+
+    Args:
+        folder_str: 向量存储目录。
+        result_queue: 向量批次队列，收到 None 时结束。
+        append: 是否在已有存储末尾追加。
+        journal: 任务日志。
+        sync: 记录提交点前是否将存储同步到磁盘。
+        dtype: 新建存储时的向量存储类型。
+
+    Returns:
+        写入后向量存储的总行数。
+    """
+    async with VectorStoreWriter(folder_str, append=append, dtype=dtype) as writer:
         while True:
-            vector_list = await result_queue.get()
-            if not vector_list:
+            batch = await result_queue.get()
+            if batch is None:
                 result_queue.task_done()
                 break
-            for item in vector_list:
-                if not first_item:
-                    await f.write(",")
-                else:
-                    first_item = False
-                key_str = json.dumps(item.name, ensure_ascii=False)
-                value_str = json.dumps(item.vectors)
-                data.update({item.name: item.vectors})
-                line = f"\n{key_str}:{value_str}"
-                await f.write(line)
-                logger.info("已写入文件")
+            await writer.append(texts=batch.texts, vectors=batch.vectors)
+            if journal is not None:
+                await writer.flush(sync=sync)
+                await journal.commit(writer.count)
+            logger.info("已写入文件")
             result_queue.task_done()
-        await f.write("\n}")
-    return data
+    return writer.count
 
 
-async def store_vectors(data: dict[str, list[float]], directory: str | Path) -> None:
-    """构建FAISS索引并持久化存储。
+async def load_index(directory: str | Path) -> faiss.Index | None:
+    """读取向量库当前版本的index.faiss，不存在时返回None。"""
+    index_path = resolve_index_directory(directory) / "index.faiss"
+    if not index_path.exists():
+        return None
+    async with aiofiles.open(index_path, "rb") as f:
+        index_bytes = await f.read()
+    return await asyncio.to_thread(
+        lambda: faiss.deserialize_index(np.frombuffer(index_bytes, dtype=np.uint8))
+    )
 
-    根据向量数量自动选择索引类型：<=50000使用Flat，否则使用IVF100,Flat。
-    使用内积（余弦相似度）作为相似度度量，存储前会对向量进行L2归一化。
 
-    Args:
-        data: 文本到向量的映射字典。
-        directory: 索引文件存储目录，将生成index.faiss和id_mapping.json。
-    """
-    str_name = list(data.keys())
-    vectors = list(data.values())
-    vectors_np = await asyncio.to_thread(lambda: np.array(vectors).astype("float32"))
-    vectors_np = np.ascontiguousarray(vectors_np)  # 确保内存连续
-    dim = vectors_np.shape[1]
-    num_vectors = vectors_np.shape[0]
-    await asyncio.to_thread(faiss.normalize_L2, vectors_np)  # 归一化
-    index_factory_str = "Flat" if num_vectors <= 50000 else "IVF100,Flat"
-    index: faiss.Index = await asyncio.to_thread(
-        faiss.index_factory, dim, index_factory_str, faiss.METRIC_INNER_PRODUCT
+async def update_index(
+    index: faiss.Index,
+    store: VectorStore,
+    added_rows: np.ndarray,
+    removed_rows: np.ndarray,
+    add_block_size: int,
+) -> faiss.Index:
+    """在已有索引上按行号删除失效向量、添加新向量。"""
+    if len(removed_rows):
+        await asyncio.to_thread(index.remove_ids, removed_rows)
+    await add_rows(
+        index=index, store=store, rows=added_rows, add_block_size=add_block_size
     )
-    if not index.is_trained:
-        await asyncio.to_thread(index.train, vectors_np)  # type: ignore
-    await asyncio.to_thread(index.add, vectors_np)  # type: ignore
+    return index
+
+
+async def save_index(
+    index: faiss.Index,
+    store: VectorStore,
+    directory: str | Path,
+    params: SearchParams | None = None,
+    manifest: IndexManifest | None = None,
+    lexical: bool = True,
+) -> None:
+    """将索引、文本块表、检索参数以及文本块来源写入directory（通常是一个新的版本目录）。
+
+    lexical为True时同时构建供混合检索使用的BM25倒排索引。
+    """
     index_path = Path(directory) / "index.faiss"
-    map_path = Path(directory) / "id_mapping.json"
     # await asyncio.to_thread(faiss.write_index, index, str(index_path))
     # 由于faiss直接去访问硬盘写文件时,可能会没有办法处理中文路径
     # 这里把整个index对象压缩并转换成一个numpy(uint8)数组,再转换为二进制数据块,通过python写入
     chunk = await asyncio.to_thread(faiss.serialize_index, index)
     async with aiofiles.open(index_path, "wb") as f:
         await f.write(chunk.tobytes())
-    async with aiofiles.open(map_path, "w", encoding="utf-8") as f:
-        s = json.dumps(str_name, ensure_ascii=False)
-        await f.write(s)
+    rows = await asyncio.to_thread(index_row_ids, index)
+    await write_chunk_table(store=store, rows=rows, directory=directory)
+    if lexical:
+        await write_lexical_index(store=store, rows=rows, directory=directory)
+    if params is not None:
+        await save_search_params(params=params, directory=directory)
+    if manifest is not None:
+        sources, meta = await asyncio.to_thread(manifest.chunk_meta, store.count)
+        await save_chunk_meta(directory=directory, sources=sources, meta=meta)
+
+
+async def store_vectors(
+    directory: str | Path,
+    add_block_size: int = 65536,
+    rows: np.ndarray | None = None,
+    index_config: IndexBuildConfig | None = None,
+    keep_generations: int = 3,
+) -> None:
+    """从二进制向量存储构建FAISS索引，并作为新版本发布。
+
+    索引结构由index_config决定，默认按向量数量在Flat与IVF之间自动选择。
+    向量按块从内存映射中复制出来，L2归一化后加入索引，不会一次性复制整个矩阵。
+
+    Args:
+        directory: 向量存储所在目录，索引写入其下的generations/<版本>/目录。
+        add_block_size: 每次加入索引的向量行数。
+        rows: 需要加入索引的行号（升序），为None时使用全部行。
+        index_config: 索引构建配置。
+        keep_generations: 保留的索引版本数量。
+    """
+    store = await asyncio.to_thread(VectorStore.open, directory)
+    if rows is None:
+        rows = np.arange(store.count, dtype=np.int64)
+    index, params = await build_index(
+        store=store,
+        rows=rows,
+        config=index_config or IndexBuildConfig(),
+        add_block_size=add_block_size,
+    )
+    generation_dir = new_generation_dir(directory)
+    await save_index(index=index, store=store, directory=generation_dir, params=params)
+    publish_generation(directory, generation_dir, keep=keep_generations)
 
 
 async def producer(
-    task_queue: asyncio.Queue[list[str]], chunks: list[str], max_lines: int
+    task_queue: asyncio.Queue[list[str]],
+    chunks: Iterable[str] | AsyncIterable[str],
+    max_lines: int,
+    max_batch_tokens: int = 0,
 ) -> None:
-    """将文本块按批次放入任务队列。"""
-    it = iter(chunks)
-    batch_count = 0
-    total_items = 0
-    while True:
-        chunk = list(itertools.islice(it, max_lines))
-        if not chunk:
-            break
-        await task_queue.put(chunk)
-        batch_count += 1
-        total_items += len(chunk)
-
+    """将文本块按条数上限与token预算装箱后放入任务队列。
 
-async def token_dispenser(
-    token_queue: asyncio.Queue[int], tokens_per_minute: int
+    chunks可以是异步迭代器，队列满时暂停读取上游，内存占用不随语料规模增长。
+    """
+    packer = BatchPacker(max_items=max_lines, max_tokens=max_batch_tokens)
+    if isinstance(chunks, AsyncIterable):
+        async for chunk in chunks:
+            batch = packer.add(chunk)
+            if batch is not None:
+                await task_queue.put(batch)
+    else:
+        for chunk in chunks:
+            batch = packer.add(chunk)
+            if batch is not None:
+                await task_queue.put(batch)
+    batch = packer.flush()
+    if batch is not None:
+        await task_queue.put(batch)
+
+
+async def embed_with_bisection(
+    chunk: list[str],
+    rate_limiter: AdaptiveRateLimiter,
+    siliconflow_embedding: EmbeddingProvider,
+    result_queue: asyncio.Queue[EmbeddingBatch | None],
+    model: str,
+    stats: BatchStats,
 ) -> None:
-    """令牌桶限流器，按固定速率发放令牌控制API调用频率。"""
-    interval = 60.0 / tokens_per_minute
-    token_count = 0
-    while True:
-        await token_queue.put(1)
-        token_count += 1
-        await asyncio.sleep(interval)
+    """向量化一个批次，失败时对半拆分后分别重试，单条仍然失败则放弃该文本块。
+
+    拆分出的子批次由当前消费者直接处理而不是放回有界的任务队列，避免所有消费者都阻塞在入队上。
+    """
+    stats.record(chunk)
+    try:
+        result = await siliconflow_embedding.get_embedding(
+            text=chunk, model=model, rate_limiter=rate_limiter
+        )
+        batch = await asyncio.to_thread(
+            get_vector_representation, result=result, chunk=chunk
+        )
+    except Exception as e:
+        if len(chunk) == 1:
+            logger.error(f"文本块向量化失败,已放弃: {e}")
+            stats.dropped += 1
+            return
+        logger.warning(f"达到最大重试次数,将 {len(chunk)} 条的批次对半拆分")
+        stats.splits += 1
+        mid = len(chunk) // 2
+        for part in (chunk[:mid], chunk[mid:]):
+            await embed_with_bisection(
+                chunk=part,
+                rate_limiter=rate_limiter,
+                siliconflow_embedding=siliconflow_embedding,
+                result_queue=result_queue,
+                model=model,
+                stats=stats,
+            )
+        return
+    logger.info("已经获取向量表示")
+    await result_queue.put(batch)
 
 
 async def consumer(
     task_queue: asyncio.Queue[list[str]],
-    token_queue: asyncio.Queue[int],
-    siliconflow_embedding: SiliconFlowEmbedding,
-    result_queue: asyncio.Queue[list[VectorStorage]],
+    rate_limiter: AdaptiveRateLimiter,
+    siliconflow_embedding: EmbeddingProvider,
+    result_queue: asyncio.Queue[EmbeddingBatch | None],
     model: str,
+    stats: BatchStats,
 ) -> None:
     """消费任务队列中的文本块并调用embedding API获取向量。
 
-    失败时会将批次拆分为单条重新入队重试。
+    每次请求前由限流器按请求数与文本token数放行。
     """
     while True:
         chunk: list[str] = await task_queue.get()
-        await token_queue.get()
         try:
-            result = await siliconflow_embedding.get_embedding(text=chunk, model=model)
-            vector_list = await asyncio.to_thread(
-                get_vector_representation, result=result, chunk=chunk
+            await embed_with_bisection(
+                chunk=chunk,
+                rate_limiter=rate_limiter,
+                siliconflow_embedding=siliconflow_embedding,
+                result_queue=result_queue,
+                model=model,
+                stats=stats,
             )
-            logger.info("已经获取向量表示")
-            await result_queue.put(vector_list)
-        except Exception:
-            logger.warning("达到最大重试次数,即将拆分")
-            for c in chunk:
-                await task_queue.put([c])  # 重新放入队列重试
-        task_queue.task_done()
+        finally:
+            task_queue.task_done()
+
+
+async def _drain(
+    producer_task: asyncio.Task, task_queue: asyncio.Queue[list[str]]
+) -> None:
+    await producer_task
+    await task_queue.join()
 
 
 async def async_process_pipeline(
-    chunks: list[str],
+    chunks: Iterable[str] | AsyncIterable[str],
     max_lines: int,
-    tokens_per_minute: int,
+    rate_limiter: AdaptiveRateLimiter,
     consumer_count: int,
-    siliconflow_embedding: SiliconFlowEmbedding,
+    siliconflow_embedding: EmbeddingProvider,
     folder_path: str | Path,
     model: str,
-) -> dict[str, list[float]]:
+    append: bool = False,
+    max_batch_tokens: int = 0,
+    queue_size: int = 0,
+    journal: JobJournal | None = None,
+    sync: bool = False,
+    dtype: StorageDtype = "float32",
+) -> int:
     """向量化异步处理流水线。
 
-    采用生产者-消费者模式，通过令牌桶限流，支持多消费者并发处理。
+    采用生产者-消费者模式，通过自适应令牌桶限流，支持多消费者并发处理。
+    任务队列与结果队列都有容量上限，下游变慢时上游随之暂停，
+    同时驻留内存的文本块不超过 (2*queue_size+consumer_count)*max_lines 个。
 
     Args:
-        chunks: 待向量化的文本块列表。
+        chunks: 待向量化的文本块，可以是列表或异步迭代器。
         max_lines: 每批次最大文本块数量。
-        tokens_per_minute: 每分钟允许的API调用次数。
+        rate_limiter: 按请求数与文本token数限流的限流器。
         consumer_count: 消费者协程数量。
         siliconflow_embedding: embedding服务客户端。
-        folder_path: 结果文件存储目录。
+        folder_path: 向量存储目录。
         model: embedding模型名称。
+        append: 是否在已有向量存储末尾追加。
+        max_batch_tokens: 单次请求的文本token预算，0表示只按条数分批。
+        queue_size: 任务队列与结果队列各自最多缓存的批次数，0表示取consumer_count。
+        journal: 任务日志，每个批次写入后记录提交点。
+        sync: 记录提交点前是否将向量存储同步到磁盘。
+        dtype: 新建向量存储时的存储类型（float32 / float16 / int8）。
 
     Returns:
-        文本到向量的映射字典。
+        写入后向量存储的总行数。
     """
-    task_queue = asyncio.Queue()
-    token_queue = asyncio.Queue(maxsize=1)
-    result_queue = asyncio.Queue()
+    queue_size = queue_size or consumer_count
+    task_queue: asyncio.Queue[list[str]] = asyncio.Queue(maxsize=queue_size)
+    result_queue: asyncio.Queue[EmbeddingBatch | None] = asyncio.Queue(
+        maxsize=queue_size
+    )
     consumers: list[asyncio.Task] = []
+    stats = BatchStats(max_items=max_lines, max_tokens=max_batch_tokens)
 
-    token_task = asyncio.create_task(
-        token_dispenser(token_queue=token_queue, tokens_per_minute=tokens_per_minute)
-    )
     for _ in range(consumer_count):
         con = asyncio.create_task(
             consumer(
                 task_queue=task_queue,
-                token_queue=token_queue,
+                rate_limiter=rate_limiter,
                 siliconflow_embedding=siliconflow_embedding,
                 result_queue=result_queue,
                 model=model,
+                stats=stats,
             )
         )
         consumers.append(con)
     writer_task = asyncio.create_task(
-        write_data(folder_str=folder_path, result_queue=result_queue)
+        write_data(
+            folder_str=folder_path,
+            result_queue=result_queue,
+            append=append,
+            journal=journal,
+            sync=sync,
+            dtype=dtype,
+        )
     )
     producer_task = asyncio.create_task(
-        producer(task_queue=task_queue, chunks=chunks, max_lines=max_lines)
+        producer(
+            task_queue=task_queue,
+            chunks=chunks,
+            max_lines=max_lines,
+            max_batch_tokens=max_batch_tokens,
+        )
     )
-    await producer_task
-    await task_queue.join()
-    token_task.cancel()
-    for c in consumers:
-        c.cancel()
+    drain_task = asyncio.create_task(_drain(producer_task, task_queue))
+    try:
+        # 写入任务提前结束只可能是出错，此时上游会阻塞在满队列上，需要一并取消
+        await asyncio.wait(
+            {drain_task, writer_task}, return_when=asyncio.FIRST_COMPLETED
+        )
+        if writer_task.done():
+            writer_task.result()
+        drain_task.result()
+    except BaseException:
+        for task in (drain_task, producer_task, writer_task):
+            task.cancel()
+        raise
+    finally:
+        for c in consumers:
+            c.cancel()
     await result_queue.put(None)
     result = await writer_task
+    logger.info(f"embedding批次统计: {stats.summary()}")
     return result
 
 
@@ -305,60 +423,275 @@ async def search_vectors(
     query_vector: list[float],
     directory: str,
     top_k: int = 5,
-) -> list[str]:
-    """从FAISS索引中检索最相似的top_k个文本。"""
-    index_path = Path(directory) / "index.faiss"
-    map_path = Path(directory) / "id_mapping.json"
-    async with aiofiles.open(map_path, "r", encoding="utf-8") as f:
-        content = await f.read()
-        id_mapping: list[str] = json.loads(content)
-    async with aiofiles.open(index_path, "rb") as f:
-        index_bytes = await f.read()
-    index: faiss.Index = await asyncio.to_thread(
-        lambda: faiss.deserialize_index(np.frombuffer(index_bytes, dtype=np.uint8))
+    min_score: float | None = None,
+    sources: list[str] | None = None,
+) -> list[SearchResult]:
+    """从FAISS索引中检索最相似的top_k个文本。
+
+    min_score为最低余弦相似度，sources限定来源文件（或目录前缀）。
+    """
+    searcher = await SearchVectors.create_from_directory(
+        directory=directory, load_mode="memory"
+    )
+    return await searcher.search(
+        query_vector=query_vector, top_k=top_k, min_score=min_score, sources=sources
     )
-    query_np = np.array([query_vector], dtype="float32")
-    await asyncio.to_thread(faiss.normalize_L2, query_np)  # 归一化
-    distances: np.ndarray
-    indices: np.ndarray
-    distances, indices = await asyncio.to_thread(index.search, query_np, top_k)  # type: ignore
-    results = [id_mapping[idx] for idx in indices[0] if idx != -1]
-    return results
 
 
 async def vectorize_text(
     folder_str: str,
     vectorize_config: VectorizeConfig,
-    siliconflow_embedding: SiliconFlowEmbedding,
+    siliconflow_embedding: EmbeddingProvider,
     model: str,
+    resume: bool = False,
 ) -> None:
     """文本向量化入口函数。
 
-    读取目录下的txt文件，分块后向量化，最终构建FAISS索引存储。
+    读取目录下的源文件（默认txt，可配置md、jsonl、gz等格式），分块后向量化，
+    最终构建FAISS索引存储。
+    相同内容的文本块只会向量化一次，设置near_dup_threshold时近似重复的文本块复用代表文本块的向量，
+    结束时报告去重节省的请求数。开启增量模式时会读取上次生成的清单：
+    内容未变的文件沿用原有行号，其余文本块按内容哈希复用向量存储中已有的向量，
+    只有新文本块会调用embedding接口；索引按行号删除失效向量、添加新向量。
+    不再被引用的行达到compact_threshold比例时，先压缩向量存储再全量重建索引。
+    每个写入存储的批次都会记录到任务日志，任务中断后可以用恢复模式继续。
 
     Args:
-        folder_str: 包含txt文件的源目录路径。
+        folder_str: 源文件所在目录路径。
         vectorize_config: 向量化配置参数。
         siliconflow_embedding: embedding服务客户端。
         model: embedding模型名称。
+        resume: 恢复中断的任务：向量存储截断到任务日志中最后提交的批次，
+            已提交的文本块不再调用embedding接口，最后用存储中的向量重建索引。
+
+    Raises:
+        ValueError: 恢复模式下embedding模型与中断的任务不同。
     """
     folder_path = Path(folder_str)
     vector_dir = folder_path.parent / "vector"
     vector_dir.mkdir(parents=True, exist_ok=True)
-    text_lst = await read_txt_file(folder_path=folder_path)
-    chunks = await asyncio.to_thread(
-        split_text_optimized,
-        text_lst=text_lst,
+    manifest = (
+        await IndexManifest.load(vector_dir) if vectorize_config.incremental else None
+    )
+    if manifest is not None and manifest.model != model:
+        logger.warning("embedding模型已变更,将全量重建向量库")
+        manifest = None
+    journal = JobJournal(vector_dir)
+    job = JobInfo(
+        folder=str(folder_path),
+        model=model,
+        min_chunk_size=vectorize_config.min_chunk_size,
+        max_chunk_size=vectorize_config.max_chunk_size,
+    )
+    has_store = (vector_dir / META_FILENAME).exists()
+    state = None
+    if resume and has_store:
+        state = await asyncio.to_thread(journal.load)
+        committed = None  # 没有任务日志时保留存储中全部完整的行
+        if state is not None:
+            check_resumable(state, job)
+            committed = state.committed_rows
+        # 截掉最后一个提交点之后写入的行
+        async with VectorStoreWriter(vector_dir, append=True, max_rows=committed) as w:
+            logger.info(f"恢复任务: 向量存储中已提交 {w.count} 个文本块")
+    elif resume:
+        logger.warning("没有可恢复的向量存储,将从头开始")
+    reuse = (manifest is not None or resume) and has_store
+    known: dict[bytes, int] = {}
+    base_rows = 0
+    if reuse:
+        store = await asyncio.to_thread(VectorStore.open, vector_dir)
+        known = await asyncio.to_thread(store.hash_index)
+        base_rows = store.count
+        del store
+    if state is not None:
+        await journal.resume(base_rows)
+    else:
+        await journal.start(job, rows=base_rows)
+    same_chunking = manifest is not None and manifest.same_chunking(
         min_chunk_size=vectorize_config.min_chunk_size,
         max_chunk_size=vectorize_config.max_chunk_size,
     )
-    data = await async_process_pipeline(
-        chunks=chunks,
-        max_lines=vectorize_config.max_line,
-        tokens_per_minute=vectorize_config.tokens_per_minute,
-        consumer_count=vectorize_config.consumer_count,
-        siliconflow_embedding=siliconflow_embedding,
-        folder_path=vector_dir,
+    files: dict[str, FileEntry] = {}
+    changed: dict[str, tuple[str, list[bytes], list[int]]] = {}
+    dedup = ChunkDeduplicator(
+        known=known, near_threshold=vectorize_config.near_dup_threshold
+    )
+    file_count = 0
+
+    chunk_workers = vectorize_config.chunk_workers
+    executor = ProcessPoolExecutor(chunk_workers) if chunk_workers > 0 else None
+    loop = asyncio.get_running_loop()
+
+    def split(text: str) -> asyncio.Future[list[str]]:
+        if executor is not None:
+            return loop.run_in_executor(
+                executor,
+                split_text_fast,
+                [text],
+                vectorize_config.min_chunk_size,
+                vectorize_config.max_chunk_size,
+            )
+        return asyncio.ensure_future(
+            asyncio.to_thread(
+                split_text_fast,
+                text_lst=[text],
+                min_chunk_size=vectorize_config.min_chunk_size,
+                max_chunk_size=vectorize_config.max_chunk_size,
+            )
+        )
+
+    def register(name: str, sha: str, chunks: list[str]) -> list[str]:
+        """记录文件的切分结果，返回其中需要调用embedding接口的文本块。
+
+        MinHash 签名的计算较耗时，由调用方在线程中逐个文件依次执行。
+        """
+        sizes = [len(c.encode("utf-8")) for c in chunks]
+        starts = itertools.accumulate(sizes, initial=0)  # 文本块首尾相接
+        offsets = [off for off, c in zip(starts, chunks) if c]
+        chunks = [c for c in chunks if c]
+        hashes = [chunk_hash(c) for c in chunks]
+        changed[name] = (sha, hashes, offsets)
+        return [c for h, c in zip(hashes, chunks) if dedup.admit(h, c)]
+
+    async def iter_new_chunks() -> AsyncIterator[str]:
+        """逐个文件切分，只产出需要调用embedding接口的文本块。
+
+        启用进程池时最多提前切分chunk_workers个文件，产出顺序仍与文件顺序一致。
+        """
+        nonlocal file_count
+        in_flight: deque[tuple[str, str, asyncio.Future[list[str]]]] = deque()
+        async for name, text in iter_sources(
+            folder_path,
+            patterns=vectorize_config.source_patterns,
+            concurrency=vectorize_config.read_concurrency,
+        ):
+            file_count += 1
+            sha = text_sha256(text)
+            old = manifest.files.get(name) if manifest and same_chunking else None
+            if reuse and old is not None and old.sha256 == sha:
+                files[name] = old
+                continue
+            in_flight.append((name, sha, split(text)))
+            del text
+            while len(in_flight) > chunk_workers:
+                name, sha, future = in_flight.popleft()
+                chunks = await asyncio.to_thread(register, name, sha, await future)
+                for chunk in chunks:
+                    yield chunk
+        while in_flight:
+            name, sha, future = in_flight.popleft()
+            chunks = await asyncio.to_thread(register, name, sha, await future)
+            for chunk in chunks:
+                yield chunk
+
+    try:
+        await async_process_pipeline(
+            chunks=iter_new_chunks(),
+            max_lines=vectorize_config.max_line,
+            rate_limiter=AdaptiveRateLimiter(
+                RateLimitConfig(
+                    requests_per_minute=vectorize_config.tokens_per_minute,
+                    tokens_per_minute=vectorize_config.text_tokens_per_minute,
+                    burst_seconds=vectorize_config.burst_seconds,
+                    adaptive=vectorize_config.adaptive_rate_limit,
+                )
+            ),
+            consumer_count=vectorize_config.consumer_count,
+            siliconflow_embedding=siliconflow_embedding,
+            folder_path=vector_dir,
+            model=model,
+            append=reuse,
+            max_batch_tokens=vectorize_config.max_batch_tokens,
+            queue_size=vectorize_config.queue_size,
+            journal=journal,
+            sync=vectorize_config.journal_fsync,
+            dtype=vectorize_config.vector_dtype,
+        )
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+    logger.info(f"共 {file_count} 个文件, {len(changed)} 个需要重新切分")
+    logger.info(f"去重统计: {dedup.stats.summary(vectorize_config.max_line)}")
+    if not dedup.queued and not reuse:
+        raise ValueError(f"目录中没有可向量化的文本: {folder_path}")
+    store = await asyncio.to_thread(VectorStore.open, vector_dir)
+    if dedup.queued:
+        known = await asyncio.to_thread(store.hash_index)
+    for name, (sha, hashes, offsets) in changed.items():
+        resolved = [dedup.resolve(h) for h in hashes]
+        located = [(known[h], off) for h, off in zip(resolved, offsets) if h in known]
+        if len(located) != len(hashes):
+            logger.warning(f"{name} 有 {len(hashes) - len(located)} 个文本块未能向量化")
+            sha = ""  # 下次增量时重新处理该文件
+        files[name] = FileEntry(
+            sha256=sha,
+            rows=[row for row, _ in located],
+            offsets=[off for _, off in located],
+        )
+    new_manifest = IndexManifest(
         model=model,
+        min_chunk_size=vectorize_config.min_chunk_size,
+        max_chunk_size=vectorize_config.max_chunk_size,
+        files=files,
+    )
+    live_rows = new_manifest.live_rows()
+    dead = store.count - len(live_rows)
+    threshold = vectorize_config.compact_threshold
+    compacted = threshold > 0 and dead > 0 and dead >= threshold * store.count
+    if compacted:
+        logger.info(f"压缩向量存储: 共 {store.count} 行, 其中 {dead} 行已不再被引用")
+        kept = np.array(sorted(live_rows), dtype=np.int64)
+        del store
+        # 替换存储文件前删除旧清单，中途中断时下次不会按旧行号沿用向量
+        (vector_dir / MANIFEST_FILENAME).unlink(missing_ok=True)
+        await asyncio.to_thread(
+            compact_store, vector_dir, kept, vectorize_config.add_block_size
+        )
+        new_manifest = new_manifest.compacted(kept)
+        live_rows = new_manifest.live_rows()
+        store = await asyncio.to_thread(VectorStore.open, vector_dir)
+    # 压缩后行号全部改变，需要全量重建索引
+    index = await load_index(vector_dir) if reuse and not compacted else None
+    params: SearchParams | None = None
+    if index is not None:  # 增量更新沿用当前版本的检索参数
+        params = await load_search_params(resolve_index_directory(vector_dir))
+    if manifest is not None and index is not None and supports_update(index):
+        old_rows = manifest.live_rows()
+        removed = np.array(sorted(old_rows - live_rows), dtype=np.int64)
+        added = np.array(sorted(live_rows - old_rows), dtype=np.int64)
+        logger.info(f"增量更新索引: 新增 {len(added)} 个向量, 删除 {len(removed)} 个")
+        try:
+            index = await update_index(
+                index=index,
+                store=store,
+                added_rows=added,
+                removed_rows=removed,
+                add_block_size=vectorize_config.add_block_size,
+            )
+        except RuntimeError:  # 如HNSW不支持删除向量
+            logger.warning("当前索引类型不支持增量更新,改为全量重建")
+            index = None
+    else:
+        index = None
+    if index is None:
+        index, params = await build_index(
+            store=store,
+            rows=np.array(sorted(live_rows), dtype=np.int64),
+            config=vectorize_config.index,
+            add_block_size=vectorize_config.add_block_size,
+        )
+    generation_dir = new_generation_dir(vector_dir)
+    await save_index(
+        index=index,
+        store=store,
+        directory=generation_dir,
+        params=params,
+        manifest=new_manifest,
+        lexical=vectorize_config.lexical_index,
+    )
+    await new_manifest.save(vector_dir)
+    publish_generation(
+        vector_dir, generation_dir, keep=vectorize_config.keep_generations
     )
-    await store_vectors(data=data, directory=vector_dir)
+    await journal.finish(store.count)
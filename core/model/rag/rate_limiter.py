@@ -0,0 +1,178 @@
+"""embedding 请求自适应限流模块。
+
+请求数（RPM）与文本 token 数（TPM）各用一个令牌桶限流，桶容量决定允许的突发量。
+限流速率按 AIMD 调整：请求成功时线性回升，收到 429 或延迟超过目标时按比例下降，
+并遵守服务端返回的 Retry-After。
+"""
+
+import asyncio
+import re
+import time
+
+from pydantic import BaseModel
+
+from log import get_logger
+
+logger = get_logger(__name__)
+
+_CJK_PATTERN = re.compile(r"[\u3000-\u303f\u3400-\u9fff\uf900-\ufaff\uff00-\uffef]")
+
+
+def estimate_tokens(texts: str | list[str]) -> int:
+    """粗略估算文本的 token 数：中日韩字符按 1 个计，其余字符每 4 个计 1 个。"""
+    if isinstance(texts, str):
+        texts = [texts]
+    total = 0
+    for text in texts:
+        cjk = len(_CJK_PATTERN.findall(text))
+        total += cjk + (len(text) - cjk + 3) // 4
+    return max(total, 1)
+
+
+class RateLimitConfig(BaseModel):
+    requests_per_minute: float = 60
+    tokens_per_minute: float = 0  # 每分钟允许的文本 token 数，0 表示不限制
+    burst_seconds: float = 1.0  # 令牌桶容量，相当于多少秒的配额
+    adaptive: bool = True  # 是否根据 429 与延迟自动调整速率
+    min_ratio: float = 0.05  # 自动调整时速率下限（相对配置值）
+    max_ratio: float = 1.0  # 自动调整时速率上限（相对配置值），大于 1 时会试探更高的速率
+    increase_step: float = 0.02  # 每次成功请求回升的速率（相对配置值）
+    decrease_factor: float = 0.5  # 收到 429 时速率乘以该系数
+    latency_target: float = 0.0  # 单次请求延迟超过该值（秒）时小幅降速，0 表示不按延迟调整
+    latency_decrease_factor: float = 0.9
+    cooldown: float = 1.0  # 两次降速之间的最短间隔（秒），同一波 429 只降速一次
+
+
+class TokenBucket:
+    """令牌桶。
+
+    单次请求的数量超过桶容量时，只要桶是满的就放行并记为欠额，
+    避免超长批次永远无法获得令牌。
+    """
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate  # 每秒补充的令牌数
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """返回获得 amount 个令牌还需等待的秒数。"""
+        self._refill(now)
+        need = min(amount, self.capacity)
+        if self.tokens >= need:
+            return 0.0
+        return (need - self.tokens) / self.rate
+
+    def consume(self, amount: float) -> None:
+        self.tokens -= amount
+
+    def refund(self, amount: float) -> None:
+        """按实际用量修正预估值，amount 为负数时追加扣减。"""
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class AdaptiveRateLimiter:
+    """按 RPM 与 TPM 双预算限流、并根据服务端反馈自动调速的限流器。
+
+    acquire 按调用顺序排队放行；SiliconFlowEmbedding 在每次请求后调用
+    on_success / on_rate_limited 反馈结果。
+
+    Args:
+        config: 限流配置。
+    """
+
+    def __init__(self, config: RateLimitConfig) -> None:
+        self.config = config
+        self.ratio = min(1.0, config.max_ratio)
+        self._requests = TokenBucket(
+            rate=config.requests_per_minute / 60,
+            capacity=max(1.0, config.requests_per_minute / 60 * config.burst_seconds),
+        )
+        self._tokens: TokenBucket | None = None
+        if config.tokens_per_minute > 0:
+            self._tokens = TokenBucket(
+                rate=config.tokens_per_minute / 60,
+                capacity=max(1.0, config.tokens_per_minute / 60 * config.burst_seconds),
+            )
+        self._lock = asyncio.Lock()
+        self._blocked_until = 0.0
+        self._last_decrease = 0.0
+        self.rate_limited_count = 0
+
+    def _set_ratio(self, ratio: float) -> None:
+        self.ratio = min(max(ratio, self.config.min_ratio), self.config.max_ratio)
+        self._requests.rate = self.config.requests_per_minute / 60 * self.ratio
+        if self._tokens is not None:
+            self._tokens.rate = self.config.tokens_per_minute / 60 * self.ratio
+
+    async def acquire(self, tokens: int = 1) -> None:
+        """等待直到可以发送一个包含 tokens 个文本 token 的请求。"""
+        async with self._lock:  # asyncio.Lock 按先来后到唤醒，等待者依次放行
+            while True:
+                now = time.monotonic()
+                wait = max(
+                    self._blocked_until - now,
+                    self._requests.wait_time(1, now),
+                    self._tokens.wait_time(tokens, now) if self._tokens else 0.0,
+                )
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+            self._requests.consume(1)
+            if self._tokens is not None:
+                self._tokens.consume(tokens)
+
+    def on_success(
+        self, latency: float, estimated_tokens: int = 0, actual_tokens: int = 0
+    ) -> None:
+        """请求成功后调用，用实际 token 数修正预估并线性回升速率。"""
+        if self._tokens is not None and actual_tokens > 0 and estimated_tokens > 0:
+            self._tokens.refund(estimated_tokens - actual_tokens)
+        if not self.config.adaptive:
+            return
+        target = self.config.latency_target
+        if target > 0 and latency > target:
+            self._decrease(self.config.latency_decrease_factor, reason="延迟过高")
+        elif self.ratio < self.config.max_ratio:
+            self._set_ratio(self.ratio + self.config.increase_step)
+
+    def on_rate_limited(self, retry_after: float | None = None) -> None:
+        """收到 429 时调用，暂停发送至 Retry-After 之后并按比例降速。"""
+        self.rate_limited_count += 1
+        if retry_after is not None and retry_after > 0:
+            self._blocked_until = max(
+                self._blocked_until, time.monotonic() + retry_after
+            )
+        if self.config.adaptive:
+            self._decrease(self.config.decrease_factor, reason="收到429")
+
+    def _decrease(self, factor: float, reason: str) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < self.config.cooldown:
+            return
+        self._last_decrease = now
+        self._set_ratio(self.ratio * factor)
+        logger.warning(
+            f"{reason},embedding请求速率降至 "
+            f"{self.config.requests_per_minute * self.ratio:.1f} 次/分钟"
+        )
+
+    @property
+    def requests_per_minute(self) -> float:
+        """当前生效的每分钟请求数。"""
+        return self.config.requests_per_minute * self.ratio
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """解析 Retry-After 响应头，只支持秒数格式。"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        return None
@@ -0,0 +1,233 @@
+"""检索请求合并模块。
+
+在很短的时间窗口内收集并发的 search / search_by_text 调用，
+合并为一次批量 embedding 请求与一次批量 FAISS 检索，再把结果分发给各个等待者。
+"""
+
+import asyncio
+from typing import Iterable
+
+import numpy as np
+
+from log import get_logger
+
+from .base import EmbeddingProvider, SearchResult
+from .collection_registry import CollectionRegistry
+from .index_reloader import ReloadableSearchVectors
+from .search_vectors import SearchVectors
+
+logger = get_logger(__name__)
+
+
+class _PendingQuery:
+    __slots__ = (
+        "text",
+        "vector",
+        "top_k",
+        "min_score",
+        "sources",
+        "collections",
+        "future",
+    )
+
+    def __init__(
+        self,
+        top_k: int,
+        future: asyncio.Future[list[SearchResult]],
+        text: str | None = None,
+        vector: list[float] | None = None,
+        min_score: float | None = None,
+        sources: frozenset[str] | None = None,
+        collections: tuple[str, ...] | None = None,
+    ) -> None:
+        self.text = text
+        self.vector = vector
+        self.top_k = top_k
+        self.min_score = min_score
+        self.sources = sources
+        self.collections = collections
+        self.future = future
+
+
+class SearchBatcher:
+    """检索请求微批处理器。
+
+    第一个请求到达后开始计时，达到 max_delay 或攒够 max_batch_size 个请求时立即合并执行。
+
+    Args:
+        search_vectors: 向量检索实例，可以是支持热加载的代理或多知识库注册表。
+        siliconflow_embedding: 文本查询使用的 embedding 客户端。
+        model: embedding 模型名称。
+        max_batch_size: 单批最多合并的请求数。
+        max_delay: 收集请求的最长等待时间（秒）。
+        hybrid: 文本查询是否同时做关键词检索，需要索引带有 BM25 倒排索引。
+    """
+
+    def __init__(
+        self,
+        search_vectors: SearchVectors | ReloadableSearchVectors | CollectionRegistry,
+        siliconflow_embedding: EmbeddingProvider,
+        model: str,
+        max_batch_size: int = 32,
+        max_delay: float = 0.003,
+        hybrid: bool = True,
+    ) -> None:
+        self.search_vectors = search_vectors
+        self.siliconflow_embedding = siliconflow_embedding
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.hybrid = hybrid
+        self._pending: list[_PendingQuery] = []
+        self._flush_handle: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    async def search(
+        self,
+        query_vector: list[float],
+        top_k: int,
+        min_score: float | None = None,
+        sources: Iterable[str] | None = None,
+        collections: list[str] | None = None,
+        group_id: int | str | None = None,
+    ) -> list[SearchResult]:
+        """提交一个向量查询，与同一窗口内的其他查询合并执行。
+
+        未指定 collections 时按 group_id 检索该群配置的知识库。
+        """
+        return await self._submit(
+            top_k=top_k,
+            vector=query_vector,
+            min_score=min_score,
+            sources=sources,
+            collections=collections,
+            group_id=group_id,
+        )
+
+    async def search_by_text(
+        self,
+        query_text: str,
+        top_k: int = 5,
+        min_score: float | None = None,
+        sources: Iterable[str] | None = None,
+        collections: list[str] | None = None,
+        group_id: int | str | None = None,
+    ) -> list[SearchResult]:
+        """提交一个文本查询，与同一窗口内的其他查询共用一次 embedding 请求。
+
+        collections 与 group_id 只在 search_vectors 为 CollectionRegistry 时可用；
+        未指定 collections 时按 group_id 检索该群配置的知识库，
+        同一个群的查询因此落在同一个检索组中。
+        """
+        return await self._submit(
+            top_k=top_k,
+            text=query_text,
+            min_score=min_score,
+            sources=sources,
+            collections=collections,
+            group_id=group_id,
+        )
+
+    def _submit(
+        self,
+        top_k: int,
+        text: str | None = None,
+        vector: list[float] | None = None,
+        min_score: float | None = None,
+        sources: Iterable[str] | None = None,
+        collections: list[str] | None = None,
+        group_id: int | str | None = None,
+    ) -> asyncio.Future[list[SearchResult]]:
+        if (collections is not None or group_id is not None) and not isinstance(
+            self.search_vectors, CollectionRegistry
+        ):
+            raise ValueError("只有多知识库注册表支持指定知识库")
+        if collections is None and group_id is not None:
+            assert isinstance(self.search_vectors, CollectionRegistry)
+            collections = self.search_vectors.collections_for_group(group_id)
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[list[SearchResult]] = loop.create_future()
+        self._pending.append(
+            _PendingQuery(
+                top_k=top_k,
+                future=future,
+                text=text,
+                vector=vector,
+                min_score=min_score,
+                sources=None if sources is None else frozenset(sources),
+                collections=None if collections is None else tuple(collections),
+            )
+        )
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_delay, self._flush)
+        return future
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.create_task(self._run_batch(batch))
+        self._tasks.add(task)  # 保留引用，避免任务被垃圾回收
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: list[_PendingQuery]) -> None:
+        try:
+            texts = list(dict.fromkeys(q.text for q in batch if q.text is not None))
+            text_vectors: dict[str, list[float]] = {}
+            if texts:
+                result = await self.siliconflow_embedding.get_embedding(
+                    text=texts, model=self.model
+                )
+                embeddings = SearchVectors._extract_embeddings(result=result)
+                text_vectors = dict(zip(texts, embeddings))
+            # 来源过滤在 faiss 内部完成；混合检索的候选数与重排的候选数取决于 top_k，
+            # min_score 在融合前后的截断也会影响结果，这些参数都相同的查询才能合并为一次检索，
+            # 合并后的结果与逐个调用 search_by_text 完全一致
+            groups: dict[
+                tuple[
+                    tuple[str, ...] | None, frozenset[str] | None, int, float | None
+                ],
+                list[_PendingQuery],
+            ] = {}
+            for q in batch:
+                key = (q.collections, q.sources, q.top_k, q.min_score)
+                groups.setdefault(key, []).append(q)
+            results: list[tuple[_PendingQuery, list[SearchResult]]] = []
+            for (collections, sources, top_k, min_score), group in groups.items():
+                vectors = np.array(
+                    [q.vector if q.text is None else text_vectors[q.text] for q in group],
+                    dtype="float32",
+                )
+                query_texts = [q.text for q in group] if self.hybrid else None
+                if isinstance(self.search_vectors, CollectionRegistry):
+                    matched = await self.search_vectors.search_many(
+                        query_vectors=vectors,
+                        top_k=top_k,
+                        min_score=min_score,
+                        sources=sources,
+                        collections=None if collections is None else list(collections),
+                        query_texts=query_texts,
+                    )
+                else:
+                    matched = await self.search_vectors.search_many(
+                        query_vectors=vectors,
+                        top_k=top_k,
+                        min_score=min_score,
+                        sources=sources,
+                        query_texts=query_texts,
+                    )
+                results.extend(zip(group, matched))
+        except Exception as e:
+            logger.warning(f"批量检索失败({len(batch)} 个请求): {e}")
+            for q in batch:
+                if not q.future.done():
+                    q.future.set_exception(e)
+            return
+        for q, matched in results:
+            if not q.future.done():
+                q.future.set_result(matched)
@@ -2,13 +2,56 @@
 
 import asyncio
 import json
+import mmap
+import os
 from pathlib import Path
-from typing import Any, Self
+from typing import Any, Iterable, Literal, Self
 import aiofiles
 import faiss
 import numpy as np
 
-from .siliconflow_embedding import SiliconFlowEmbedding
+from .base import EmbeddingProvider, SearchResult
+from .chunk_table import ChunkTable
+from .index_builder import SearchParams, apply_search_params, load_search_params
+from .index_generations import generation_directory, read_current_generation
+from .lexical_index import LexicalIndex
+from .manifest import load_chunk_meta
+from .vector_store import META_FILENAME, VectorStore, chunk_hash
+
+# IO_FLAG_MMAP 映射倒排列表，IO_FLAG_MMAP_IFC 映射 Flat 编码，旧版 faiss 可能没有后者
+MMAP_IO_FLAGS = (
+    faiss.IO_FLAG_MMAP
+    | getattr(faiss, "IO_FLAG_MMAP_IFC", 0)
+    | faiss.IO_FLAG_READ_ONLY
+)
+# IVF 索引同时设置 IO_FLAG_MMAP_IFC 时读取倒排列表会失败，此时只映射倒排列表
+IVF_MMAP_IO_FLAGS = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+# 倒数排名融合的平滑常数，排名 r（从 1 开始）的贡献为 1 / (RRF_K + r)
+RRF_K = 60
+
+
+def read_index_mmap(index_path: Path) -> faiss.Index:
+    """以内存映射方式加载只读索引。
+
+    向量数据直接映射自文件，多个进程加载同一索引时共享页缓存。
+    faiss 在 Windows 下用 fopen 打开文件，无法处理中文路径，
+    此时退化为 Python mmap 读取后反序列化，只产生索引本身这一份拷贝。
+    """
+    path_str = str(index_path)
+    if path_str.isascii() or os.name != "nt":
+        try:
+            return faiss.read_index(path_str, MMAP_IO_FLAGS)
+        except RuntimeError:
+            return faiss.read_index(path_str, IVF_MMAP_IO_FLAGS)
+    with open(index_path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        buffer = np.frombuffer(mm, dtype=np.uint8)
+        index = faiss.deserialize_index(buffer)
+        del buffer  # 释放对 mmap 的引用后才能关闭
+    finally:
+        mm.close()
+    return index
 
 
 class SearchVectors:
@@ -18,20 +61,54 @@ class SearchVectors:
     并提供向量相似度搜索功能。
 
     Attributes:
-        id_mapping: ID 映射列表，将 FAISS 索引位置映射到实际的文档 ID。
+        id_mapping: 按存储行号读取文本块的序列，新索引为内存映射的 ChunkTable，
+            旧索引为从 id_mapping.json 读入的列表。
         index: FAISS 索引对象，用于高效的向量相似度搜索。
+        generation: 加载的索引版本名，旧版平铺布局为 None。
+        search_params: 构建索引时保存的检索参数，带过滤条件检索时需要一并传入。
+        sources: 来源文件列表，旧索引没有来源信息时为空。
+        chunk_meta: 按行号索引的来源表，旧索引没有来源信息时为 None。
+        lexical: BM25 倒排索引，构建时未启用时为 None，此时只做向量检索。
+        store: 精确重排使用的向量存储，不重排时为 None。
+        rerank: 精确重排时从索引取出的候选数。
     """
 
-    def __init__(self, index: faiss.Index, id_mapping: list[str]) -> None:
+    def __init__(
+        self,
+        index: faiss.Index,
+        id_mapping: ChunkTable | list[str],
+        generation: str | None = None,
+        search_params: SearchParams | None = None,
+        sources: list[str] | None = None,
+        chunk_meta: np.ndarray | None = None,
+        lexical: LexicalIndex | None = None,
+        store: VectorStore | None = None,
+        rerank: int = 0,
+    ) -> None:
         """初始化向量搜索实例。
 
         注意：通常建议使用 create_from_directory 工厂方法进行实例化。
         Args:
             index: 已加载的 FAISS 索引对象。
-            id_mapping: 已加载的 ID 映射列表。
+            id_mapping: 按行号读取文本块的序列。
+            generation: 索引版本名。
+            search_params: 索引的检索参数。
+            sources: 来源文件列表。
+            chunk_meta: 来源表（manifest.CHUNK_META_DTYPE）。
+            lexical: BM25 倒排索引。
+            store: 向量存储，与 rerank 一起启用精确重排。
+            rerank: 从索引取出的候选数，不大于 top_k 时不重排。
         """
         self.id_mapping = id_mapping
         self.index = index
+        self.generation = generation
+        self.search_params = search_params or SearchParams()
+        self.sources = sources or []
+        self.chunk_meta = chunk_meta
+        self.lexical = lexical
+        self.store = store
+        self.rerank = rerank
+        self._allowed_cache: dict[frozenset[str], np.ndarray] = {}
 
     @classmethod
     async def create_from_directory(
@@ -39,27 +116,262 @@ class SearchVectors:
         directory: str,
         index_filename: str = "index.faiss",
         mapping_filename: str = "id_mapping.json",
+        load_mode: Literal["memory", "mmap"] = "mmap",
+        rerank: int = 0,
     ) -> Self:
-        dir_path = Path(directory)
+        """从目录加载索引与文本块表。
+
+        目录中存在 CURRENT 文件时加载其指向的索引版本。
+
+        Args:
+            directory: 向量库根目录或索引所在目录。
+            index_filename: 索引文件名。
+            mapping_filename: 旧版 ID 映射文件名，没有文本块表时使用。
+            load_mode: memory 将索引完整读入内存；mmap 以只读内存映射方式加载，
+                启动更快，且同一主机上的多个进程共享同一份页缓存。
+            rerank: 大于 0 时映射根目录下的向量存储，从索引取出 rerank 个候选后
+                用存储中的向量精确计算相似度并重排；适合 SQ / PQ 等有损压缩的索引。
+        """
+        generation = read_current_generation(directory)
+        dir_path = generation_directory(directory, generation)
         index_path = dir_path / index_filename
-        mapping_path = dir_path / mapping_filename
-        async with aiofiles.open(mapping_path, "r", encoding="utf-8") as f:
-            content = await f.read()
-            id_mapping: list[str] = json.loads(content)
-        async with aiofiles.open(index_path, "rb") as f:
-            index_bytes = await f.read()
-            index: faiss.Index = await asyncio.to_thread(
-                lambda: faiss.deserialize_index(
-                    np.frombuffer(index_bytes, dtype=np.uint8)
+        id_mapping: ChunkTable | list[str]
+        if ChunkTable.exists(dir_path):
+            id_mapping = await asyncio.to_thread(ChunkTable.open, dir_path)
+        else:
+            mapping_path = dir_path / mapping_filename
+            async with aiofiles.open(mapping_path, "r", encoding="utf-8") as f:
+                content = await f.read()
+                id_mapping = json.loads(content)
+        index: faiss.Index
+        if load_mode == "mmap":
+            index = await asyncio.to_thread(read_index_mmap, index_path)
+        else:
+            async with aiofiles.open(index_path, "rb") as f:
+                index_bytes = await f.read()
+                index = await asyncio.to_thread(
+                    lambda: faiss.deserialize_index(
+                        np.frombuffer(index_bytes, dtype=np.uint8)
+                    )
                 )
+        search_params = await load_search_params(dir_path)  # 构建时保存的nprobe/efSearch
+        apply_search_params(index, search_params)
+        chunk_meta = await load_chunk_meta(dir_path)
+        sources, meta = chunk_meta if chunk_meta is not None else (None, None)
+        lexical = await asyncio.to_thread(LexicalIndex.open, dir_path)
+        store = None
+        if rerank > 0 and (Path(directory) / META_FILENAME).exists():
+            store = await asyncio.to_thread(VectorStore.open, directory)
+            if store.hashes is None:  # 无法确认存储中的行与索引版本一致
+                store = None
+        return cls(
+            index=index,
+            id_mapping=id_mapping,
+            generation=generation,
+            search_params=search_params,
+            sources=sources,
+            chunk_meta=meta,
+            lexical=lexical,
+            store=store,
+            rerank=rerank,
+        )
+
+    def allowed_rows(self, sources: Iterable[str]) -> np.ndarray:
+        """返回来自指定文件的全部行号。
+
+        sources 中的每一项可以是文件的相对路径，也可以是目录前缀（匹配其下所有文件）。
+        """
+        key = frozenset(sources)
+        cached = self._allowed_cache.get(key)
+        if cached is not None:
+            return cached
+        if self.chunk_meta is None:
+            raise ValueError("当前索引没有来源信息,无法按来源过滤,请重新向量化")
+        prefixes = tuple(s.rstrip("/") + "/" for s in key)
+        source_ids = [
+            i
+            for i, name in enumerate(self.sources)
+            if name in key or name.startswith(prefixes)
+        ]
+        rows = np.flatnonzero(np.isin(self.chunk_meta["source"], source_ids))
+        if len(self._allowed_cache) >= 64:
+            self._allowed_cache.clear()
+        self._allowed_cache[key] = rows.astype(np.int64)
+        return self._allowed_cache[key]
+
+    def _build_result(self, row: int, score: float) -> SearchResult:
+        result = SearchResult(text=self.id_mapping[row], score=score, chunk_id=row)
+        if self.chunk_meta is not None and row < len(self.chunk_meta):
+            meta = self.chunk_meta[row]
+            if meta["source"] >= 0:
+                result.source = self.sources[meta["source"]]
+                result.offset = int(meta["offset"]) if meta["offset"] >= 0 else None
+                result.ordinal = int(meta["ordinal"])
+        return result
+
+    def _search_sync(
+        self,
+        query_np: np.ndarray,
+        top_k: int,
+        min_score: float | None = None,
+        allowed: np.ndarray | None = None,
+    ) -> list[list[SearchResult]]:
+        if allowed is not None and len(allowed) == 0:
+            return [[] for _ in range(len(query_np))]
+        faiss.normalize_L2(query_np)  # 归一化
+        distances: np.ndarray
+        indices: np.ndarray
+        reranking = self.store is not None and self.rerank > top_k
+        k = self.rerank if reranking else top_k
+        if allowed is None:
+            distances, indices = self.index.search(query_np, k)  # type: ignore
+        else:  # 过滤在 faiss 内部完成，top_k 个结果全部来自指定文件
+            params = self.search_params.to_faiss_parameters(
+                faiss.IDSelectorBatch(allowed)
             )
-        return cls(index=index, id_mapping=id_mapping)
+            distances, indices = self.index.search(query_np, k, params=params)  # type: ignore
+        if reranking:
+            distances, indices = self._rerank(query_np, distances, indices, top_k)
+        keep = indices != -1
+        if min_score is not None:
+            keep &= distances >= min_score
+        return [
+            [
+                self._build_result(int(idx), float(score))
+                for idx, score in zip(row_ids[row_keep], row_scores[row_keep])
+            ]
+            for row_ids, row_scores, row_keep in zip(indices, distances, keep)
+        ]
+
+    def _verified(self, rows: np.ndarray) -> np.ndarray:
+        """返回各行在向量存储中的内容是否与本索引版本一致。
+
+        非增量重建会重写向量存储，此时旧版本的行号可能指向其他文本，按内容哈希确认。
+        每次查询只校验本次的候选（通常不超过 rerank 个），不缓存校验结果，
+        长期运行时内存不随检索过的行数增长。
+        """
+        assert self.store is not None and self.store.hashes is not None
+        ok = rows < self.store.count
+        for i in np.flatnonzero(ok):
+            row = int(rows[i])
+            if self.store.hashes[row].tobytes() != chunk_hash(self.id_mapping[row]):
+                ok[i] = False
+        return ok
+
+    def _rerank(
+        self,
+        query_np: np.ndarray,
+        distances: np.ndarray,
+        indices: np.ndarray,
+        top_k: int,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """用存储中的向量精确计算候选的相似度，重排后截取 top_k。
+
+        无法确认内容一致的候选保留索引给出的近似相似度。
+        """
+        assert self.store is not None
+        out_scores = np.full((len(indices), top_k), -np.inf, dtype=np.float32)
+        out_ids = np.full((len(indices), top_k), -1, dtype=np.int64)
+        for i, (ids, scores) in enumerate(zip(indices, distances)):
+            keep = ids != -1
+            ids, scores = ids[keep], scores[keep].copy()
+            exact = self._verified(ids)
+            if exact.any():
+                vectors = self.store.read_rows(ids[exact])
+                faiss.normalize_L2(vectors)
+                scores[exact] = vectors @ query_np[i]
+            order = np.argsort(-scores, kind="stable")[:top_k]
+            out_scores[i, : len(order)] = scores[order]
+            out_ids[i, : len(order)] = ids[order]
+        return out_scores, out_ids
+
+    def _fuse(
+        self,
+        dense: list[SearchResult],
+        lexical_rows: np.ndarray,
+        lexical_scores: np.ndarray,
+        top_k: int,
+        min_score: float | None,
+    ) -> list[SearchResult]:
+        """按倒数排名融合两路结果。
+
+        min_score 约束全部结果：向量检索的候选未经过滤，按相似度截断；只由关键词命中的
+        结果没有向量相似度，设置了 min_score 时被丢弃，不会绕过阈值。
+        """
+        fused: dict[int, SearchResult] = {}
+        for rank, result in enumerate(dense, start=1):
+            result.fused_score = 1.0 / (RRF_K + rank)
+            fused[result.chunk_id] = result
+        for rank, (row, score) in enumerate(zip(lexical_rows, lexical_scores), start=1):
+            result = fused.get(int(row))
+            if result is None:
+                result = self._build_result(int(row), 0.0)
+                result.fused_score = 0.0
+                fused[result.chunk_id] = result
+            result.lexical_score = float(score)
+            result.fused_score = (result.fused_score or 0.0) + 1.0 / (RRF_K + rank)
+        dense_ids = {r.chunk_id for r in dense}
+        merged = [
+            r
+            for r in fused.values()
+            if min_score is None or (r.chunk_id in dense_ids and r.score >= min_score)
+        ]
+        merged.sort(key=lambda r: r.fused_score or 0.0, reverse=True)
+        return merged[:top_k]
+
+    async def search_many(
+        self,
+        query_vectors: list[list[float]] | np.ndarray,
+        top_k: int,
+        min_score: float | None = None,
+        sources: Iterable[str] | None = None,
+        query_texts: list[str | None] | None = None,
+    ) -> list[list[SearchResult]]:
+        """批量搜索多个查询向量。
+
+        所有查询合并为一个矩阵，只做一次线程切换和一次 FAISS 批量检索。
+        传入 query_texts 且索引带有 BM25 倒排索引时进行混合检索：
+        两路各取 2 * top_k 个候选并行检索，再按倒数排名融合。
+
+        Args:
+            query_vectors: 查询向量列表或形状为 (n, dim) 的数组。
+            top_k: 每个查询返回的最相似结果数量。
+            min_score: 最低余弦相似度，低于该值的结果被丢弃；混合检索时只由关键词命中、
+                没有向量相似度的结果也被丢弃。
+            sources: 只在这些来源文件（或目录前缀）中检索，为 None 时不限制。
+            query_texts: 与查询向量一一对应的查询文本，为 None 的项只做向量检索。
+
+        Returns:
+            与查询一一对应的结果列表，向量检索时按相似度降序，
+            混合检索时按融合分数降序排列。
+        """
+        query_np = np.array(query_vectors, dtype="float32", order="C", copy=True)
+        if len(query_np) == 0:
+            return []
+        allowed = None if sources is None else self.allowed_rows(sources)
+        if self.lexical is None or query_texts is None or not any(query_texts):
+            return await asyncio.to_thread(
+                self._search_sync, query_np, top_k, min_score, allowed
+            )
+        candidates = top_k * 2
+        dense, lexical = await asyncio.gather(
+            asyncio.to_thread(self._search_sync, query_np, candidates, None, allowed),
+            asyncio.to_thread(
+                self.lexical.search_many, query_texts, candidates, allowed
+            ),
+        )
+        return [
+            self._fuse(dense_row, rows, scores, top_k, min_score)
+            for dense_row, (rows, scores) in zip(dense, lexical)
+        ]
 
     async def search(
         self,
         query_vector: list[float],
         top_k: int,
-    ) -> list[str]:
+        min_score: float | None = None,
+        sources: Iterable[str] | None = None,
+    ) -> list[SearchResult]:
         """根据查询向量搜索最相似的文档。
 
         对查询向量进行 L2 归一化后，使用 FAISS 索引进行相似度搜索。
@@ -67,17 +379,19 @@ class SearchVectors:
         Args:
             query_vector: 查询向量，浮点数列表。
             top_k: 返回的最相似结果数量。
+            min_score: 最低余弦相似度，低于该值的结果被丢弃。
+            sources: 只在这些来源文件（或目录前缀）中检索，为 None 时不限制。
 
         Returns:
-            匹配的文档 ID 列表，按相似度降序排列。
+            带相似度与来源信息的结果列表，按相似度降序排列。
         """
-        query_np = np.array([query_vector], dtype="float32")
-        await asyncio.to_thread(faiss.normalize_L2, query_np)  # 归一化
-        distances: np.ndarray
-        indices: np.ndarray
-        distances, indices = await asyncio.to_thread(self.index.search, query_np, top_k)  # type: ignore
-        results = [self.id_mapping[idx] for idx in indices[0] if idx != -1]
-        return results
+        results = await self.search_many(
+            query_vectors=[query_vector],
+            top_k=top_k,
+            min_score=min_score,
+            sources=sources,
+        )
+        return results[0]
 
     @staticmethod
     def _extract_embedding(result: dict[str, Any]) -> list[float]:
@@ -86,30 +400,85 @@ class SearchVectors:
         embedding: list[float] = data[0]["embedding"]
         return embedding
 
+    @staticmethod
+    def _extract_embeddings(result: dict[str, Any]) -> list[list[float]]:
+        """从 API 响应中按输入顺序提取全部嵌入向量。"""
+        data: list[dict[str, Any]] = sorted(
+            result.get("data", []), key=lambda x: x["index"]
+        )
+        return [item["embedding"] for item in data]
+
     async def search_by_text(
         self,
-        siliconflow_embedding: SiliconFlowEmbedding,
+        siliconflow_embedding: EmbeddingProvider,
         query_text: str,
         model: str,
         top_k: int = 5,
-    ) -> list[str]:
+        min_score: float | None = None,
+        sources: Iterable[str] | None = None,
+    ) -> list[SearchResult]:
         """根据文本查询搜索最相似的文档。
 
         先将文本转换为嵌入向量，然后进行向量相似度搜索。
 
         Args:
-            siliconflow_embedding: SiliconFlow Embedding 客户端实例。
+            siliconflow_embedding: embedding 服务客户端。
             query_text: 查询文本。
             model: 用于生成嵌入向量的模型名称。
             top_k: 返回的最相似结果数量，默认为 5。
+            min_score: 最低余弦相似度，低于该值的结果被丢弃。
+            sources: 只在这些来源文件（或目录前缀）中检索。
 
         Returns:
-            匹配的文档 ID 列表，按相似度降序排列。
+            带相似度与来源信息的结果列表，有 BM25 倒排索引时为混合检索结果。
         """
         result = await siliconflow_embedding.get_embedding(
             text=[query_text],
             model=model,
         )
         vector = self._extract_embedding(result=result)
-        matched_ids = await self.search(query_vector=vector, top_k=top_k)
-        return matched_ids
+        results = await self.search_many(
+            query_vectors=[vector],
+            top_k=top_k,
+            min_score=min_score,
+            sources=sources,
+            query_texts=[query_text],
+        )
+        return results[0]
+
+    async def search_many_by_text(
+        self,
+        siliconflow_embedding: EmbeddingProvider,
+        query_texts: list[str],
+        model: str,
+        top_k: int = 5,
+        min_score: float | None = None,
+        sources: Iterable[str] | None = None,
+    ) -> list[list[SearchResult]]:
+        """批量文本查询：一次 embedding 请求加一次批量检索。
+
+        Args:
+            siliconflow_embedding: embedding 服务客户端。
+            query_texts: 查询文本列表。
+            model: 用于生成嵌入向量的模型名称。
+            top_k: 每个查询返回的最相似结果数量，默认为 5。
+            min_score: 最低余弦相似度，低于该值的结果被丢弃。
+            sources: 只在这些来源文件（或目录前缀）中检索。
+
+        Returns:
+            与查询文本一一对应的结果列表。
+        """
+        if not query_texts:
+            return []
+        result = await siliconflow_embedding.get_embedding(
+            text=query_texts,
+            model=model,
+        )
+        vectors = self._extract_embeddings(result=result)
+        return await self.search_many(
+            query_vectors=vectors,
+            top_k=top_k,
+            min_score=min_score,
+            sources=sources,
+            query_texts=list(query_texts),
+        )
@@ -1,34 +1,153 @@
+import asyncio
+import time
+
 import httpx
 
-from config import EmbeddingConfig
+from config import EmbeddingConfig, EmbeddingEndpoint
 from utils.retry_utils import create_retry_manager
 
+from .base import EmbeddingProvider
+from .embedding_cache import EmbeddingCache
+from .endpoint_pool import EndpointPool, EndpointState
+from .rate_limiter import AdaptiveRateLimiter, estimate_tokens, parse_retry_after
+
+
+def is_retryable(error: BaseException) -> bool:
+    """判断错误是否值得重试或换端点。
+
+    网络错误、429 与 5xx 可以重试；其余 4xx 是请求或密钥本身的问题，
+    重试与换端点都无济于事，也不计入端点的健康度。
+    """
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status == 429 or status >= 500
+    return isinstance(error, httpx.RequestError)
+
+
+def _settled(task: asyncio.Task) -> bool:
+    """任务成功，或失败原因换端点也无法解决，可以直接取其结果。"""
+    error = task.exception()
+    return error is None or not is_retryable(error)
+
+
+class SiliconFlowEmbedding(EmbeddingProvider):
+    """OpenAI 兼容接口的 embedding 服务客户端。
+
+    主端点与 embedding_config.endpoints 中的备用端点按健康度选择，失败的端点
+    在重试时被切换掉。配置了备用端点时，不经过限流器的请求（检索时的查询）在首选端点
+    超过其近期 p95 延迟仍未返回时，向另一个端点再发一份对冲请求，取先返回的结果并取消另一个；
+    经过限流器的批量请求不做对冲，以免消耗额外的配额。
+    """
 
-class SiliconFlowEmbedding:
     def __init__(
-        self, embedding_config: EmbeddingConfig, client: httpx.AsyncClient
+        self,
+        embedding_config: EmbeddingConfig,
+        client: httpx.AsyncClient,
+        cache: EmbeddingCache | None = None,
+        rate_limiter: AdaptiveRateLimiter | None = None,
     ) -> None:
+        super().__init__(cache=cache)
         self.embedding_config = embedding_config
         self.client = client
+        self.rate_limiter = rate_limiter
+        self.endpoints = EndpointPool(
+            [
+                EmbeddingEndpoint(
+                    base_url=embedding_config.base_url,
+                    api_key=embedding_config.api_key,
+                ),
+                *embedding_config.endpoints,
+            ]
+        )
 
     async def _send_request(
         self,
         model: str,
         text: str|list[str],
+        rate_limiter: AdaptiveRateLimiter | None = None,
+        endpoint: EndpointState | None = None,
         **kwargs,
     ) -> dict:
-        payload = {"model": model, "input": text}
+        state = endpoint or self.endpoints.ranked()[0]
+        payload = {"model": state.endpoint.model_name or model, "input": text}
+        api_key = state.endpoint.api_key or self.embedding_config.api_key
         headers = {
-            "Authorization": f"Bearer {self.embedding_config.api_key}",
+            "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json",
         }
-        response = await self.client.post(
-            self.embedding_config.base_url, json=payload, headers=headers
+        limiter = rate_limiter or self.rate_limiter
+        tokens = 0
+        if limiter is not None:
+            tokens = estimate_tokens(text)
+            await limiter.acquire(tokens)
+        start = time.monotonic()
+        try:
+            response = await self.client.post(
+                state.endpoint.base_url, json=payload, headers=headers
+            )
+            if limiter is not None and response.status_code == 429:
+                limiter.on_rate_limited(
+                    parse_retry_after(response.headers.get("Retry-After"))
+                )
+            response.raise_for_status()
+        except (httpx.HTTPStatusError, httpx.RequestError) as e:
+            if is_retryable(e):
+                state.on_failure(time.monotonic())
+            raise
+        latency = time.monotonic() - start
+        state.on_success(latency)
+        result = response.json()
+        if limiter is not None:
+            usage = result.get("usage") or {}
+            limiter.on_success(
+                latency=latency,
+                estimated_tokens=tokens,
+                actual_tokens=usage.get("total_tokens", 0),
+            )
+        return result
+
+    async def _send_hedged(self, model: str, text: str|list[str]) -> dict:
+        """向首选端点发送请求，超过对冲等待时间仍未返回时向下一个端点再发一份。
+
+        只在配置了多个端点时调用。首选端点在等待期内失败时立即改用下一个端点；
+        4xx 等不可重试的错误直接抛出，两份请求都失败时抛出最后一个异常。
+        """
+        primary, backup = self.endpoints.ranked()[:2]
+        first = asyncio.create_task(
+            self._send_request(model=model, text=text, endpoint=primary)
+        )
+        delay = self.endpoints.hedge_delay(
+            primary,
+            quantile=self.embedding_config.hedge_quantile,
+            minimum=self.embedding_config.hedge_min_delay,
         )
-        response.raise_for_status()
-        return response.json()
+        pending: set[asyncio.Task[dict]] = {first}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if done and _settled(first):
+                return first.result()
+            if done:  # 首选端点已失败，不必再等
+                pending = set()
+            second = asyncio.create_task(
+                self._send_request(model=model, text=text, endpoint=backup)
+            )
+            pending.add(second)
+            error: BaseException | None = first.exception() if done else None
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if _settled(task):
+                        return task.result()
+                    error = task.exception()
+            assert error is not None
+            raise error
+        finally:
+            for task in pending:  # 取消较慢的一份，连接由httpx回收
+                task.cancel()
 
-    async def get_embedding(
+    async def _embed(
         self,
         model: str,
         text: str|list[str],
@@ -41,9 +160,19 @@ class SiliconFlowEmbedding:
                 httpx.HTTPStatusError,
                 httpx.RequestError,
             ),
+            error_checker=is_retryable,
+        )
+        limiter = kwargs.get("rate_limiter") or self.rate_limiter
+        # 只有一个端点时对冲请求会发往同一个已经变慢的端点，只会加重负载
+        hedge = (
+            limiter is None
+            and self.embedding_config.hedge_quantile > 0
+            and len(self.endpoints.states) > 1
         )
         async for attempt in retrier:
             with attempt:
+                if hedge:
+                    return await self._send_hedged(model=model, text=text)
                 response = await self._send_request(model=model, text=text, **kwargs)
                 return response
         raise RuntimeError("Retries exhausted")  # 规避下类型检查,这行是死代码
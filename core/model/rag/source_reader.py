@@ -0,0 +1,191 @@
+"""RAG 源文件读取模块。
+
+按固定大小分块读取文件，逐块解码并去除空白，每个文件只在内存中保留规范化后的一份文本。
+多个文件在线程中并发读取，但按路径顺序产出，预读的文件数量有上限。
+不同格式由可注册的加载器处理，.gz 文件按去掉 .gz 后的后缀选择加载器。
+"""
+
+import asyncio
+import codecs
+import gzip
+import json
+from collections import deque
+from pathlib import Path
+from typing import AsyncIterator, BinaryIO, Callable, Iterator
+
+from log import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_BLOCK_SIZE = 1 << 20
+
+# (BOM, 编码)，UTF-32 LE 的 BOM 以 UTF-16 LE 的 BOM 开头，需要先判断
+_BOMS: tuple[tuple[bytes, str], ...] = (
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+FALLBACK_ENCODING = "gb18030"
+
+# 加载器从二进制流中逐段产出原始文本，encoding 为 None 时自动检测
+type SourceLoader = Callable[[BinaryIO, str | None, int], Iterator[str]]
+
+
+def detect_encoding(head: bytes) -> str:
+    """按 BOM、UTF-8、GB18030 的顺序判断编码。"""
+    for bom, encoding in _BOMS:
+        if head.startswith(bom):
+            return encoding
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+    except UnicodeDecodeError:
+        return FALLBACK_ENCODING
+    return "utf-8"
+
+
+def decode_stream(
+    stream: BinaryIO, encoding: str | None = None, block_size: int = DEFAULT_BLOCK_SIZE
+) -> Iterator[str]:
+    """按固定大小读取并增量解码，多字节字符跨块时由增量解码器拼接。"""
+    head = stream.read(block_size)
+    decoder = codecs.getincrementaldecoder(encoding or detect_encoding(head))()
+    block = head
+    while block:
+        yield decoder.decode(block)
+        block = stream.read(block_size)
+    yield decoder.decode(b"", final=True)
+
+
+def load_text(
+    stream: BinaryIO, encoding: str | None = None, block_size: int = DEFAULT_BLOCK_SIZE
+) -> Iterator[str]:
+    """纯文本与 Markdown 加载器。"""
+    return decode_stream(stream, encoding, block_size)
+
+
+def load_jsonl(
+    stream: BinaryIO, encoding: str | None = None, block_size: int = DEFAULT_BLOCK_SIZE
+) -> Iterator[str]:
+    """JSON Lines 加载器，依次取每行的 text 或 content 字段，其他行跳过。"""
+    buffer = ""
+    for piece in decode_stream(stream, encoding, block_size):
+        lines = (buffer + piece).split("\n")
+        buffer = lines.pop()
+        for line in lines:
+            text = _jsonl_text(line)
+            if text:
+                yield text
+    text = _jsonl_text(buffer)
+    if text:
+        yield text
+
+
+def _jsonl_text(line: str) -> str | None:
+    line = line.strip()
+    if not line:
+        return None
+    record = json.loads(line)
+    if not isinstance(record, dict):
+        return None
+    value = record.get("text", record.get("content"))
+    return value if isinstance(value, str) else None
+
+
+LOADERS: dict[str, SourceLoader] = {
+    ".txt": load_text,
+    ".md": load_text,
+    ".markdown": load_text,
+    ".jsonl": load_jsonl,
+}
+
+
+def register_loader(suffix: str, loader: SourceLoader) -> None:
+    """注册指定后缀（如 ".html"）的加载器，覆盖已有的同名加载器。"""
+    LOADERS[suffix.lower()] = loader
+
+
+def _resolve_loader(path: Path) -> tuple[SourceLoader | None, bool]:
+    suffixes = [s.lower() for s in path.suffixes]
+    compressed = bool(suffixes) and suffixes[-1] == ".gz"
+    if compressed:
+        suffixes.pop()
+    suffix = suffixes[-1] if suffixes else ""
+    return LOADERS.get(suffix), compressed
+
+
+def load_source(path: Path, block_size: int = DEFAULT_BLOCK_SIZE) -> str:
+    """读取一个源文件并去除全部空白字符。
+
+    UTF-8 解码到中途失败时（文件开头恰好只有 ASCII）改用 GB18030 从头读取。
+    """
+    loader, compressed = _resolve_loader(path)
+    if loader is None:
+        raise ValueError(f"没有可用的加载器: {path}")
+    with open(path, "rb") as raw:
+        stream: BinaryIO = gzip.GzipFile(fileobj=raw) if compressed else raw  # type: ignore
+        try:
+            parts = ["".join(p.split()) for p in loader(stream, None, block_size)]
+        except UnicodeDecodeError:
+            stream.seek(0)
+            parts = [
+                "".join(p.split())
+                for p in loader(stream, FALLBACK_ENCODING, block_size)
+            ]
+    return "".join(parts)
+
+
+def list_sources(root: Path, patterns: list[str]) -> list[Path]:
+    """返回目录下匹配任一模式的文件，按相对路径排序。"""
+    paths = {p for pattern in patterns for p in root.rglob(pattern) if p.is_file()}
+    return sorted(paths, key=lambda p: p.relative_to(root).as_posix())
+
+
+async def iter_sources(
+    folder_path: str | Path,
+    patterns: list[str] | None = None,
+    concurrency: int = 8,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+) -> AsyncIterator[tuple[str, str]]:
+    """并发读取目录下的源文件，按相对路径顺序逐个产出。
+
+    最多同时读取 concurrency 个文件；调用方处理变慢时不再预读，
+    因此驻留内存的文本不超过 concurrency 个文件。读取失败的文件记录错误后跳过。
+
+    Args:
+        folder_path: 源目录。
+        patterns: 文件匹配模式，默认只读取 *.txt。
+        concurrency: 同时读取的文件数量上限。
+        block_size: 每次读取的字节数。
+
+    Yields:
+        (相对路径, 去除空白后的文本) 二元组。
+    """
+    root = Path(folder_path)
+    paths = await asyncio.to_thread(list_sources, root, patterns or ["*.txt"])
+    pending: deque[tuple[str, asyncio.Task[str]]] = deque()
+
+    async def next_ready() -> tuple[str, str] | None:
+        name, task = pending.popleft()
+        try:
+            return name, await task
+        except (OSError, ValueError, EOFError) as e:  # 解码与 JSON 错误都是 ValueError
+            logger.error(f"读取源文件失败,已跳过 {name}: {e}")
+            return None
+
+    try:
+        for path in paths:
+            task = asyncio.create_task(asyncio.to_thread(load_source, path, block_size))
+            pending.append((path.relative_to(root).as_posix(), task))
+            if len(pending) >= max(concurrency, 1):
+                item = await next_ready()
+                if item is not None:
+                    yield item
+        while pending:
+            item = await next_ready()
+            if item is not None:
+                yield item
+    finally:
+        for _, task in pending:
+            task.cancel()
@@ -0,0 +1,424 @@
+"""二进制向量存储模块。
+
+向量以原始行块的形式追加写入 vectors.bin，文本以 UTF-8 数据块
+追加写入 texts.bin，并在 offsets.bin 中记录每条文本的结束偏移量，
+hashes.bin 记录每条文本的内容哈希，供增量向量化时复用已有向量。
+读取时通过 np.memmap 映射文件，不需要把全部向量或文本载入内存。
+
+向量可以按 float32、float16 或 int8 存储：int8 为逐行对称标量量化，
+每行的缩放系数以 float32 写入 scales.bin，读取时还原为 float32。
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Iterator, Literal, Self
+
+import aiofiles
+import numpy as np
+from pydantic import BaseModel
+
+VECTORS_FILENAME = "vectors.bin"
+TEXTS_FILENAME = "texts.bin"
+OFFSETS_FILENAME = "offsets.bin"
+HASHES_FILENAME = "hashes.bin"
+SCALES_FILENAME = "scales.bin"
+META_FILENAME = "vector_meta.json"
+
+OFFSET_DTYPE = np.dtype("<i8")
+SCALE_DTYPE = np.dtype("<f4")
+HASH_SIZE = 16
+
+type StorageDtype = Literal["float32", "float16", "int8"]
+
+
+def chunk_hash(text: str) -> bytes:
+    """计算文本块的内容哈希。"""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=HASH_SIZE).digest()
+
+
+class VectorStoreMeta(BaseModel):
+    dim: int
+    dtype: StorageDtype = "float32"
+
+
+def quantize_int8(vectors: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """逐行对称量化为 int8，返回 (量化值, 每行缩放系数)。"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    scales = np.abs(vectors).max(axis=1) / 127
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(SCALE_DTYPE)
+
+
+def _encode(vectors: np.ndarray, dtype: StorageDtype) -> tuple[bytes, bytes]:
+    """将一批向量编码为 vectors.bin 与 scales.bin 中的字节。"""
+    if dtype == "int8":
+        codes, scales = quantize_int8(vectors)
+        return codes.tobytes(), scales.tobytes()
+    stored = np.ascontiguousarray(vectors, dtype=np.dtype(dtype).newbyteorder("<"))
+    return stored.tobytes(), b""
+
+
+class VectorStoreWriter:
+    """追加式向量存储写入器。
+
+    每次 append 写入一个批次的向量与文本，行号即写入顺序。
+    维度由第一个批次确定，并写入元数据文件。
+
+    Args:
+        directory: 存储目录。
+        append: 为 True 时在已有存储末尾继续追加，否则清空重建。
+        max_rows: 追加模式下保留的最大行数，超出的行被截掉，用于回退到任务日志的提交点。
+        dtype: 新建存储时的向量存储类型，追加到已有存储时沿用其原有类型。
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        append: bool = False,
+        max_rows: int | None = None,
+        dtype: StorageDtype = "float32",
+    ) -> None:
+        self.directory = Path(directory)
+        self.append_mode = append
+        self.max_rows = max_rows
+        self.dtype: StorageDtype = dtype
+        self.dim: int | None = None
+        self.count = 0
+        self._text_size = 0
+        self._vector_file = None
+        self._text_file = None
+        self._offset_file = None
+        self._hash_file = None
+        self._scale_file = None
+
+    def _files(self) -> tuple:
+        return (
+            self._vector_file,
+            self._text_file,
+            self._offset_file,
+            self._hash_file,
+            self._scale_file,
+        )
+
+    async def open(self) -> None:
+        """打开存储文件，追加模式下先截掉未完整写入的尾部数据。"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        mode = "ab"
+        if self.append_mode and (self.directory / META_FILENAME).exists():
+            store = VectorStore.open(self.directory)
+            self.dim = store.dim
+            self.dtype = store.dtype
+            self.count = store.count
+            if self.max_rows is not None:
+                self.count = min(self.count, self.max_rows)
+            self._text_size = int(store.offsets[self.count - 1]) if self.count else 0
+            has_hashes = store.hashes is not None
+            del store  # 截断前释放内存映射
+            self._truncate_tail(has_hashes)
+        else:
+            # 先删除再新建：正在映射旧文件的进程继续读取旧内容，不会因文件被截断而出错
+            for name in (
+                META_FILENAME,
+                VECTORS_FILENAME,
+                TEXTS_FILENAME,
+                OFFSETS_FILENAME,
+                HASHES_FILENAME,
+                SCALES_FILENAME,
+            ):
+                (self.directory / name).unlink(missing_ok=True)
+            mode = "wb"
+        self._vector_file = await aiofiles.open(
+            self.directory / VECTORS_FILENAME, mode
+        )
+        self._text_file = await aiofiles.open(self.directory / TEXTS_FILENAME, mode)
+        self._offset_file = await aiofiles.open(
+            self.directory / OFFSETS_FILENAME, mode
+        )
+        self._hash_file = await aiofiles.open(self.directory / HASHES_FILENAME, mode)
+        if self.dtype == "int8":
+            self._scale_file = await aiofiles.open(
+                self.directory / SCALES_FILENAME, mode
+            )
+
+    def _truncate_tail(self, has_hashes: bool) -> None:
+        """将各文件截断到 count 行，缺失的哈希从文本重新计算。"""
+        assert self.dim is not None
+        sizes = {
+            VECTORS_FILENAME: self.count * self.dim * np.dtype(self.dtype).itemsize,
+            OFFSETS_FILENAME: self.count * OFFSET_DTYPE.itemsize,
+            TEXTS_FILENAME: self._text_size,
+        }
+        if self.dtype == "int8":
+            sizes[SCALES_FILENAME] = self.count * SCALE_DTYPE.itemsize
+        for name, size in sizes.items():
+            os.truncate(self.directory / name, size)
+        hash_path = self.directory / HASHES_FILENAME
+        if has_hashes:
+            os.truncate(hash_path, self.count * HASH_SIZE)
+            return
+        store = VectorStore.open(self.directory)
+        with open(hash_path, "wb") as f:
+            for text in store.iter_texts():
+                f.write(chunk_hash(text))
+        del store
+
+    async def _write_meta(self, dim: int) -> None:
+        meta = VectorStoreMeta(dim=dim, dtype=self.dtype)
+        async with aiofiles.open(
+            self.directory / META_FILENAME, "w", encoding="utf-8"
+        ) as f:
+            await f.write(meta.model_dump_json())
+
+    async def append(self, texts: list[str], vectors: np.ndarray) -> range:
+        """追加一个批次，返回该批次占用的行号区间。"""
+        if (
+            self._vector_file is None
+            or self._text_file is None
+            or self._offset_file is None
+            or self._hash_file is None
+            or (self.dtype == "int8" and self._scale_file is None)
+        ):
+            raise RuntimeError("向量存储尚未打开")
+        if vectors.ndim != 2 or vectors.shape[0] != len(texts):
+            raise ValueError(
+                f"向量形状 {vectors.shape} 与文本数量 {len(texts)} 不匹配"
+            )
+        if self.dim is None:
+            self.dim = int(vectors.shape[1])
+            await self._write_meta(self.dim)
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"向量维度不一致: {vectors.shape[1]} != {self.dim}")
+        encoded = [t.encode("utf-8") for t in texts]
+        ends = self._text_size + np.cumsum(
+            [len(b) for b in encoded], dtype=OFFSET_DTYPE
+        )
+        vector_bytes, scale_bytes = _encode(vectors, self.dtype)
+        await self._vector_file.write(vector_bytes)
+        if self._scale_file is not None:
+            await self._scale_file.write(scale_bytes)
+        await self._text_file.write(b"".join(encoded))
+        await self._offset_file.write(ends.astype(OFFSET_DTYPE).tobytes())
+        await self._hash_file.write(b"".join(chunk_hash(t) for t in texts))
+        self._text_size = int(ends[-1]) if len(ends) else self._text_size
+        start = self.count
+        self.count += len(texts)
+        return range(start, self.count)
+
+    async def flush(self, sync: bool = False) -> None:
+        """将已追加的批次刷新到操作系统，sync 为 True 时再同步到磁盘。
+
+        进程崩溃时已刷新的数据不会丢失，断电时只有同步过的数据不会丢失。
+        """
+        for f in self._files():
+            if f is None:
+                continue
+            await f.flush()
+            if sync:
+                await asyncio.to_thread(os.fsync, f.fileno())
+
+    async def close(self) -> None:
+        for f in self._files():
+            if f is not None:
+                await f.close()
+        self._vector_file = self._text_file = None
+        self._offset_file = self._hash_file = self._scale_file = None
+
+    async def __aenter__(self) -> Self:
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+
+class VectorStore:
+    """只读的内存映射向量存储。
+
+    Attributes:
+        vectors: 形状为 (count, dim) 的内存映射数组，类型为存储类型；
+            需要 float32 向量时使用 read_rows 或 iter_blocks。
+        scales: int8 存储的每行缩放系数，其他存储类型为 None。
+        hashes: 形状为 (count, HASH_SIZE) 的文本哈希数组，旧版存储中可能缺失。
+        count: 完整写入的行数。
+        dim: 向量维度。
+        dtype: 向量存储类型。
+    """
+
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        offsets: np.ndarray,
+        texts: np.ndarray,
+        hashes: np.ndarray | None = None,
+        scales: np.ndarray | None = None,
+        dtype: StorageDtype = "float32",
+    ) -> None:
+        self.vectors = vectors
+        self.offsets = offsets
+        self.texts = texts
+        self.hashes = hashes
+        self.scales = scales
+        self.dtype: StorageDtype = dtype
+        self.count = int(vectors.shape[0])
+        self.dim = int(vectors.shape[1])
+
+    @classmethod
+    def open(cls, directory: str | Path) -> Self:
+        """映射目录中的存储文件。
+
+        行数取向量（及缩放系数）、偏移量与文本文件中都已完整写入的行数，
+        因此写入中断后残留的半行数据会被忽略。
+        """
+        dir_path = Path(directory)
+        meta_path = dir_path / META_FILENAME
+        meta = VectorStoreMeta(**json.loads(meta_path.read_text(encoding="utf-8")))
+        dtype = np.dtype(meta.dtype).newbyteorder("<")
+        row_bytes = meta.dim * dtype.itemsize
+        vector_path = dir_path / VECTORS_FILENAME
+        offset_path = dir_path / OFFSETS_FILENAME
+        text_path = dir_path / TEXTS_FILENAME
+        scale_path = dir_path / SCALES_FILENAME
+        count = min(
+            vector_path.stat().st_size // row_bytes,
+            offset_path.stat().st_size // OFFSET_DTYPE.itemsize,
+        )
+        if meta.dtype == "int8":
+            count = min(count, scale_path.stat().st_size // SCALE_DTYPE.itemsize)
+        offsets = _memmap(offset_path, OFFSET_DTYPE, (count,))
+        count = int(
+            np.searchsorted(offsets, text_path.stat().st_size, side="right")
+        )
+        offsets = offsets[:count]
+        vectors = _memmap(vector_path, dtype, (count, meta.dim))
+        scales = None
+        if meta.dtype == "int8":
+            scales = _memmap(scale_path, SCALE_DTYPE, (count,))
+        text_size = int(offsets[-1]) if count else 0
+        texts = _memmap(text_path, np.dtype(np.uint8), (text_size,))
+        hash_path = dir_path / HASHES_FILENAME
+        hashes = None
+        if hash_path.exists() and hash_path.stat().st_size >= count * HASH_SIZE:
+            hashes = _memmap(hash_path, np.dtype(np.uint8), (count, HASH_SIZE))
+        return cls(
+            vectors=vectors,
+            offsets=offsets,
+            texts=texts,
+            hashes=hashes,
+            scales=scales,
+            dtype=meta.dtype,
+        )
+
+    @property
+    def bytes_per_vector(self) -> int:
+        """每行向量占用的存储字节数（含缩放系数）。"""
+        size = self.dim * self.vectors.dtype.itemsize
+        return size + (SCALE_DTYPE.itemsize if self.scales is not None else 0)
+
+    def read_rows(self, rows: np.ndarray | slice) -> np.ndarray:
+        """读取指定行并还原为可写的连续 float32 数组。"""
+        block = np.array(self.vectors[rows], dtype=np.float32, order="C", copy=True)
+        if self.scales is not None:
+            block *= np.asarray(self.scales[rows], dtype=np.float32)[:, None]
+        return block
+
+    def __len__(self) -> int:
+        return self.count
+
+    def get_text(self, row: int) -> str:
+        start = int(self.offsets[row - 1]) if row > 0 else 0
+        end = int(self.offsets[row])
+        return self.texts[start:end].tobytes().decode("utf-8")
+
+    def iter_texts(self) -> Iterator[str]:
+        for row in range(self.count):
+            yield self.get_text(row)
+
+    def hash_index(self) -> dict[bytes, int]:
+        """返回文本哈希到行号的映射，重复文本取最早写入的行。"""
+        if self.hashes is None:
+            raise ValueError("向量存储缺少哈希文件")
+        index: dict[bytes, int] = {}
+        for row in range(self.count):
+            index.setdefault(self.hashes[row].tobytes(), row)
+        return index
+
+    def iter_blocks(
+        self, block_size: int, rows: np.ndarray | None = None
+    ) -> Iterator[tuple[np.ndarray, np.ndarray]]:
+        """按块复制出可写的连续 float32 向量。
+
+        Args:
+            block_size: 每块最多包含的行数。
+            rows: 需要读取的行号（升序），为 None 时读取全部行。
+
+        Yields:
+            (行号数组, 向量块) 二元组。
+        """
+        if rows is None:
+            rows = np.arange(self.count, dtype=np.int64)
+        for start in range(0, len(rows), block_size):
+            ids = rows[start : start + block_size]
+            if len(ids) and ids[-1] - ids[0] + 1 == len(ids):  # 连续行直接切片
+                yield ids, self.read_rows(slice(int(ids[0]), int(ids[-1]) + 1))
+            else:
+                yield ids, self.read_rows(ids)
+
+
+def compact_store(
+    directory: str | Path, rows: np.ndarray, block_size: int = 65536
+) -> None:
+    """只保留指定的行重写向量存储，保留的行依次编号为 0..len(rows)-1。
+
+    增量更新只在存储末尾追加，删除或改动的文本块留下的行不会再被引用，需要定期压缩。
+    向量按原有存储类型逐块复制，不会重新量化；新文件写完后逐个原子替换旧文件，
+    已经映射旧文件的进程继续读取旧内容。
+
+    Args:
+        directory: 存储目录。
+        rows: 需要保留的行号（升序）。
+        block_size: 每次复制的行数。
+
+    Raises:
+        ValueError: 存储缺少哈希文件。
+    """
+    dir_path = Path(directory)
+    store = VectorStore.open(dir_path)
+    if store.hashes is None:
+        raise ValueError("向量存储缺少哈希文件")
+    names = [VECTORS_FILENAME, TEXTS_FILENAME, OFFSETS_FILENAME, HASHES_FILENAME]
+    if store.scales is not None:
+        names.append(SCALES_FILENAME)
+    tmp_paths = {name: dir_path / f"{name}.compact" for name in names}
+    bounds = np.concatenate(([0], store.offsets)).astype(np.int64)
+    text_size = 0
+    files = {name: open(path, "wb") for name, path in tmp_paths.items()}
+    try:
+        for start in range(0, len(rows), block_size):
+            ids = np.asarray(rows[start : start + block_size], dtype=np.int64)
+            files[VECTORS_FILENAME].write(store.vectors[ids].tobytes())
+            if store.scales is not None:
+                files[SCALES_FILENAME].write(store.scales[ids].tobytes())
+            files[HASHES_FILENAME].write(store.hashes[ids].tobytes())
+            starts, ends = bounds[ids], bounds[ids + 1]
+            for text_start, text_end in zip(starts, ends):
+                files[TEXTS_FILENAME].write(store.texts[text_start:text_end].tobytes())
+            new_ends = text_size + np.cumsum(ends - starts, dtype=OFFSET_DTYPE)
+            files[OFFSETS_FILENAME].write(new_ends.astype(OFFSET_DTYPE).tobytes())
+            text_size = int(new_ends[-1]) if len(new_ends) else text_size
+    finally:
+        for f in files.values():
+            f.close()
+    del store  # 替换前释放内存映射
+    for name, path in tmp_paths.items():
+        os.replace(path, dir_path / name)
+
+
+def _memmap(path: Path, dtype: np.dtype, shape: tuple[int, ...]) -> np.ndarray:
+    """创建只读内存映射；空文件无法映射，直接返回空数组。"""
+    if not shape[0]:
+        return np.empty(shape, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=shape)
@@ -1,4 +1,5 @@
-from .base import AllEvent
+from .base import AllEvent, GroupMessage
+from core.model.api.base import At, Text
 from pydantic import TypeAdapter, ValidationError
 from typing import Any
 
@@ -13,4 +14,17 @@ class Event:
             return adapter.validate_python(self.msg_dict)
         except ValidationError:
             return None
-    
+
+
+def mentioned_text(event: GroupMessage) -> str | None:
+    """返回 @ 机器人的群消息中的文本，没有 @ 机器人或没有文本时返回 None。"""
+    mentioned = any(
+        isinstance(segment, At) and str(segment.data.qq) == str(event.self_id)
+        for segment in event.message
+    )
+    if not mentioned:
+        return None
+    text = "".join(
+        segment.data.text for segment in event.message if isinstance(segment, Text)
+    ).strip()
+    return text or None
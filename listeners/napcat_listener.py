@@ -4,7 +4,9 @@ from dishka import AsyncContainer
 from typing import Callable
 import secrets
 from core.model.api import BotApi
-from .event import get_event
+from core.model.llm import GroupChatReplier
+from .base import GroupMessage
+from .event import Event, mentioned_text
 import uvicorn
 from log import get_logger
 
@@ -34,6 +36,7 @@ class NapCat:
         async def websocket_endpoint(
             websocket: WebSocket,
             bot_factory: FromDishka[Callable[[WebSocket], BotApi]],
+            replier: FromDishka[GroupChatReplier],
         ) -> None:
             try:
                 await self._check_auth_token(websocket=websocket)
@@ -46,7 +49,16 @@ class NapCat:
             try:
                 while True:
                     data_dict = await websocket.receive_json()
-                    event = get_event(msg_dict=data_dict)
+                    event = Event(msg_dict=data_dict).get_event()
+                    if isinstance(event, GroupMessage) and (
+                        text := mentioned_text(event)
+                    ):
+                        replier.reply_in_background(
+                            bot,
+                            group_id=event.group_id,
+                            text=text,
+                            reply=event.message_id,
+                        )
             except WebSocketDisconnect:
                 pass
 
@@ -36,8 +36,8 @@ if TYPE_CHECKING:
 # 日志配置常量
 # ================================
 
-# 日志目录
-LOG_DIR = Path("logs")
+# 日志目录 (可通过环境变量覆盖)
+LOG_DIR = Path(os.getenv("LOG_DIR", "logs"))
 LOG_DIR.mkdir(exist_ok=True)
 
 # 日志级别 (可通过环境变量覆盖)
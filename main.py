@@ -1,5 +1,6 @@
 import json
 import secrets
+from contextlib import asynccontextmanager
 from typing import Callable
 import uvicorn
 from dishka import make_async_container
@@ -7,12 +8,23 @@ from dishka.integrations.fastapi import FromDishka, setup_dishka, inject
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, status
 from core.ioc import MyProvider
 from core.model.api import BotApi
+from core.model.llm import GroupChatReplier
+from listeners.base import GroupMessage
+from listeners.event import Event, mentioned_text
 from log import setup_exception_handler, logger
 
 setup_exception_handler()
 
-app = FastAPI()
 container = make_async_container(MyProvider())
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await container.close()  # 关闭连接池、停止索引热加载等APP级资源
+
+
+app = FastAPI(lifespan=lifespan)
 setup_dishka(container, app)
 
 
@@ -22,6 +34,7 @@ async def websocket_endpoint(
     websocket: WebSocket,
     client_id: int,
     bot_factory: FromDishka[Callable[[WebSocket], BotApi]],
+    replier: FromDishka[GroupChatReplier],
 ) -> None:
     headers = websocket.headers
     auth_header = headers.get("authorization", "")
@@ -40,6 +53,11 @@ async def websocket_endpoint(
             file_path = "debug.jsonl"
             with open(file_path, "a", encoding="utf-8") as f:
                 f.write(json.dumps(data_dict, ensure_ascii=False) + "\n")
+            event = Event(msg_dict=data_dict).get_event()
+            if isinstance(event, GroupMessage) and (text := mentioned_text(event)):
+                replier.reply_in_background(
+                    bot, group_id=event.group_id, text=text, reply=event.message_id
+                )
     except WebSocketDisconnect:
         logger.info(f"用户 {client_id} 已断开连接")
 
@@ -1,12 +1,14 @@
+import argparse
 import asyncio
-import httpx
-from config import EmbeddingConfig
+from config import EmbeddingConfig, HttpConfig
 from core.model.rag import (
-    SiliconFlowEmbedding,
+    EmbeddingCache,
     VectorizeConfig,
+    create_embedding_provider,
     vectorize_text,
 )
-from log import setup_exception_handler
+from log import logger, setup_exception_handler
+from utils import HttpClientPool
 
 setup_exception_handler()
 embedding_config = EmbeddingConfig(
@@ -16,20 +18,41 @@ embedding_config = EmbeddingConfig(
     provider_type="siliconflow",
     retry_count=20,
     retry_delay=5,
+    cache_path="cache/embedding.sqlite3",
+)
+# 并发请求数由consumer_count与限流器控制，超出连接数的请求在池中排队等待
+http_pool = HttpClientPool(HttpConfig(max_connections=64, pool_timeout=None))
+# provider_type改为"onnx"并设置model_path时使用本地模型，检索时需使用同一模型
+se = create_embedding_provider(
+    embedding_config=embedding_config,
+    client=http_pool.client,
+    cache=EmbeddingCache.from_config(embedding_config),
 )
-client = httpx.AsyncClient()
-se = SiliconFlowEmbedding(client=client, embedding_config=embedding_config)
 config = VectorizeConfig(
     tokens_per_minute=1000,
     consumer_count=1000,
 )
+parser = argparse.ArgumentParser(description="向量化源文件目录并构建索引")
+parser.add_argument("folder", nargs="?", help="源文件目录，不指定时交互输入")
+parser.add_argument(
+    "--resume",
+    action="store_true",
+    help="恢复中断的任务，已写入向量存储的批次不再调用embedding接口",
+)
 async def main():
-    folder_str = input("输入路径")
-    await vectorize_text(
-        folder_str=folder_str,
-        vectorize_config=config,
-        siliconflow_embedding=se,
-        model=embedding_config.model_name,
-    )
+    args = parser.parse_args()
+    folder_str = args.folder or input("输入路径")
+    try:
+        await vectorize_text(
+            folder_str=folder_str,
+            vectorize_config=config,
+            siliconflow_embedding=se,
+            model=embedding_config.model_name,
+            resume=args.resume,
+        )
+    finally:
+        logger.info(f"连接池状态: {http_pool.stats()}")
+        await se.aclose()
+        await http_pool.aclose()
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,8 @@
+"""测试运行时的日志设置，须在导入 log 模块之前生效。"""
+
+import os
+import tempfile
+
+# 测试产生的日志写入临时目录，不污染仓库的 logs/
+os.environ.setdefault("LOG_DIR", tempfile.mkdtemp(prefix="rag-test-logs-"))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
@@ -0,0 +1,49 @@
+"""测试共用的 embedding 替身与索引构建工具。"""
+
+import asyncio
+import hashlib
+from pathlib import Path
+
+import numpy as np
+
+from core.model.rag import EmbeddingProvider, VectorizeConfig, vectorize_text
+
+DIM = 16
+
+
+def fake_vector(text: str) -> list[float]:
+    """由文本哈希确定的向量，同一文本总是得到同一个向量。"""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    return np.random.default_rng(seed).standard_normal(DIM).tolist()
+
+
+class FakeEmbedding(EmbeddingProvider):
+    """不访问网络的 embedding 后端，记录每次请求的文本数。"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.requests: list[int] = []
+
+    async def _embed(self, model: str, text: str | list[str], **kwargs) -> dict:
+        texts = [text] if isinstance(text, str) else text
+        self.requests.append(len(texts))
+        await asyncio.sleep(0)
+        return {
+            "model": model,
+            "data": [
+                {"index": i, "embedding": fake_vector(t)} for i, t in enumerate(texts)
+            ],
+        }
+
+
+def build_index(root: Path, files: dict[str, str], **config) -> Path:
+    """把 files 写入 root/src 并向量化，返回向量库目录 root/vector。"""
+    src = root / "src"
+    src.mkdir(parents=True)
+    for name, text in files.items():
+        (src / name).write_text(text, encoding="utf-8")
+    vectorize_config = VectorizeConfig(
+        min_chunk_size=5, max_chunk_size=20, consumer_count=2, **config
+    )
+    asyncio.run(vectorize_text(str(src), vectorize_config, FakeEmbedding(), "m"))
+    return root / "vector"
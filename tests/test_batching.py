@@ -0,0 +1,95 @@
+"""embedding 请求分批与失败二分拆分的测试。"""
+
+import asyncio
+
+import numpy as np
+
+from core.model.rag import AdaptiveRateLimiter, RateLimitConfig
+from core.model.rag.batching import BatchPacker, BatchStats, pack_batches
+from core.model.rag.rag_pipeline import EmbeddingBatch, embed_with_bisection
+
+from tests.helpers import FakeEmbedding, fake_vector
+
+
+class LimitedEmbedding(FakeEmbedding):
+    """拒绝超过 max_texts 条的批次与包含 bad 中文本的批次，记录成功向量化的文本。"""
+
+    def __init__(self, max_texts: int, bad: tuple[str, ...] = ()) -> None:
+        super().__init__()
+        self.max_texts = max_texts
+        self.bad = bad
+        self.embedded: list[str] = []
+
+    async def _embed(self, model: str, text: str | list[str], **kwargs) -> dict:
+        texts = [text] if isinstance(text, str) else text
+        if len(texts) > self.max_texts or any(t in self.bad for t in texts):
+            raise ValueError("批次被拒绝")
+        self.embedded += texts
+        return await super()._embed(model, texts, **kwargs)
+
+
+def test_pack_batches_respects_item_limit_and_order() -> None:
+    chunks = [f"块{i}" for i in range(7)]
+    batches = list(pack_batches(chunks, max_items=3))
+    assert batches == [chunks[0:3], chunks[3:6], chunks[6:7]]
+
+
+def test_pack_batches_respects_token_budget() -> None:
+    chunks = ["一二三四", "五六七", "八九", "十" * 12, "甲"]
+    batches = list(pack_batches(chunks, max_items=10, max_tokens=8))
+    # 再加入下一个会超出预算时换批次，超出预算的单个文本块独占一批
+    assert batches == [["一二三四", "五六七"], ["八九"], ["十" * 12], ["甲"]]
+
+
+def test_packer_flush_returns_partial_batch_once() -> None:
+    packer = BatchPacker(max_items=2)
+    assert packer.add("a") is None
+    assert packer.add("b") is None
+    assert packer.add("c") == ["a", "b"]
+    assert packer.flush() == ["c"]
+    assert packer.flush() is None
+
+
+def bisect(
+    chunk: list[str], embedding: FakeEmbedding
+) -> tuple[list[EmbeddingBatch], BatchStats]:
+    stats = BatchStats(max_items=len(chunk))
+
+    async def run() -> list[EmbeddingBatch]:
+        queue: asyncio.Queue[EmbeddingBatch | None] = asyncio.Queue()
+        await embed_with_bisection(
+            chunk=chunk,
+            rate_limiter=AdaptiveRateLimiter(RateLimitConfig(requests_per_minute=6000)),
+            siliconflow_embedding=embedding,
+            result_queue=queue,
+            model="m",
+            stats=stats,
+        )
+        return [queue.get_nowait() for _ in range(queue.qsize())]
+
+    return asyncio.run(run()), stats
+
+
+def test_bisection_embeds_every_chunk_once_in_order() -> None:
+    chunk = [f"第{i}块" for i in range(10)]
+    embedding = LimitedEmbedding(max_texts=3)
+    batches, stats = bisect(chunk, embedding)
+
+    assert embedding.embedded == chunk
+    assert [t for b in batches for t in b.texts] == chunk
+    assert all(len(b.texts) <= 3 for b in batches)
+    for batch in batches:  # 向量与文本一一对应
+        expected = np.array([fake_vector(t) for t in batch.texts], dtype=np.float32)
+        assert np.allclose(batch.vectors, expected)
+    assert stats.splits > 0 and stats.dropped == 0
+
+
+def test_bisection_drops_only_the_failing_chunk() -> None:
+    chunk = [f"第{i}块" for i in range(6)]
+    embedding = LimitedEmbedding(max_texts=6, bad=("第4块",))
+    batches, stats = bisect(chunk, embedding)
+
+    expected = [t for t in chunk if t != "第4块"]
+    assert embedding.embedded == expected
+    assert [t for b in batches for t in b.texts] == expected
+    assert stats.dropped == 1
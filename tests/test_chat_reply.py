@@ -0,0 +1,140 @@
+"""群聊回复的测试。"""
+
+import asyncio
+import json
+from typing import AsyncIterator
+
+from config import ChatConfig
+from core.model.api import BotApi
+from core.model.llm import GroupChatReplier, LLMHandler
+from core.model.llm.base import ChatMessage, LLMProvider, LLMProviderWrapper
+from listeners.base import GroupMessage
+from listeners.event import mentioned_text
+
+DELTAS = ["你好", "，我是", "机器人", "。", "有什么", "可以帮你", "？"]
+
+
+class FakeProvider(LLMProvider):
+    """分成多段流式返回固定的回答，记录每次收到的上下文。"""
+
+    def __init__(self) -> None:
+        self.calls: list[list[ChatMessage]] = []
+
+    async def get_ai_response(self, messages: list, model: str, **kwargs) -> str:
+        self.calls.append(list(messages))
+        return "".join(DELTAS)
+
+    async def stream_ai_response(
+        self, messages: list, model: str, **kwargs
+    ) -> AsyncIterator[str]:
+        self.calls.append(list(messages))
+        for delta in DELTAS:
+            await asyncio.sleep(0)
+            yield delta
+
+
+class FakeWebSocket:
+    def __init__(self) -> None:
+        self.sent: list[dict] = []
+
+    async def send_text(self, text: str) -> None:
+        self.sent.append(json.loads(text))
+
+
+def make_replier(stream_reply: bool) -> tuple[GroupChatReplier, FakeProvider]:
+    provider = FakeProvider()
+    handler = LLMHandler(
+        services=[LLMProviderWrapper(model_vendors="fake", provider=provider)]
+    )
+    config = ChatConfig(
+        model_vendors="fake",
+        model_name="m",
+        system_prompt="你是群聊机器人",
+        stream_reply=stream_reply,
+        segment_min_chars=4,
+    )
+    return GroupChatReplier(llm_handler=handler, chat_config=config), provider
+
+
+def sent_texts(websocket: FakeWebSocket) -> list[list[tuple[str, str]]]:
+    return [
+        [
+            (seg["type"], str(next(iter(seg["data"].values()))))
+            for seg in msg["params"]["message"]
+        ]
+        for msg in websocket.sent
+    ]
+
+
+def test_stream_reply_sends_one_message_per_sentence() -> None:
+    replier, provider = make_replier(stream_reply=True)
+    websocket = FakeWebSocket()
+    bot = BotApi(websocket)  # type: ignore
+
+    answer = asyncio.run(replier.reply(bot, group_id=1, text="你是谁", reply=42))
+    assert answer == "你好，我是机器人。\n有什么可以帮你？"
+    assert sent_texts(websocket) == [
+        [("reply", "42"), ("text", "你好，我是机器人。")],
+        [("text", "有什么可以帮你？")],
+    ]
+    asyncio.run(replier.reply(bot, group_id=1, text="再说一遍", reply=None))
+    history = [(m.role, m.text) for m in provider.calls[-1]]
+    assert history == [
+        ("system", "你是群聊机器人"),
+        ("user", "你是谁"),
+        ("assistant", answer),
+        ("user", "再说一遍"),
+    ]
+
+
+def test_reply_without_stream_sends_whole_answer() -> None:
+    replier, _ = make_replier(stream_reply=False)
+    websocket = FakeWebSocket()
+    answer = asyncio.run(
+        replier.reply(BotApi(websocket), group_id=1, text="你是谁", reply=42)  # type: ignore
+    )
+    assert answer == "".join(DELTAS)
+    assert sent_texts(websocket) == [[("reply", "42"), ("text", answer)]]
+
+
+def test_mentioned_text_requires_at_bot() -> None:
+    def event(*segments: dict) -> GroupMessage:
+        return GroupMessage.model_validate(
+            {
+                "post_type": "message",
+                "message_type": "group",
+                "self_id": 10,
+                "user_id": 20,
+                "message_id": 30,
+                "group_id": 40,
+                "group_name": "g",
+                "sender": {"user_id": 20, "nickname": "n"},
+                "message": list(segments),
+            }
+        )
+
+    at_bot = {"type": "at", "data": {"qq": "10"}}
+    at_other = {"type": "at", "data": {"qq": "11"}}
+    text = {"type": "text", "data": {"text": " 你好 "}}
+    assert mentioned_text(event(at_bot, text)) == "你好"
+    assert mentioned_text(event(at_other, text)) is None
+    assert mentioned_text(event(at_bot)) is None
+
+
+def test_reply_in_background_logs_failures() -> None:
+    replier, provider = make_replier(stream_reply=False)
+
+    class BrokenWebSocket(FakeWebSocket):
+        async def send_text(self, text: str) -> None:
+            raise ConnectionError("连接已断开")
+
+    async def run() -> None:
+        task = replier.reply_in_background(
+            BotApi(BrokenWebSocket()), group_id=1, text="你是谁", reply=None  # type: ignore
+        )
+        assert task in replier._tasks
+        await task  # 异常在任务内记录日志，不向外抛出
+        assert task not in replier._tasks
+
+    asyncio.run(run())
+    assert len(provider.calls) == 1
@@ -0,0 +1,59 @@
+"""文本块表写入与读取的往返测试。"""
+
+import asyncio
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from core.model.rag import VectorStore, VectorStoreWriter, chunk_table
+from core.model.rag.chunk_table import ChunkTable, write_chunk_table
+
+TEXTS = ["第一块", "second", "第三块😀", "四", "fifth 第五", "六六六", "seven", "第八"]
+
+
+def make_store(directory: Path) -> VectorStore:
+    async def write() -> None:
+        async with VectorStoreWriter(directory) as writer:
+            vectors = np.eye(len(TEXTS), dtype=np.float32)
+            await writer.append(TEXTS[:3], vectors[:3])
+            await writer.append(TEXTS[3:], vectors[3:])
+
+    directory.mkdir()
+    asyncio.run(write())
+    return VectorStore.open(directory)
+
+
+@pytest.mark.parametrize("copy_block", [3, 64 << 20])
+def test_round_trip_with_gaps(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, copy_block: int
+) -> None:
+    monkeypatch.setattr(chunk_table, "_COPY_BLOCK_BYTES", copy_block)
+    store = make_store(tmp_path / "store")
+    rows = np.array([6, 0, 1, 2, 5, 2], dtype=np.int64)  # 无序且有重复
+    table_dir = tmp_path / "table"
+    table_dir.mkdir()
+    asyncio.run(write_chunk_table(store, rows, table_dir))
+
+    assert ChunkTable.exists(table_dir)
+    table = ChunkTable.open(table_dir)
+    assert len(table) == store.count
+    expected = [t if i in {0, 1, 2, 5, 6} else "" for i, t in enumerate(TEXTS)]
+    assert list(table) == expected  # 不在索引中的行为空文本
+    assert table[2] == "第三块😀"
+    assert table[-2] == "seven"
+
+
+def test_empty_table(tmp_path: Path) -> None:
+    store = make_store(tmp_path / "store")
+    table_dir = tmp_path / "table"
+    table_dir.mkdir()
+    asyncio.run(write_chunk_table(store, np.array([], dtype=np.int64), table_dir))
+
+    table = ChunkTable.open(table_dir)
+    assert len(table) == store.count
+    assert set(table) == {""}
+
+
+def test_missing_table(tmp_path: Path) -> None:
+    assert not ChunkTable.exists(tmp_path)
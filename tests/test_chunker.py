@@ -0,0 +1,82 @@
+"""split_text_fast 与参考实现 split_text_optimized 的一致性测试。"""
+
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from core.model.rag import VectorStore
+from core.model.rag.chunker import split_text_fast, split_text_optimized
+from core.model.rag.manifest import IndexManifest
+
+from tests.helpers import build_index
+
+MIN_CHUNK_SIZE = 10
+MAX_CHUNK_SIZE = 20
+
+CORPUS = [
+    # 短于 min_chunk_size 与恰好等于 max_chunk_size 的文本不切分
+    "",
+    "短文本。",
+    "一" * (MIN_CHUNK_SIZE - 1),
+    "二" * (MAX_CHUNK_SIZE - 1) + "。",
+    "三" * MAX_CHUNK_SIZE,
+    "四" * (MAX_CHUNK_SIZE + 1),
+    # 强分隔符恰好落在 min_chunk_size 前后与窗口最后一个字符上
+    "甲" * (MIN_CHUNK_SIZE - 1) + "。" + "乙" * 30,
+    "甲" * MIN_CHUNK_SIZE + "。" + "乙" * 30,
+    "甲" * (MAX_CHUNK_SIZE - 1) + "。" + "乙" * 30,
+    "甲" * MAX_CHUNK_SIZE + "。" + "乙" * 30,
+    # 没有强分隔符：退回弱分隔符，或按窗口长度强制切分后重新扫描
+    "这是一段没有句号的文本，只有逗号；还有分号，一直延续下去，没有结束的标志，继续写"
+    * 3,
+    "没有任何分隔符的超长文本" * 10,
+    "弱" * 15 + "，" + "强" * 40,
+    # 引号内的分隔符不切分：配对、嵌套、不配对的左引号与多余的右引号
+    "他说：“今天天气很好。我们出去走走吧！”然后大家就出发了。路上遇到了老朋友。" * 3,
+    "“外层引号里“还有内层。”继续外层。”引号之外的句子。再来一句话结束。" * 3,
+    "“只有左引号的段落。后面的句号都在引号里面。一直没有闭合。还在继续。" * 3,
+    "多余的右引号”出现在这里。”又一个。之后的句子应当正常切分。最后一句。" * 3,
+    "“" * 5 + "深层嵌套。" + "”" * 5 + "嵌套结束后的句子。再来一句。" * 3,
+    # 中英文标点混排与增补平面字符
+    "Hello world. This is English, with commas; and semicolons! Does it split? Yes."
+    * 3,
+    "𠀀𠀁𠀂𠀃𠀄𠀅𠀆𠀇𠀈𠀉𠀊。" * 6 + "结尾",
+]
+
+
+@pytest.mark.parametrize("text", CORPUS)
+def test_split_text_fast_matches_reference(text: str) -> None:
+    expected = split_text_optimized([text], MIN_CHUNK_SIZE, MAX_CHUNK_SIZE)
+    assert split_text_fast([text], MIN_CHUNK_SIZE, MAX_CHUNK_SIZE) == expected
+    assert "".join(expected) == text
+
+
+@pytest.mark.parametrize("sizes", [(1, 1), (1, 5), (5, 5), (10, 20), (0, 8)])
+def test_split_text_fast_matches_reference_for_sizes(sizes: tuple[int, int]) -> None:
+    min_size, max_size = sizes
+    assert split_text_fast(CORPUS, min_size, max_size) == split_text_optimized(
+        CORPUS, min_size, max_size
+    )
+
+
+def file_chunks(vector_dir: Path) -> dict[str, list[str]]:
+    """按清单取出每个文件的文本块，与向量写入存储的顺序无关。"""
+    manifest = asyncio.run(IndexManifest.load(vector_dir))
+    assert manifest is not None
+    store = VectorStore.open(vector_dir)
+    return {
+        name: [store.get_text(row) for row in entry.rows]
+        for name, entry in manifest.files.items()
+    }
+
+
+def test_vectorize_process_pool_keeps_order(tmp_path: Path) -> None:
+    files = {f"{i:02d}.txt": text for i, text in enumerate(CORPUS) if text}
+    serial = build_index(tmp_path / "serial", files)
+    pooled = build_index(tmp_path / "pooled", files, chunk_workers=2)
+    expected = file_chunks(serial)
+    assert file_chunks(pooled) == expected
+    for name, text in files.items():  # 与单独切分该文件（读取时已去除空白）的结果一致
+        chunks = split_text_optimized(["".join(text.split())], 5, 20)
+        assert expected[name] == [c for c in chunks if c]
@@ -0,0 +1,76 @@
+"""增量更新后压缩向量存储的测试。"""
+
+import asyncio
+from pathlib import Path
+
+from core.model.rag import (
+    SearchVectors,
+    VectorizeConfig,
+    VectorStore,
+    vectorize_text,
+)
+from core.model.rag.manifest import IndexManifest
+from core.model.rag.vector_store import chunk_hash
+
+from tests.helpers import FakeEmbedding, build_index, fake_vector
+
+
+def records(prefix: str, count: int) -> str:
+    return "".join(f"{prefix}第{i}条记录。" for i in range(count))
+
+
+def update(root: Path, files: dict[str, str], **config) -> FakeEmbedding:
+    """改写 root/src 中的文件后增量向量化，返回本次使用的 embedding 替身。"""
+    for name, text in files.items():
+        (root / "src" / name).write_text(text, encoding="utf-8")
+    embedding = FakeEmbedding()
+    vectorize_config = VectorizeConfig(
+        min_chunk_size=5,
+        max_chunk_size=20,
+        consumer_count=2,
+        incremental=True,
+        **config,
+    )
+    asyncio.run(vectorize_text(str(root / "src"), vectorize_config, embedding, "m"))
+    return embedding
+
+
+def test_incremental_update_compacts_dead_rows(tmp_path: Path) -> None:
+    vector_dir = build_index(
+        tmp_path,
+        {"keep.txt": records("保留", 20), "edit.txt": records("旧版", 30)},
+        incremental=True,
+    )
+    initial = VectorStore.open(vector_dir).count
+    update(tmp_path, {"edit.txt": records("新版", 30)})
+
+    store = VectorStore.open(vector_dir)
+    manifest = asyncio.run(IndexManifest.load(vector_dir))
+    assert manifest is not None
+    assert store.count == len(manifest.live_rows()) < initial + 30
+    for name in ("keep.txt", "edit.txt"):  # 清单中的行号指向压缩后的行
+        entry = manifest.files[name]
+        texts = [store.get_text(row) for row in entry.rows]
+        assert [store.hashes[row].tobytes() for row in entry.rows] == [
+            chunk_hash(t) for t in texts
+        ]
+        assert texts[0].startswith("保留" if name == "keep.txt" else "新版")
+
+    async def search(query: str) -> list:
+        search_vectors = await SearchVectors.create_from_directory(
+            str(vector_dir), rerank=20
+        )
+        return await search_vectors.search(fake_vector(query), top_k=1)
+
+    assert asyncio.run(search("保留第7条记录。"))[0].text == "保留第7条记录。"
+    assert asyncio.run(search("新版第7条记录。"))[0].text == "新版第7条记录。"
+    assert not update(tmp_path, {}).requests  # 压缩后的清单仍可用于增量更新
+
+
+def test_compaction_disabled_keeps_rows(tmp_path: Path) -> None:
+    vector_dir = build_index(
+        tmp_path, {"edit.txt": records("旧版", 30)}, incremental=True
+    )
+    initial = VectorStore.open(vector_dir).count
+    update(tmp_path, {"edit.txt": records("新版", 30)}, compact_threshold=0)
+    assert VectorStore.open(vector_dir).count > initial
@@ -0,0 +1,79 @@
+"""文本块去重的测试。"""
+
+from core.model.rag import VectorizeConfig
+from core.model.rag.dedup import (
+    ChunkDeduplicator,
+    NearDuplicateIndex,
+    jaccard,
+    shingle_set,
+)
+from core.model.rag.vector_store import chunk_hash
+
+ARTICLE = (
+    "第{n}条 当事人对行政处罚决定不服的，可以自收到处罚决定书之日起{days}内"
+    "向作出决定的机关的上一级机关申请复议，复议机关应当依法作出决定。"
+)
+
+
+def admit_all(dedup: ChunkDeduplicator, chunks: list[str]) -> list[bool]:
+    return [dedup.admit(chunk_hash(c), c) for c in chunks]
+
+
+def test_near_dup_is_opt_in() -> None:
+    assert VectorizeConfig().near_dup_threshold == 0
+    chunks = [ARTICLE.format(n=n, days="十五日") for n in range(50)]
+    dedup = ChunkDeduplicator(known={})
+    assert all(admit_all(dedup, chunks))
+    assert dedup.stats.near_duplicates == 0
+
+
+def test_exact_duplicates_and_known_chunks() -> None:
+    known_text = ARTICLE.format(n=1, days="十五日")
+    dedup = ChunkDeduplicator(known={chunk_hash(known_text): 0})
+    new_text = ARTICLE.format(n=2, days="十五日")
+    assert admit_all(dedup, [known_text, new_text, new_text]) == [False, True, False]
+    assert dedup.stats.exact_known == 1
+    assert dedup.stats.exact_duplicates == 1
+    assert dedup.stats.embedded == 1
+    assert dedup.queued == {chunk_hash(new_text)}
+
+
+def test_near_duplicate_reuses_representative() -> None:
+    original = "".join(f"第{i}节的内容完全一样，只有结尾不同。" for i in range(6))
+    copy = original + "转载"
+    dedup = ChunkDeduplicator(known={}, near_threshold=0.9)
+    assert jaccard(shingle_set(original), shingle_set(copy)) >= 0.9
+    assert admit_all(dedup, [original, copy]) == [True, False]
+    assert dedup.resolve(chunk_hash(copy)) == chunk_hash(original)
+    assert dedup.resolve(chunk_hash(original)) == chunk_hash(original)
+    assert dedup.stats.near_duplicates == 1
+
+
+def test_candidates_below_exact_jaccard_are_kept() -> None:
+    chunks = [
+        ARTICLE.format(n=n, days=days)
+        for n in range(100)
+        for days in ("十五日", "三十日")
+    ]
+    dedup = ChunkDeduplicator(known={}, near_threshold=0.9)
+    admitted = admit_all(dedup, chunks)
+    for chunk, kept in zip(chunks, admitted):
+        if kept:
+            continue
+        representative = dedup.resolve(chunk_hash(chunk))
+        original = next(c for c in chunks if chunk_hash(c) == representative)
+        # 被替换的文本块与代表文本块的精确相似度一定达到阈值
+        assert jaccard(shingle_set(chunk), shingle_set(original)) >= 0.9
+
+
+def test_index_confirms_candidates_with_exact_jaccard() -> None:
+    index = NearDuplicateIndex(threshold=0.95, num_perm=32, bands=16)
+    base = ARTICLE.format(n=1, days="十五日")
+    other = ARTICLE.format(n=1, days="三十日")
+    similarity = jaccard(shingle_set(base), shingle_set(other))
+    assert similarity < 0.95
+    shingles = shingle_set(base)
+    index.add(b"base", shingles, index.signature(shingles))
+    other_shingles = shingle_set(other)
+    assert index.find(other_shingles, index.signature(other_shingles)) is None
+    assert index.find(shingles, index.signature(shingles)) == b"base"
@@ -0,0 +1,100 @@
+"""EmbeddingCache 与带缓存的 get_embedding 的测试。"""
+
+import asyncio
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from core.model.rag import EmbeddingCache, EmbeddingProvider
+
+from tests.helpers import FakeEmbedding, fake_vector
+
+
+def vectors(texts: list[str]) -> np.ndarray:
+    return np.array([fake_vector(t) for t in texts], dtype=np.float32)
+
+
+def test_memory_lru_evicts_least_recently_used() -> None:
+    cache = EmbeddingCache(memory_size=2)
+
+    async def run() -> list:
+        await cache.put_many("m", ["a", "b"], vectors(["a", "b"]))
+        await cache.get_many("m", ["a"])  # a 变为最近使用
+        await cache.put_many("m", ["c"], vectors(["c"]))
+        return await cache.get_many("m", ["a", "b", "c"])
+
+    a, b, c = asyncio.run(run())
+    assert b is None
+    assert np.allclose(a, fake_vector("a")) and np.allclose(c, fake_vector("c"))
+    assert cache.stats.memory_hits == 3
+    assert cache.stats.misses == 1
+
+
+def test_disk_layer_persists_and_counts_hits(tmp_path: Path) -> None:
+    path = tmp_path / "cache.sqlite"
+    first = EmbeddingCache(path=path, memory_size=0)
+    asyncio.run(first.put_many("m", ["a", "b"], vectors(["a", "b"])))
+    first.close()
+
+    second = EmbeddingCache(path=path, memory_size=8)
+    found = asyncio.run(second.get_many("m", ["a", "b", "c"]))
+    assert found[2] is None
+    assert np.allclose(found[0], fake_vector("a"))
+    assert np.allclose(found[1], fake_vector("b"))
+    assert asyncio.run(second.get_many("other-model", ["a"])) == [None]
+    assert second.stats.disk_hits == 2
+    assert second.stats.misses == 2
+    asyncio.run(second.get_many("m", ["a"]))  # 磁盘命中后回填了内存层
+    assert second.stats.memory_hits == 1
+    assert second.stats.hit_rate == pytest.approx(3 / 5)
+    second.close()
+
+
+def test_disk_layer_evicts_beyond_max_entries(tmp_path: Path) -> None:
+    cache = EmbeddingCache(
+        path=tmp_path / "cache.sqlite", memory_size=0, max_entries=10
+    )
+    texts = [f"t{i}" for i in range(12)]
+    asyncio.run(cache.put_many("m", texts, vectors(texts)))
+    assert cache.stats.evictions == 3  # 超出后淘汰到容量的 90%
+    found = asyncio.run(cache.get_many("m", texts))
+    assert sum(v is not None for v in found) == 9
+    cache.close()
+
+
+def test_partial_hit_merges_in_request_order() -> None:
+    embedding = FakeEmbedding()
+    embedding.cache = EmbeddingCache(memory_size=16)
+
+    async def run() -> dict:
+        await embedding.get_embedding(model="m", text=["b", "d"])
+        return await embedding.get_embedding(model="m", text=["a", "b", "c", "d"])
+
+    result = asyncio.run(run())
+    assert embedding.requests == [2, 2]  # 第二次只请求未命中的 a 与 c
+    assert [item["index"] for item in result["data"]] == [0, 1, 2, 3]
+    for item, text in zip(result["data"], ["a", "b", "c", "d"]):
+        assert np.allclose(item["embedding"], fake_vector(text))
+
+
+class ShortEmbedding(EmbeddingProvider):
+    """少返回一个向量的后端。"""
+
+    async def _embed(self, model: str, text: str | list[str], **kwargs) -> dict:
+        texts = [text] if isinstance(text, str) else text
+        return {
+            "model": model,
+            "data": [
+                {"index": i, "embedding": fake_vector(t)}
+                for i, t in enumerate(texts[:-1])
+            ],
+        }
+
+
+def test_partial_hit_with_short_response_raises() -> None:
+    cache = EmbeddingCache(memory_size=16)
+    asyncio.run(cache.put_many("m", ["b"], vectors(["b"])))
+    embedding = ShortEmbedding(cache=cache)
+    with pytest.raises(ValueError):
+        asyncio.run(embedding.get_embedding(model="m", text=["a", "b", "c"]))
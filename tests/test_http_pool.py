@@ -0,0 +1,23 @@
+"""共享连接池的配置测试。"""
+
+import asyncio
+
+from config import HttpConfig
+from utils import HttpClientPool
+
+
+def test_http2_enabled_by_default() -> None:
+    pool = HttpClientPool(HttpConfig())
+    try:
+        assert pool.client._transport._pool._http2  # type: ignore
+        assert pool.stats().max_connections == HttpConfig().max_connections
+    finally:
+        asyncio.run(pool.aclose())
+
+
+def test_http2_can_be_disabled() -> None:
+    pool = HttpClientPool(HttpConfig(http2=False))
+    try:
+        assert not pool.client._transport._pool._http2  # type: ignore
+    finally:
+        asyncio.run(pool.aclose())
@@ -0,0 +1,110 @@
+"""resolve_index_spec 按规模与配置选择索引结构的测试。"""
+
+import pytest
+
+from core.model.rag.index_builder import (
+    IndexBuildConfig,
+    choose_nlist,
+    choose_pq_m,
+    resolve_index_spec,
+)
+
+DIM = 1024
+
+
+def test_auto_uses_flat_up_to_threshold() -> None:
+    spec = resolve_index_spec(50000, DIM, IndexBuildConfig())
+    assert spec.factory_string == "Flat"
+    assert spec.search_params.to_faiss_string() == ""
+    assert spec.train_size == 0
+
+
+def test_auto_switches_to_ivf_above_threshold() -> None:
+    spec = resolve_index_spec(50001, DIM, IndexBuildConfig())
+    assert spec.factory_string == "IVF894,Flat"  # 4*sqrt(n)
+    assert spec.search_params.nprobe == 55  # nlist/16
+    assert spec.train_size == 50001  # 需要 nlist*64 个样本，但不超过向量总数
+
+
+def test_flat_threshold_is_configurable() -> None:
+    config = IndexBuildConfig(flat_threshold=1000)
+    assert resolve_index_spec(1000, DIM, config).factory_string == "Flat"
+    assert resolve_index_spec(1001, DIM, config).factory_string == "IVF25,Flat"
+
+
+@pytest.mark.parametrize(
+    ("num_vectors", "nlist", "nprobe", "train_size"),
+    [
+        (1_000_000, 4000, 250, 256000),
+        (100_000_000, 40000, 256, 2560000),  # nprobe 上限为 256
+    ],
+)
+def test_ivf_parameters_scale_with_size(
+    num_vectors: int, nlist: int, nprobe: int, train_size: int
+) -> None:
+    spec = resolve_index_spec(num_vectors, DIM, IndexBuildConfig())
+    assert spec.factory_string == f"IVF{nlist},Flat"
+    assert spec.search_params.nprobe == nprobe
+    assert spec.train_size == train_size
+
+
+def test_choose_nlist_keeps_enough_points_per_centroid() -> None:
+    assert choose_nlist(100) == 2  # 每个中心至少 39 个训练样本
+    assert choose_nlist(10) == 1
+
+
+def test_choose_pq_m_divides_dim() -> None:
+    assert choose_pq_m(1024) == 64
+    assert choose_pq_m(96) == 24
+    assert choose_pq_m(6) == 1
+
+
+@pytest.mark.parametrize(
+    ("index_type", "factory_string", "search", "train_size"),
+    [
+        ("hnsw", "HNSW32,Flat", "efSearch=128", 0),
+        ("sq8", "SQ8", "", 65536),
+        ("sqfp16", "SQfp16", "", 65536),
+        ("pq", "IVF1,PQ64x8", "nprobe=1", 9984),
+        ("ivfsq8", "IVF1264,SQ8", "nprobe=79", 80896),
+        ("ivfpq", "IVF1264,PQ64x8", "nprobe=79", 80896),
+        ("opq", "OPQ64,IVF1264,PQ64x8", "nprobe=79", 80896),
+    ],
+)
+def test_explicit_index_types(
+    index_type: str, factory_string: str, search: str, train_size: int
+) -> None:
+    spec = resolve_index_spec(100_000, DIM, IndexBuildConfig(index_type=index_type))
+    assert spec.factory_string == factory_string
+    assert spec.search_params.to_faiss_string() == search
+    assert spec.train_size == train_size
+
+
+def test_train_sample_size_overrides_and_is_capped() -> None:
+    config = IndexBuildConfig(index_type="ivf", train_sample_size=500_000)
+    assert resolve_index_spec(100_000, DIM, config).train_size == 100_000
+
+
+@pytest.mark.parametrize(
+    ("reduction", "index_type", "factory_string", "truncate_dim"),
+    [
+        ("truncate", "flat", "L2norm,Flat", 256),
+        ("pca", "flat", "PCA256,L2norm,Flat", 0),
+        ("opq", "ivfpq", "OPQ64_256,L2norm,IVF1264,PQ64x8", 0),
+        ("opq", "opq", "OPQ64_256,L2norm,IVF1264,PQ64x8", 0),  # 降维由 OPQ 本身完成
+    ],
+)
+def test_reduction_prefix(
+    reduction: str, index_type: str, factory_string: str, truncate_dim: int
+) -> None:
+    config = IndexBuildConfig(
+        index_type=index_type, reduction=reduction, reduced_dim=256
+    )
+    spec = resolve_index_spec(100_000, DIM, config)
+    assert spec.factory_string == factory_string
+    assert spec.truncate_dim == truncate_dim
+
+
+def test_reduced_dim_not_smaller_is_ignored() -> None:
+    config = IndexBuildConfig(index_type="flat", reduction="pca", reduced_dim=DIM)
+    assert resolve_index_spec(100_000, DIM, config).factory_string == "Flat"
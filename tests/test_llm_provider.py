@@ -0,0 +1,78 @@
+"""ResilientLLMProvider 流式重试的测试。"""
+
+import asyncio
+from typing import AsyncGenerator
+
+import pytest
+from openai import APIConnectionError
+
+from config import LLMConfig
+from core.model.llm.base import EmptyResponseError, LLMProvider, ResilientLLMProvider
+
+
+class ScriptedProvider(LLMProvider):
+    """按脚本依次返回每次流式调用的结果，记录关闭的流。
+
+    脚本的每一项为片段列表，或在第一段之前抛出的异常。
+    """
+
+    def __init__(self, script: list[list[str] | Exception]) -> None:
+        self.script = script
+        self.calls = 0
+        self.closed: list[int] = []
+
+    async def get_ai_response(self, messages: list, model: str, **kwargs) -> str:
+        raise NotImplementedError
+
+    async def stream_ai_response(
+        self, messages: list, model: str, **kwargs
+    ) -> AsyncGenerator[str, None]:
+        call = self.calls
+        self.calls += 1
+        step = self.script[call]
+        try:
+            if isinstance(step, Exception):
+                raise step
+            for delta in step:
+                yield delta
+        finally:
+            self.closed.append(call)
+
+
+def make_provider(script: list[list[str] | Exception]) -> tuple:
+    inner = ScriptedProvider(script)
+    config = LLMConfig(
+        api_key="k",
+        base_url="",
+        model_vendors="fake",
+        provider_type="openai",
+        retry_count=2,
+        retry_delay=0,
+    )
+    return ResilientLLMProvider(inner_provider=inner, llm_config=config), inner
+
+
+async def collect(provider: ResilientLLMProvider) -> list[str]:
+    return [d async for d in provider.stream_ai_response(messages=[], model="m")]
+
+
+def test_empty_stream_is_retried() -> None:
+    provider, inner = make_provider([[], ["你好", "。"]])
+    assert asyncio.run(collect(provider)) == ["你好", "。"]
+    assert inner.calls == 2
+    assert inner.closed == [0, 1]
+
+
+def test_failed_stream_is_closed_before_retry() -> None:
+    error = APIConnectionError(request=None)  # type: ignore[arg-type]
+    provider, inner = make_provider([error, ["好"]])
+    assert asyncio.run(collect(provider)) == ["好"]
+    assert inner.closed == [0, 1]
+
+
+def test_empty_stream_fails_after_retries() -> None:
+    provider, inner = make_provider([[], []])
+    with pytest.raises(EmptyResponseError):
+        asyncio.run(collect(provider))
+    assert inner.calls == 2
+    assert inner.closed == [0, 1]
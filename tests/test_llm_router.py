@@ -0,0 +1,131 @@
+"""LLMRouter 回退、冷却、竞速与流式回退的测试。"""
+
+import asyncio
+import random
+from typing import AsyncGenerator
+
+import pytest
+
+from config import LLMRouterConfig
+from core.model.llm.base import LLMProvider, LLMProviderWrapper
+from core.model.llm.router import LLMRouter
+
+
+class FakeProvider(LLMProvider):
+    """按预设的片段回答，片段中的异常在到达时抛出；记录调用的模型与被取消的次数。"""
+
+    def __init__(self, *parts: str | Exception, delay: float = 0.0) -> None:
+        self.parts = parts
+        self.delay = delay
+        self.models: list[str] = []
+        self.cancelled = 0
+
+    async def get_ai_response(self, messages: list, model: str, **kwargs) -> str:
+        self.models.append(model)
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        for part in self.parts:
+            if isinstance(part, Exception):
+                raise part
+        return "".join(str(part) for part in self.parts)
+
+    async def stream_ai_response(
+        self, messages: list, model: str, **kwargs
+    ) -> AsyncGenerator[str, None]:
+        self.models.append(model)
+        for part in self.parts:
+            if isinstance(part, Exception):
+                raise part
+            yield part
+
+
+def make_router(*services: tuple[str, FakeProvider, str], **config) -> LLMRouter:
+    wrappers = [
+        LLMProviderWrapper(model_vendors=vendor, provider=provider, fallback_model=fb)
+        for vendor, provider, fb in services
+    ]
+    return LLMRouter(wrappers, LLMRouterConfig(**config), rng=random.Random(0))
+
+
+def test_fails_over_to_fallback_model() -> None:
+    primary = FakeProvider(RuntimeError("down"))
+    backup = FakeProvider("备用回答")
+    router = make_router(("a", primary, ""), ("b", backup, "b-small"))
+
+    assert asyncio.run(router.route([], "a", "a-large")) == "备用回答"
+    assert primary.models == ["a-large"]
+    assert backup.models == ["b-small"]  # 代答时使用回退厂商自己的模型
+    stats = router.stats()
+    assert stats[0].consecutive_failures == 1
+    assert stats[1].consecutive_failures == 0
+
+
+def test_no_fallback_raises_last_error() -> None:
+    router = make_router(
+        ("a", FakeProvider(RuntimeError("down")), ""),
+        ("b", FakeProvider("备用回答"), "b-small"),
+        fallback=False,
+    )
+    with pytest.raises(RuntimeError, match="down"):
+        asyncio.run(router.route([], "a", "a-large"))
+
+
+def test_cooldown_after_consecutive_failures() -> None:
+    broken = FakeProvider(RuntimeError("down"))
+    healthy = FakeProvider("好", delay=0.01)
+    router = make_router(("a", broken, ""), ("a", healthy, ""))
+
+    for _ in range(2):  # 竞速时两个服务都被请求，坏服务每次都失败
+        assert asyncio.run(router.route([], "a", "m", race=True)) == "好"
+    assert router.stats()[0].consecutive_failures == 2
+    assert router.stats()[0].cooling_down
+    assert router.candidates("a") == [1, 0]  # 冷却中的服务排在最后
+
+    assert asyncio.run(router.route([], "a", "m")) == "好"
+    assert len(broken.models) == 2  # 冷却期间不再被请求
+
+
+def test_race_cancels_the_loser() -> None:
+    slow = FakeProvider("慢", delay=1.0)
+    fast = FakeProvider("快")
+    router = make_router(("a", slow, ""), ("a", fast, ""))
+
+    assert asyncio.run(router.route([], "a", "m", race=True)) == "快"
+    assert slow.cancelled == 1
+    stats = router.stats()
+    assert stats[0].in_flight == 0
+    assert stats[0].consecutive_failures == 0  # 被取消不计为失败
+    assert stats[1].success_rate == 1.0
+
+
+async def collect(router: LLMRouter, out: list[str]) -> None:
+    async for delta in router.stream([], "a", "a-large"):
+        out.append(delta)
+
+
+def test_stream_fails_over_before_first_delta() -> None:
+    primary = FakeProvider(RuntimeError("down"), "不会输出")
+    backup = FakeProvider("你", "好")
+    router = make_router(("a", primary, ""), ("b", backup, "b-small"))
+
+    out: list[str] = []
+    asyncio.run(collect(router, out))
+    assert out == ["你", "好"]
+    assert backup.models == ["b-small"]
+    assert router.stats()[0].consecutive_failures == 1
+
+
+def test_stream_raises_after_first_delta() -> None:
+    primary = FakeProvider("你", RuntimeError("cut off"))
+    backup = FakeProvider("备用")
+    router = make_router(("a", primary, ""), ("b", backup, "b-small"))
+
+    out: list[str] = []
+    with pytest.raises(RuntimeError, match="cut off"):
+        asyncio.run(collect(router, out))
+    assert out == ["你"]  # 已输出的文本不与其他服务的回答拼接
+    assert backup.models == []
+    assert router.stats()[0].consecutive_failures == 1
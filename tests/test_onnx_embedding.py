@@ -0,0 +1,93 @@
+"""本地 ONNX embedding 后端测试，用即时生成的小模型代替真实模型。"""
+
+import asyncio
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+onnx = pytest.importorskip("onnx")
+pytest.importorskip("onnxruntime")
+tokenizers = pytest.importorskip("tokenizers")
+
+from config import EmbeddingConfig  # noqa: E402
+from core.model.rag import OnnxEmbedding, create_embedding_provider  # noqa: E402
+
+HIDDEN = 8
+
+
+def write_model(directory: Path) -> None:
+    """生成逐字切分的 tokenizer 与输出逐 token 向量的查表模型。"""
+    from onnx import TensorProto, helper, numpy_helper
+
+    vocab = {"[PAD]": 0, "[UNK]": 1}
+    for char in "一二三四五六七八九十。":
+        vocab[char] = len(vocab)
+    table = np.random.default_rng(0).standard_normal((len(vocab), HIDDEN))
+    graph = helper.make_graph(
+        [helper.make_node("Gather", ["table", "input_ids"], ["last_hidden_state"])],
+        "lookup",
+        [
+            helper.make_tensor_value_info("input_ids", TensorProto.INT64, ["b", "l"]),
+            helper.make_tensor_value_info(
+                "attention_mask", TensorProto.INT64, ["b", "l"]
+            ),
+        ],
+        [
+            helper.make_tensor_value_info(
+                "last_hidden_state", TensorProto.FLOAT, ["b", "l", HIDDEN]
+            )
+        ],
+        [numpy_helper.from_array(table.astype(np.float32), "table")],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 17)])
+    model.ir_version = 9
+    onnx.save(model, directory / "model.onnx")
+    tokenizer = tokenizers.Tokenizer(
+        tokenizers.models.WordLevel(vocab, unk_token="[UNK]")
+    )
+    tokenizer.pre_tokenizer = tokenizers.pre_tokenizers.Split("", "isolated")
+    tokenizer.save(str(directory / "tokenizer.json"))
+
+
+def make_config(model_path: Path, **kwargs) -> EmbeddingConfig:
+    return EmbeddingConfig(
+        model_name="local",
+        provider_type="onnx",
+        retry_count=1,
+        retry_delay=0,
+        model_path=str(model_path),
+        **kwargs,
+    )
+
+
+def test_factory_selects_onnx_backend(tmp_path: Path) -> None:
+    write_model(tmp_path)
+    provider = create_embedding_provider(make_config(tmp_path))
+    assert isinstance(provider, OnnxEmbedding)
+    asyncio.run(provider.aclose())
+
+
+def test_missing_model_file(tmp_path: Path) -> None:
+    with pytest.raises(FileNotFoundError):
+        OnnxEmbedding(make_config(tmp_path))
+
+
+@pytest.mark.parametrize("pooling", ["mean", "cls", "last"])
+def test_batched_embeddings_match_single(tmp_path: Path, pooling: str) -> None:
+    write_model(tmp_path)
+    provider = OnnxEmbedding(make_config(tmp_path, pooling=pooling, batch_size=2))
+    texts = ["一二三", "四五六七八九十。" * 3, "十", "二三"]
+
+    async def run() -> tuple[dict, list[dict]]:
+        batched = await provider.get_embedding(model="local", text=texts)
+        singles = [await provider.get_embedding(model="local", text=t) for t in texts]
+        await provider.aclose()
+        return batched, singles
+
+    batched, singles = asyncio.run(run())
+    vectors = np.array([item["embedding"] for item in batched["data"]])
+    assert vectors.shape == (len(texts), HIDDEN)
+    np.testing.assert_allclose(np.linalg.norm(vectors, axis=1), 1.0, rtol=1e-5)
+    for vector, single in zip(vectors, singles):  # 批内填充不影响结果
+        np.testing.assert_allclose(vector, single["data"][0]["embedding"], atol=1e-5)
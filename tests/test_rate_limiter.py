@@ -0,0 +1,168 @@
+"""AdaptiveRateLimiter 的测试，时间与等待都由 FakeClock 控制。"""
+
+import asyncio
+import types
+
+import pytest
+
+from core.model.rag import rate_limiter
+from core.model.rag.rate_limiter import (
+    AdaptiveRateLimiter,
+    RateLimitConfig,
+    parse_retry_after,
+)
+
+
+class FakeClock:
+    """替代 time.monotonic 与 asyncio.sleep：sleep 只推进时间并记录时长。"""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+        self.sleeps: list[float] = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+    async def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> FakeClock:
+    fake = FakeClock()
+    monkeypatch.setattr(
+        rate_limiter, "time", types.SimpleNamespace(monotonic=fake.monotonic)
+    )
+    monkeypatch.setattr(
+        rate_limiter,
+        "asyncio",
+        types.SimpleNamespace(Lock=asyncio.Lock, sleep=fake.sleep),
+    )
+    return fake
+
+
+def acquire_all(limiter: AdaptiveRateLimiter, *tokens: int) -> None:
+    async def run() -> None:
+        for amount in tokens:
+            await limiter.acquire(amount)
+
+    asyncio.run(run())
+
+
+def test_requests_bucket_spaces_requests(clock: FakeClock) -> None:
+    limiter = AdaptiveRateLimiter(RateLimitConfig(requests_per_minute=60))
+    acquire_all(limiter, 1, 1, 1)
+    assert clock.sleeps == pytest.approx([1.0, 1.0])  # 容量为 1 秒的配额，之后每秒一个
+
+
+def test_burst_allows_back_to_back_requests(clock: FakeClock) -> None:
+    limiter = AdaptiveRateLimiter(
+        RateLimitConfig(requests_per_minute=60, burst_seconds=3)
+    )
+    acquire_all(limiter, 1, 1, 1, 1)
+    assert clock.sleeps == pytest.approx([1.0])
+
+
+def test_tokens_bucket_limits_text_volume(clock: FakeClock) -> None:
+    limiter = AdaptiveRateLimiter(
+        RateLimitConfig(requests_per_minute=6000, tokens_per_minute=600)
+    )
+    acquire_all(limiter, 10, 5)
+    assert clock.sleeps == pytest.approx([0.5])  # 每秒 10 个 token
+
+
+def test_oversized_request_runs_on_full_bucket_and_goes_into_debt(
+    clock: FakeClock,
+) -> None:
+    limiter = AdaptiveRateLimiter(
+        RateLimitConfig(requests_per_minute=6000, tokens_per_minute=600)
+    )
+    acquire_all(limiter, 50)  # 超过容量 10，桶满时直接放行
+    assert clock.sleeps == []
+    acquire_all(limiter, 1)
+    assert clock.sleeps == pytest.approx([4.1])  # 先补足 40 的欠额再取 1 个
+
+
+def test_actual_usage_refunds_estimate(clock: FakeClock) -> None:
+    limiter = AdaptiveRateLimiter(
+        RateLimitConfig(requests_per_minute=6000, tokens_per_minute=600)
+    )
+    acquire_all(limiter, 10)
+    limiter.on_success(latency=0.1, estimated_tokens=10, actual_tokens=4)
+    acquire_all(limiter, 6)
+    assert clock.sleeps == []
+
+
+def test_rate_limited_halves_rate_once_per_cooldown(clock: FakeClock) -> None:
+    limiter = AdaptiveRateLimiter(RateLimitConfig(requests_per_minute=60))
+    limiter.on_rate_limited()
+    limiter.on_rate_limited()  # 同一波 429 只降一次
+    assert limiter.requests_per_minute == pytest.approx(30)
+    assert limiter.rate_limited_count == 2
+
+    clock.advance(1.0)
+    limiter.on_rate_limited()
+    assert limiter.requests_per_minute == pytest.approx(15)
+
+    acquire_all(limiter, 1, 1)
+    assert clock.sleeps == pytest.approx([4.0])  # 速率降至每 4 秒一个
+
+
+def test_rate_recovers_additively_up_to_max(clock: FakeClock) -> None:
+    limiter = AdaptiveRateLimiter(
+        RateLimitConfig(requests_per_minute=60, increase_step=0.1)
+    )
+    limiter.on_rate_limited()
+    for expected in (0.6, 0.7, 0.8, 0.9, 1.0, 1.0):
+        limiter.on_success(latency=0.1)
+        assert limiter.ratio == pytest.approx(expected)
+    acquire_all(limiter, 1, 1)
+    assert clock.sleeps == pytest.approx([1.0])
+
+
+def test_rate_never_drops_below_min_ratio(clock: FakeClock) -> None:
+    limiter = AdaptiveRateLimiter(
+        RateLimitConfig(requests_per_minute=60, min_ratio=0.2)
+    )
+    for _ in range(5):
+        limiter.on_rate_limited()
+        clock.advance(1.0)
+    assert limiter.ratio == pytest.approx(0.2)
+
+
+def test_slow_responses_decrease_rate(clock: FakeClock) -> None:
+    limiter = AdaptiveRateLimiter(
+        RateLimitConfig(requests_per_minute=60, latency_target=2.0)
+    )
+    limiter.on_success(latency=1.0)
+    assert limiter.ratio == pytest.approx(1.0)
+    limiter.on_success(latency=3.0)
+    assert limiter.ratio == pytest.approx(0.9)
+
+
+def test_non_adaptive_keeps_rate(clock: FakeClock) -> None:
+    limiter = AdaptiveRateLimiter(
+        RateLimitConfig(requests_per_minute=60, adaptive=False)
+    )
+    limiter.on_rate_limited()
+    assert limiter.requests_per_minute == pytest.approx(60)
+
+
+def test_retry_after_blocks_until_deadline(clock: FakeClock) -> None:
+    limiter = AdaptiveRateLimiter(
+        RateLimitConfig(requests_per_minute=60, adaptive=False)
+    )
+    limiter.on_rate_limited(retry_after=3.0)
+    acquire_all(limiter, 1)
+    assert clock.sleeps == pytest.approx([3.0])  # 桶是满的，只等 Retry-After
+
+
+def test_parse_retry_after() -> None:
+    assert parse_retry_after("2.5") == 2.5
+    assert parse_retry_after("-1") == 0.0
+    assert parse_retry_after("Wed, 21 Oct 2026 07:28:00 GMT") is None
+    assert parse_retry_after(None) is None
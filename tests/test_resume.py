@@ -0,0 +1,74 @@
+"""向量化任务中断后以恢复模式继续的测试。"""
+
+import asyncio
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from core.model.rag import VectorizeConfig, VectorStore, vectorize_text
+from core.model.rag.job_journal import JobJournal
+
+from tests.helpers import FakeEmbedding
+
+TEXT = "".join(f"第{i}条记录。" for i in range(60))
+
+
+class AbortingEmbedding(FakeEmbedding):
+    """在第 abort_at 次请求时模拟进程被中断（Ctrl-C）。"""
+
+    def __init__(self, abort_at: int) -> None:
+        super().__init__()
+        self.abort_at = abort_at
+
+    async def _embed(self, model: str, text: str | list[str], **kwargs) -> dict:
+        if len(self.requests) + 1 == self.abort_at:
+            raise KeyboardInterrupt
+        return await super()._embed(model, text, **kwargs)
+
+
+def vectorize(root: Path, embedding: FakeEmbedding, resume: bool = False) -> None:
+    src = root / "src"
+    if not src.exists():
+        src.mkdir(parents=True)
+        (src / "a.txt").write_text(TEXT, encoding="utf-8")
+    config = VectorizeConfig(
+        min_chunk_size=5, max_chunk_size=20, consumer_count=2, max_line=4
+    )
+    asyncio.run(vectorize_text(str(src), config, embedding, "m", resume=resume))
+
+
+def store_contents(vector_dir: Path) -> dict[bytes, np.ndarray]:
+    """按内容哈希取出每个文本块的向量，与行的写入顺序无关。"""
+    store = VectorStore.open(vector_dir)
+    return {
+        h: store.read_rows(slice(row, row + 1))[0]
+        for h, row in store.hash_index().items()
+    }
+
+
+def test_resume_skips_committed_batches(tmp_path: Path) -> None:
+    clean = FakeEmbedding()
+    vectorize(tmp_path / "clean", clean)
+    total = sum(clean.requests)
+    assert len(clean.requests) > 6
+
+    root = tmp_path / "resumed"
+    with pytest.raises(KeyboardInterrupt):
+        vectorize(root, AbortingEmbedding(abort_at=6))
+    state = JobJournal(root / "vector").load()
+    assert state is not None and not state.finished
+    assert 0 < state.committed_rows < total
+
+    resumed = FakeEmbedding()
+    vectorize(root, resumed, resume=True)
+    assert sum(resumed.requests) == total - state.committed_rows  # 已提交的不再请求
+
+    expected = store_contents(tmp_path / "clean" / "vector")
+    actual = store_contents(root / "vector")
+    assert actual.keys() == expected.keys()
+    for h, vector in expected.items():
+        assert np.allclose(actual[h], vector)
+    journal = JobJournal(root / "vector").load()
+    assert journal is not None and journal.finished
+    assert VectorStore.open(root / "vector").count == total
@@ -0,0 +1,80 @@
+"""SearchBatcher 的合并检索测试。"""
+
+import asyncio
+from pathlib import Path
+
+from core.model.rag import CollectionRegistry, ReloadableSearchVectors, SearchBatcher
+
+from tests.helpers import FakeEmbedding, build_index
+
+
+def make_registry(tmp_path: Path) -> CollectionRegistry:
+    locations = {}
+    for name in ("a", "b"):
+        text = "".join(f"知识库{name}的第{i}条记录。" for i in range(30))
+        locations[name] = str(build_index(tmp_path / name, {"doc.txt": text}))
+    return CollectionRegistry(
+        locations=locations,
+        group_collections={"1": ["a"], "2": ["b"]},
+        poll_interval=0,
+    )
+
+
+def test_group_id_routes_to_group_collections(tmp_path: Path) -> None:
+    registry = make_registry(tmp_path)
+    batcher = SearchBatcher(
+        search_vectors=registry, siliconflow_embedding=FakeEmbedding(), model="m"
+    )
+
+    async def run() -> list[list]:
+        return await asyncio.gather(
+            batcher.search_by_text("第3条记录", top_k=5, group_id=1),
+            batcher.search_by_text("第3条记录", top_k=5, group_id="2"),
+            batcher.search_by_text("第3条记录", top_k=5, group_id=3),
+            batcher.search_by_text("第3条记录", top_k=5, group_id=1, collections=["b"]),
+        )
+
+    group_a, group_b, default, explicit = asyncio.run(run())
+    assert group_a and {r.collection for r in group_a} == {"a"}
+    assert group_b and {r.collection for r in group_b} == {"b"}
+    assert {r.collection for r in default} == {"a", "b"}  # 未配置的群检索默认知识库
+    assert {r.collection for r in explicit} == {"b"}  # 显式指定优先于群配置
+
+
+def test_batched_results_match_direct_search(tmp_path: Path) -> None:
+    text = "".join(f"第{i}条记录讲述了事情{i % 7}。" for i in range(60))
+    root = build_index(tmp_path / "kb", {"doc.txt": text})
+    embedding = FakeEmbedding()
+    requests = [
+        ("第3条记录讲述了事情3。", 5, None),
+        ("第3条记录讲述了事情3。", 5, 0.5),
+        ("事情4", 3, 0.2),
+        ("事情4", 8, None),
+        ("第10条记录", 5, 0.0),
+        ("完全无关的查询", 4, 0.9),
+        ("第11条记录讲述了事情4。", 2, None),
+    ]
+
+    async def run() -> tuple[list, list]:
+        search_vectors = await ReloadableSearchVectors.create(root, poll_interval=0)
+        batcher = SearchBatcher(
+            search_vectors=search_vectors, siliconflow_embedding=embedding, model="m"
+        )
+        batched = await asyncio.gather(
+            *(
+                batcher.search_by_text(query, top_k=top_k, min_score=min_score)
+                for query, top_k, min_score in requests
+            )
+        )
+        direct = [
+            await search_vectors.search_by_text(
+                embedding, query, "m", top_k=top_k, min_score=min_score
+            )
+            for query, top_k, min_score in requests
+        ]
+        return batched, direct
+
+    batched, direct = asyncio.run(run())
+    assert embedding.requests[0] == len({query for query, _, _ in requests})
+    assert any(len(results) for results in direct)
+    assert batched == direct
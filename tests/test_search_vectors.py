@@ -0,0 +1,70 @@
+"""SearchVectors 精确重排的测试。"""
+
+import asyncio
+from pathlib import Path
+
+import numpy as np
+
+from core.model.rag import (
+    SearchVectors,
+    VectorizeConfig,
+    VectorStore,
+    vectorize_text,
+)
+
+from tests.helpers import FakeEmbedding, build_index, fake_vector
+
+
+def test_rerank_rejects_rows_rewritten_by_rebuild(tmp_path: Path) -> None:
+    old_text = "".join(f"旧文本第{i}条。" for i in range(40))
+    root = build_index(tmp_path, {"doc.txt": old_text})
+    query = fake_vector("旧文本第3条。")
+
+    async def run() -> tuple[list, list, np.ndarray, np.ndarray]:
+        search_vectors = await SearchVectors.create_from_directory(str(root), rerank=30)
+        assert search_vectors.store is not None
+        rows = np.arange(len(search_vectors.id_mapping))
+        before = await search_vectors.search(query, top_k=5)
+        verified_before = search_vectors._verified(rows)
+        # 非增量重建重写向量存储，旧版本的行号此后指向新文本
+        (tmp_path / "src" / "doc.txt").write_text(
+            "".join(f"新文本第{i}条。" for i in range(40)), encoding="utf-8"
+        )
+        await vectorize_text(
+            str(tmp_path / "src"),
+            VectorizeConfig(min_chunk_size=5, max_chunk_size=20, consumer_count=2),
+            FakeEmbedding(),
+            "m",
+        )
+        # 重建后才映射存储的进程看到的是新内容
+        search_vectors.store = VectorStore.open(root)
+        after = await search_vectors.search(query, top_k=5)
+        return before, after, verified_before, search_vectors._verified(rows)
+
+    before, after, verified_before, verified_after = asyncio.run(run())
+    assert verified_before.all()
+    assert not verified_after.any()  # 已经校验过的行在存储重写后也要重新校验
+    assert before[0].text == "旧文本第3条。"
+    # 未通过校验的候选保留索引给出的相似度，不会换成其他文本的向量
+    assert [r.text for r in after] == [r.text for r in before]
+    assert np.allclose([r.score for r in after], [r.score for r in before], atol=1e-5)
+
+
+def test_min_score_applies_to_lexical_hits(tmp_path: Path) -> None:
+    text = "".join(f"第{i}条记录讲述了事情{i % 7}。" for i in range(60))
+    root = build_index(tmp_path, {"doc.txt": text})
+
+    async def run(query: str, min_score: float | None) -> list:
+        search_vectors = await SearchVectors.create_from_directory(str(root))
+        assert search_vectors.lexical is not None
+        results = await search_vectors.search_many(
+            [fake_vector(query)], top_k=5, min_score=min_score, query_texts=[query]
+        )
+        return results[0]
+
+    # 与任何文本块都不相似，只通过共有的二元词"记录"命中关键词索引
+    assert asyncio.run(run("记录一下今天的天气", None))
+    assert asyncio.run(run("记录一下今天的天气", 0.99)) == []
+    exact = asyncio.run(run("第3条记录讲述了事情3。", 0.99))
+    assert [r.text for r in exact] == ["第3条记录讲述了事情3。"]
+    assert exact[0].lexical_score is not None
@@ -0,0 +1,49 @@
+"""流式回复分段的测试。"""
+
+import asyncio
+from typing import AsyncIterator
+
+from core.model.llm import SentenceSegmenter, segment_stream
+
+
+async def collect(deltas: list[str], min_chars: int, max_chars: int) -> list[str]:
+    async def generate() -> AsyncIterator[str]:
+        for delta in deltas:
+            yield delta
+
+    return [s async for s in segment_stream(generate(), min_chars, max_chars)]
+
+
+def test_flushes_when_sentence_end_arrives_alone() -> None:
+    segmenter = SentenceSegmenter(min_chars=4, max_chars=100)
+    assert segmenter.feed("今天天气") == []
+    assert segmenter.feed("很好") == []
+    assert segmenter.feed("。") == ["今天天气很好。"]  # 句号单独到达时立即发出
+    assert segmenter.feed("”") == []  # 句号后的引号随下一句发送
+    assert segmenter.feed("明天") == []
+    assert segmenter.flush() == "”明天"
+
+
+def test_char_by_char_deltas_flush_each_sentence() -> None:
+    text = "第一句话比较短。第二句话稍微长一点！第三句呢？最后一句没有标点"
+    assert asyncio.run(collect(list(text), min_chars=6, max_chars=40)) == [
+        "第一句话比较短。",
+        "第二句话稍微长一点！",
+        "第三句呢？最后一句没有标点",  # 不足 min_chars 的句子与剩余文本一起发送
+    ]
+
+
+def test_short_sentences_wait_for_min_chars() -> None:
+    deltas = ["好", "。", "我们", "开始吧", "。", "下面是", "第一步", "。"]
+    assert asyncio.run(collect(deltas, min_chars=6, max_chars=40)) == [
+        "好。我们开始吧。",
+        "下面是第一步。",
+    ]
+
+
+def test_long_text_without_sentence_end_is_cut_at_soft_break() -> None:
+    deltas = ["一二三四五六七八，", "九十一二三四五六七八九十", "一二三"]
+    segments = asyncio.run(collect(deltas, min_chars=5, max_chars=12))
+    assert segments[0] == "一二三四五六七八，"
+    assert all(len(s) <= 12 for s in segments)
+    assert "".join(segments) == "".join(deltas)
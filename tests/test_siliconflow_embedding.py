@@ -0,0 +1,93 @@
+"""SiliconFlowEmbedding 的对冲与端点切换测试。"""
+
+import asyncio
+import json
+import time
+
+import httpx
+
+from config import EmbeddingConfig, EmbeddingEndpoint
+from core.model.rag import SiliconFlowEmbedding
+
+
+class FakeServer:
+    """按主机名模拟各端点的延迟与状态码。"""
+
+    def __init__(self) -> None:
+        self.delay: dict[str, float] = {}
+        self.status: dict[str, int] = {}
+        self.calls: dict[str, int] = {}
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        self.calls[host] = self.calls.get(host, 0) + 1
+        await asyncio.sleep(self.delay.get(host, 0.001))
+        status = self.status.get(host, 200)
+        if status != 200:
+            return httpx.Response(status)
+        texts = json.loads(request.content)["input"]
+        texts = [texts] if isinstance(texts, str) else texts
+        data = [{"index": i, "embedding": [1.0, 0.0]} for i in range(len(texts))]
+        return httpx.Response(200, json={"data": data})
+
+
+def make_embedding(
+    server: FakeServer, endpoints: list[str] = [], retry_count: int = 3
+) -> SiliconFlowEmbedding:
+    config = EmbeddingConfig(
+        api_key="key",
+        base_url="http://primary/v1/embeddings",
+        model_name="m",
+        provider_type="siliconflow",
+        retry_count=retry_count,
+        retry_delay=0,
+        endpoints=[EmbeddingEndpoint(base_url=url) for url in endpoints],
+        hedge_min_delay=0.01,
+    )
+    client = httpx.AsyncClient(transport=httpx.MockTransport(server))
+    return SiliconFlowEmbedding(embedding_config=config, client=client)
+
+
+def test_single_endpoint_does_not_hedge() -> None:
+    server = FakeServer()
+    server.delay["primary"] = 0.1  # 远超对冲等待时间
+    embedding = make_embedding(server)
+    result = asyncio.run(embedding.get_embedding(model="m", text="q"))
+    assert len(result["data"]) == 1
+    assert server.calls == {"primary": 1}
+
+
+def test_slow_endpoint_is_hedged_to_backup() -> None:
+    server = FakeServer()
+    server.delay["primary"] = 5.0
+    embedding = make_embedding(server, endpoints=["http://backup/v1/embeddings"])
+    start = time.monotonic()
+    asyncio.run(embedding.get_embedding(model="m", text="q"))
+    # 尚无延迟样本时等待 1 秒后对冲，慢请求被取消
+    assert time.monotonic() - start < 3.0
+    assert server.calls == {"primary": 1, "backup": 1}
+
+
+def test_client_error_fails_fast_without_penalising_endpoint() -> None:
+    server = FakeServer()
+    server.status["primary"] = 413
+    embedding = make_embedding(server, endpoints=["http://backup/v1/embeddings"])
+    try:
+        asyncio.run(embedding.get_embedding(model="m", text=["q"] * 3))
+    except httpx.HTTPStatusError as e:
+        assert e.response.status_code == 413
+    else:
+        raise AssertionError("413 应当直接抛出")
+    assert server.calls == {"primary": 1}
+    assert all(s.consecutive_failures == 0 for s in embedding.endpoints.stats())
+
+
+def test_server_error_fails_over_to_backup() -> None:
+    server = FakeServer()
+    server.status["primary"] = 503
+    embedding = make_embedding(server, endpoints=["http://backup/v1/embeddings"])
+    result = asyncio.run(embedding.get_embedding(model="m", text="q"))
+    assert len(result["data"]) == 1
+    assert server.calls == {"primary": 1, "backup": 1}
+    primary = embedding.endpoints.stats()[0]
+    assert primary.consecutive_failures == 1
@@ -0,0 +1,102 @@
+"""源文件读取：编码检测、加载器与并发读取顺序的测试。"""
+
+import asyncio
+import codecs
+import gzip
+import json
+from pathlib import Path
+
+import pytest
+
+from core.model.rag.source_reader import detect_encoding, iter_sources, load_source
+
+TEXT = "第一章 天气\n今天 晴。\r\n明天有雨。"
+EXPECTED = "第一章天气今天晴。明天有雨。"
+
+
+@pytest.mark.parametrize(
+    ("data", "encoding"),
+    [
+        (codecs.BOM_UTF8 + TEXT.encode("utf-8"), "utf-8-sig"),
+        (TEXT.encode("utf-16"), "utf-16"),
+        (TEXT.encode("utf-32"), "utf-32"),
+        (TEXT.encode("utf-8"), "utf-8"),
+        (TEXT.encode("gb18030"), "gb18030"),
+    ],
+)
+def test_detect_encoding(data: bytes, encoding: str) -> None:
+    assert detect_encoding(data) == encoding
+
+
+@pytest.mark.parametrize("encoding", ["utf-8", "utf-8-sig", "utf-16", "gb18030"])
+def test_load_source_decodes_and_strips_whitespace(
+    tmp_path: Path, encoding: str
+) -> None:
+    path = tmp_path / "a.txt"
+    path.write_bytes(TEXT.encode(encoding))
+    assert load_source(path) == EXPECTED  # BOM 不会留在文本开头
+
+
+def test_multibyte_chars_split_across_blocks(tmp_path: Path) -> None:
+    path = tmp_path / "a.txt"
+    path.write_bytes(TEXT.encode("utf-8"))
+    assert load_source(path, block_size=1) == EXPECTED
+
+
+def test_gb18030_after_ascii_head_falls_back(tmp_path: Path) -> None:
+    path = tmp_path / "a.txt"
+    path.write_bytes(b"chapter-1 " * 4 + TEXT.encode("gb18030"))
+    # 第一块只有 ASCII 时判断为 UTF-8，读到中文时改用 GB18030 从头读取
+    assert load_source(path, block_size=16) == "chapter-1" * 4 + EXPECTED
+
+
+def test_jsonl_takes_text_or_content(tmp_path: Path) -> None:
+    lines = [
+        {"text": "第一 段"},
+        {"content": "第二段"},
+        {"title": "没有正文"},
+        ["不是对象"],
+        {"text": 3},
+    ]
+    path = tmp_path / "a.jsonl"
+    path.write_text(
+        "\n".join(json.dumps(line, ensure_ascii=False) for line in lines) + "\n\n",
+        encoding="utf-8",
+    )
+    assert load_source(path, block_size=7) == "第一段第二段"
+
+
+def test_gz_uses_inner_suffix(tmp_path: Path) -> None:
+    (tmp_path / "a.txt.gz").write_bytes(gzip.compress(TEXT.encode("gb18030")))
+    record = json.dumps({"text": TEXT}, ensure_ascii=False)
+    (tmp_path / "b.jsonl.gz").write_bytes(gzip.compress(record.encode("utf-8")))
+    assert load_source(tmp_path / "a.txt.gz") == EXPECTED
+    assert load_source(tmp_path / "b.jsonl.gz") == EXPECTED
+
+
+def test_unknown_suffix_raises(tmp_path: Path) -> None:
+    path = tmp_path / "a.pdf"
+    path.write_bytes(b"%PDF")
+    with pytest.raises(ValueError):
+        load_source(path)
+
+
+def test_iter_sources_keeps_path_order_and_skips_bad_files(tmp_path: Path) -> None:
+    for i in range(5):
+        (tmp_path / f"{i}.txt").write_text(f"文件 {i}", encoding="utf-8")
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "c.jsonl").write_text('{"text": "子目录"}', encoding="utf-8")
+    (tmp_path / "bad.jsonl").write_text("{不是json", encoding="utf-8")
+
+    async def collect() -> list[tuple[str, str]]:
+        return [
+            item
+            async for item in iter_sources(
+                tmp_path, patterns=["*.txt", "*.jsonl"], concurrency=2
+            )
+        ]
+
+    assert asyncio.run(collect()) == [
+        *[(f"{i}.txt", f"文件{i}") for i in range(5)],
+        ("sub/c.jsonl", "子目录"),
+    ]
@@ -1,2 +1,3 @@
+from .http_pool import HttpClientPool, PoolStats
 from .retry_utils import create_retry_manager
-__all__=["create_retry_manager"]
\ No newline at end of file
+__all__=["create_retry_manager","HttpClientPool","PoolStats"]
\ No newline at end of file
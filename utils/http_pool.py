@@ -0,0 +1,80 @@
+"""共享的 HTTP 连接池。
+
+embedding 服务与各 LLM 服务商共用一个 httpx.AsyncClient：连接数、keep-alive 与超时统一配置，
+同一主机的连接在各调用方之间复用，由依赖注入容器在关闭时统一释放。
+"""
+
+import importlib.util
+
+import httpx
+from pydantic import BaseModel
+
+from config import HttpConfig
+from log import get_logger
+
+logger = get_logger(__name__)
+
+
+class PoolStats(BaseModel):
+    connections: int = 0  # 当前打开的连接数
+    in_use: int = 0  # 正在处理请求的连接数
+    idle: int = 0  # 空闲、可被复用的连接数
+    requests: int = 0  # 正在进行的请求数
+    queued: int = 0  # 等待分配连接的请求数
+    max_connections: int = 0
+
+
+class HttpClientPool:
+    """持有共享 httpx.AsyncClient 的连接池。
+
+    Args:
+        config: 连接池与超时配置。
+    """
+
+    def __init__(self, config: HttpConfig) -> None:
+        self.config = config
+        http2 = config.http2
+        if http2 and importlib.util.find_spec("h2") is None:
+            logger.warning("未安装 h2(httpx[http2])，HTTP/2 不可用，改用 HTTP/1.1")
+            http2 = False
+        self.client = httpx.AsyncClient(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=config.max_connections,
+                max_keepalive_connections=config.max_keepalive_connections,
+                keepalive_expiry=config.keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(
+                connect=config.connect_timeout,
+                read=config.read_timeout,
+                write=config.write_timeout,
+                pool=config.pool_timeout,
+            ),
+        )
+
+    def stats(self) -> PoolStats:
+        """返回连接池的当前状态。
+
+        httpx 没有公开连接池的统计接口，这里读取 httpcore 连接池的状态；
+        传输层不是默认实现时只返回配置的上限。
+        """
+        stats = PoolStats(max_connections=self.config.max_connections)
+        pool = getattr(getattr(self.client, "_transport", None), "_pool", None)
+        if pool is None:
+            return stats
+        connections = list(getattr(pool, "connections", []))
+        requests = list(getattr(pool, "_requests", []))
+        stats.connections = len(connections)
+        stats.idle = sum(1 for c in connections if c.is_idle())
+        stats.in_use = sum(
+            1 for c in connections if not c.is_idle() and not c.is_closed()
+        )
+        stats.requests = len(requests)
+        # 已分配连接的请求 connection 不为空，其余请求在等待空闲连接
+        stats.queued = sum(
+            1 for r in requests if getattr(r, "connection", None) is None
+        )
+        return stats
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
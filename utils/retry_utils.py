@@ -3,6 +3,7 @@ from tenacity import (
     AsyncRetrying,
     stop_after_attempt,
     wait_exponential,
+    retry_if_exception,
     retry_if_exception_type,
     retry_if_result,
 )
@@ -13,8 +14,13 @@ def create_retry_manager(
     retry_delay: int,
     error_types: tuple[Type[Exception], ...] = (Exception,),
     custom_checker: Optional[Callable[..., bool]] = None,
+    error_checker: Optional[Callable[[BaseException], bool]] = None,
 ) -> AsyncRetrying:
     retry_strategy = retry_if_exception_type(error_types)
+    if error_checker:  # 只重试 error_types 中 error_checker 判定为可重试的异常
+        retry_strategy = retry_if_exception(
+            lambda e: isinstance(e, error_types) and error_checker(e)
+        )
     if custom_checker:
         retry_strategy = retry_strategy | retry_if_result(custom_checker)
     return AsyncRetrying(